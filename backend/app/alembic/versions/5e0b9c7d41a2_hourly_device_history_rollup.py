@@ -0,0 +1,40 @@
+"""Hourly device history rollup
+
+Revision ID: 5e0b9c7d41a2
+Revises: a44ccb0ffc20
+Create Date: 2026-10-18 13:02:17.553120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0b9c7d41a2'
+down_revision = 'a44ccb0ffc20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('devicehistory', sa.Column('parameter', sqlmodel.sql.sqltypes.AutoString(length=32), server_default='', nullable=False))
+    op.add_column('devicehistory', sa.Column('sum_value', sa.Float(), server_default='0', nullable=False))
+    op.add_column('devicehistory', sa.Column('count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('devicehistory', sa.Column('last_value', sa.Float(), nullable=True))
+    # Ключ (device_id) позволял хранить только один час на устройство
+    op.drop_constraint('devicehistory_pkey', 'devicehistory', type_='primary')
+    op.create_primary_key('devicehistory_pkey', 'devicehistory', ['device_id', 'parameter', 'hour'])
+
+
+def downgrade():
+    op.execute(
+        'DELETE FROM devicehistory h USING devicehistory newer '
+        'WHERE h.device_id = newer.device_id AND (h.hour, h.parameter) < (newer.hour, newer.parameter)'
+    )
+    op.drop_constraint('devicehistory_pkey', 'devicehistory', type_='primary')
+    op.create_primary_key('devicehistory_pkey', 'devicehistory', ['device_id'])
+    op.drop_column('devicehistory', 'last_value')
+    op.drop_column('devicehistory', 'count')
+    op.drop_column('devicehistory', 'sum_value')
+    op.drop_column('devicehistory', 'parameter')
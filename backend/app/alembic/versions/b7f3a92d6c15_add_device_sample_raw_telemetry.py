@@ -0,0 +1,37 @@
+"""Add partitioned device sample raw telemetry table
+
+Revision ID: b7f3a92d6c15
+Revises: 5e0b9c7d41a2
+Create Date: 2026-10-18 17:25:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7f3a92d6c15'
+down_revision = '5e0b9c7d41a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Без первичного ключа: таблица только для добавления через COPY
+    op.create_table(
+        'devicesample',
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('parameter', sqlmodel.sql.sqltypes.AutoString(length=32), server_default='', nullable=False),
+        sa.Column('ts', sa.DateTime(), nullable=False),
+        sa.Column('value', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['device_id'], ['device.id'], ondelete='CASCADE'),
+        postgresql_partition_by='RANGE (ts)',
+    )
+    op.create_index('ix_devicesample_device_parameter_ts', 'devicesample', ['device_id', 'parameter', 'ts'])
+    # Секция по умолчанию принимает значения, для которых суточная секция ещё не создана
+    op.execute('CREATE TABLE devicesample_default PARTITION OF devicesample DEFAULT')
+
+
+def downgrade():
+    op.drop_table('devicesample')
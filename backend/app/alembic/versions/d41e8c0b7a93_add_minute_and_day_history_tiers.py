@@ -0,0 +1,44 @@
+"""Add minute and day history tiers
+
+Revision ID: d41e8c0b7a93
+Revises: b7f3a92d6c15
+Create Date: 2026-10-18 17:52:03.406215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41e8c0b7a93'
+down_revision = 'b7f3a92d6c15'
+branch_labels = None
+depends_on = None
+
+
+def _create_rollup_table(name: str) -> None:
+    op.create_table(
+        name,
+        sa.Column('device_id', sa.Integer(), nullable=False),
+        sa.Column('parameter', sqlmodel.sql.sqltypes.AutoString(length=32), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('min_value', sa.Float(), nullable=True),
+        sa.Column('max_value', sa.Float(), nullable=True),
+        sa.Column('sum_value', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('last_value', sa.Float(), nullable=True),
+        sa.Column('last_updated', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['device_id'], ['device.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('device_id', 'parameter', 'bucket'),
+    )
+
+
+def upgrade():
+    _create_rollup_table('devicehistoryminute')
+    _create_rollup_table('devicehistoryday')
+
+
+def downgrade():
+    op.drop_table('devicehistoryday')
+    op.drop_table('devicehistoryminute')
@@ -1,22 +1,22 @@
+import uuid
 from collections.abc import Generator, AsyncGenerator
 from typing import Annotated
 
 import aiomqtt
-import jwt
+import anyio
 import paho
 from fastapi import Depends, HTTPException, status, FastAPI
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
-from pydantic import ValidationError
 from sqlmodel import Session
 
-from app.core import security
 from app.core.config import settings
 from app.core.db import engine, AsyncSession
 from app.core.setup_logger import setup_logger
-from app.models.user import TokenPayload, User
+from app.models.user import User
+from app.services.change_bus import change_bus
+from app.services.user_cache import Principal, user_cache
 from sqlalchemy.ext.asyncio import AsyncSession as AsyncSessionType
-from sqlalchemy import select
 
 logger = setup_logger(__name__)
 
@@ -42,56 +42,86 @@ TokenDep = Annotated[str, Depends(reusable_oauth2)]
 AsyncSessionDep = Annotated[AsyncSessionType, Depends(get_async_db)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (InvalidTokenError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
-    user = session.get(User, token_data.sub)
-    if not user:
+def check_principal(principal: Principal | None) -> Principal:
+    if not principal:
         raise HTTPException(status_code=404, detail="User not found")
-    if not user.is_active:
+    if not principal.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return user
+    return principal
 
 
-async def get_current_user_async(
-        session: AsyncSessionDep,
-        token: TokenDep
-) -> User:
-    """Асинхронная версия (рекомендуется для нового кода)"""
+def credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Could not validate credentials",
+    )
+
+
+async def authenticate(session: AsyncSessionType, token: str) -> Principal:
+    """Проверка токена по кэшу; в БД — только при промахе, на сессии запроса"""
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (InvalidTokenError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
+        return check_principal(await user_cache.get(session, token))
+    except InvalidTokenError:
+        raise credentials_exception()
+
+
+async def get_current_principal(session: AsyncSessionDep, token: TokenDep) -> Principal:
+    return await authenticate(session, token)
 
-    result = await session.exec(
-        select(User).where(User.id == token_data.sub)
-    )
-    user = result.first()
 
+def get_current_principal_sync(session: SessionDep, token: TokenDep) -> Principal:
+    """
+    То же для синхронных эндпоинтов: промах кэша читается через их SessionDep,
+    чтобы запрос не держал второе (асинхронное) соединение.
+    """
+    try:
+        return check_principal(user_cache.get_sync(session, token))
+    except InvalidTokenError:
+        raise credentials_exception()
+
+
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
+SyncPrincipal = Annotated[Principal, Depends(get_current_principal_sync)]
+
+
+def get_current_user(session: SessionDep, principal: SyncPrincipal) -> User:
+    """Пользователь целиком — для эндпоинтов, которые меняют его через SessionDep"""
+    user = session.get(User, principal.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
-def get_current_active_superuser(current_user: CurrentUser) -> User:
-    if not current_user.is_superuser:
+def check_superuser(principal: Principal) -> Principal:
+    if not principal.is_superuser:
         raise HTTPException(
             status_code=403, detail="The user doesn't have enough privileges"
         )
-    return current_user
+    return principal
+
+
+def get_current_active_superuser(principal: CurrentPrincipal) -> Principal:
+    return check_superuser(principal)
+
+
+def get_current_active_superuser_sync(principal: SyncPrincipal) -> Principal:
+    return check_superuser(principal)
+
+
+async def invalidate_user_async(user_id: uuid.UUID) -> None:
+    """Сбрасывает пользователя в кэше аутентификации этого и остальных процессов"""
+    user_cache.invalidate(user_id)
+    if settings.CHANGE_BUS_ENABLED:
+        await change_bus.notify_user(user_id)
+
+
+def invalidate_user(user_id: uuid.UUID) -> None:
+    """
+    То же для синхронных эндпоинтов (они выполняются в потоках threadpool).
+    """
+    user_cache.invalidate(user_id)
+    if settings.CHANGE_BUS_ENABLED:
+        anyio.from_thread.run(change_bus.notify_user, user_id)
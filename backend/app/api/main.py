@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import items, login, private, users, utils, board, controllers
+from app.api.routes import items, login, private, users, utils, board, controllers, devices, stream
 from app.core.config import settings
 
 api_router = APIRouter()
@@ -10,6 +10,8 @@ api_router.include_router(utils.router)
 api_router.include_router(items.router)
 api_router.include_router(board.router)
 api_router.include_router(controllers.router)
+api_router.include_router(devices.router)
+api_router.include_router(stream.router)
 
 
 if settings.ENVIRONMENT == "local":
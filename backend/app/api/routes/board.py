@@ -1,14 +1,16 @@
 # backend/app/api/routes/board.py
 import json
 import os
-from fastapi import APIRouter, HTTPException, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, Form
 from sqlmodel import Session, select
-from app.api.deps import SessionDep, AsyncSessionDep
+from app.api.dep_mqtt_client import get_mqtt_manager
+from app.api.deps import SessionDep, AsyncSessionDep, get_current_active_superuser
 from app.core.db import engine, AsyncSession
 from app.models.controller_board import ControllerBoard
 from app.models.controller_file_request import ControllerFileRequest
-from app.repositories.controller_board_repository import get_controller_by_topic, create_or_update_controller_board
+from app.repositories.controller_board_repository import get_controller_by_topic
 from app.repositories.controller_file_request_repository import get_controller_file_request_by_topic_and_secret_key
+from app.services.controller_boards import save_controller_board
 from app.services.get_active_mqtt_config import get_active_mqtt_config
 from app.services.process_startup_message import process_startup_message
 
@@ -58,7 +60,7 @@ async def upload_file(
 
     if file.filename == 'mqtt.json':
         mqtt_config = get_active_mqtt_config(file_path)
-        await create_or_update_controller_board(
+        await save_controller_board(
             session=session,
             topic=topic,
             rabbitmq_user=mqtt_config['User'],
@@ -69,3 +71,11 @@ async def upload_file(
             devices_json = json.load(f)
         await process_startup_message(session=session, devices=devices_json, controller_id=controller_board.id)
     return {'message': f'File saved to {file_path}'}
+
+
+@router.get('/stats', dependencies=[Depends(get_current_active_superuser)])
+async def get_mqtt_stats(mqtt_manager=Depends(get_mqtt_manager)) -> dict:
+    '''
+    Глубина очередей, задержка и загрузка воркеров обработки MQTT-сообщений.
+    '''
+    return {**mqtt_manager.dispatcher.stats(), 'filtered': mqtt_manager.filtered}
@@ -4,55 +4,40 @@ import logging
 import time
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import func, select
 
 from app.api.dep_mqtt_client import get_mqtt_manager
-from app.api.deps import get_current_user, SessionDep, CurrentUser, AsyncSessionDep
+from app.api.deps import get_current_principal, CurrentPrincipal, AsyncSessionDep
 from app.models import Device
-from app.models.controller_board import ControllerBoard, ControllerBoardsPublic
+from app.models.controller_board import ControllerBoardPublic, ControllerBoardsPublic
 from app.models.device_state import DeviceStatePublic, DeviceState, DeviceStatesPublic
 from app.mqtt.mqtt_client import MQTTClientManager
-from app.repositories.controller_board_repository import get_controller_by_id
+from app.repositories.controller_board_repository import get_controller_by_id, get_controllers_page
+from app.services.state_cache import get_boards_states, get_controller_states
 
 router = APIRouter(tags=['ControllerBoards'])
 logger = logging.getLogger(__name__)
 
-@router.get('/boards', dependencies=[Depends(get_current_user)], response_model=ControllerBoardsPublic)
-async def get_boards(session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100) -> Any:
-    if current_user.is_superuser:
-        count_statement = select(func.count()).select_from(ControllerBoard)
-        count = session.exec(count_statement).one()
-        statement = select(ControllerBoard).offset(skip).limit(limit)
-        items = session.exec(statement).all()
-    else:
-        count_statement = (
-            select(func.count())
-            .select_from(ControllerBoard)
-            # .where(ControllerBoard.owner_id == current_user.id)
-        )
-        count = session.exec(count_statement).one()
-        statement = (
-            select(ControllerBoard)
-            # .where(ControllerBoard.owner_id == current_user.id)
-            .offset(skip)
-            .limit(limit)
-        )
-        items = session.exec(statement).all()
-
+@router.get('/boards', dependencies=[Depends(get_current_principal)], response_model=ControllerBoardsPublic)
+async def get_boards(
+    session: AsyncSessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    with_states: bool = False,
+) -> Any:
+    controllers, count = await get_controllers_page(session=session, skip=skip, limit=limit)
+    items = [ControllerBoardPublic.model_validate(controller) for controller in controllers]
+    if with_states:
+        states = await get_boards_states(session=session, controllers=controllers)
+        for item in items:
+            item.states = states.get(item.id, [])
     return ControllerBoardsPublic(data=items, count=count)
 
 
 @router.get("/controller_state/{id}", response_model=DeviceStatesPublic)
-def get_controller_state(id: int, session: SessionDep):
-    controller = session.get(ControllerBoard, id)
-    if not controller:
+async def get_controller_state(id: int, session: AsyncSessionDep):
+    public_states = await get_controller_states(session=session, controller_id=id)
+    if public_states is None:
         raise HTTPException(status_code=404, detail="Controller not found")
-
-    device_states = session.exec(
-        select(DeviceState).join(Device).where(Device.controller_id == id)
-    ).all()
-
-    public_states = [DeviceStatePublic.from_db_state(state) for state in device_states]
     return DeviceStatesPublic(data=public_states, count=len(public_states))
 
 
@@ -62,7 +47,7 @@ async def toggle_relay(
     name: str,
     state: str,
     session: AsyncSessionDep,
-    current_user: CurrentUser,
+    current_user: CurrentPrincipal,
     mqtt_manager: MQTTClientManager = Depends(get_mqtt_manager),
 ):
     controller = await get_controller_by_id(session=session, id=id)
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.api.deps import AsyncSessionDep, get_current_principal
+from app.core.config import settings
+from app.models import Device
+from app.models.device_history import DeviceHistorySeries
+from app.services.history_tiers import choose_bucket, parse_bucket, query_history
+
+router = APIRouter(prefix='/devices', tags=['Devices'])
+
+AGGREGATES = ('min', 'max', 'avg', 'sum', 'count')
+
+
+def to_local_naive(time: datetime) -> datetime:
+    """Время в БД хранится без зоны, в settings.TIME_ZONE"""
+    if time.tzinfo is None:
+        return time
+    return time.astimezone(settings.local_tz).replace(tzinfo=None)
+
+
+@router.get('/{id}/history', dependencies=[Depends(get_current_principal)], response_model=DeviceHistorySeries)
+async def get_device_history(
+    id: int,
+    session: AsyncSessionDep,
+    start: Annotated[Optional[datetime], Query(alias='from')] = None,
+    end: Annotated[Optional[datetime], Query(alias='to')] = None,
+    bucket: Optional[str] = None,
+    agg: str = 'min,max,avg',
+    parameter: Optional[str] = None,
+):
+    """
+    Агрегаты значения устройства по корзинам шириной bucket ('30s', '5m', '1h', '1d')
+    за [from, to). По умолчанию — последние сутки, около HISTORY_DEFAULT_POINTS корзин.
+    Корзины без данных возвращаются со значением null.
+    """
+    device = await session.get(Device, id)
+    if not device:
+        raise HTTPException(status_code=404, detail='Device not found')
+
+    aggregates = [name.strip() for name in agg.split(',') if name.strip()]
+    unknown = set(aggregates) - set(AGGREGATES)
+    if not aggregates or unknown:
+        raise HTTPException(status_code=400, detail=f'agg must be a subset of {",".join(AGGREGATES)}')
+
+    end = to_local_naive(end) if end else datetime.now(settings.local_tz).replace(tzinfo=None)
+    start = to_local_naive(start) if start else end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail='`from` must be earlier than `to`')
+
+    if bucket is None:
+        step = choose_bucket(start, end, settings.HISTORY_DEFAULT_POINTS)
+    else:
+        try:
+            step = parse_bucket(bucket)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if (end - start) / step > settings.HISTORY_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f'Too many buckets, limit is {settings.HISTORY_MAX_POINTS}')
+
+    # Параметр по умолчанию — как его пишет ingest: extra_name датчика или '' для реле
+    parameter = parameter if parameter is not None else device.extra_name or ''
+    tier, rows = await query_history(
+        session,
+        device_id=id,
+        parameter=parameter,
+        start=start,
+        end=end,
+        bucket=step,
+        fill_gaps=True,
+    )
+    columns = {
+        'min': [row.min_value for row in rows],
+        'max': [row.max_value for row in rows],
+        'avg': [row.avg_value for row in rows],
+        'sum': [row.sum_value for row in rows],
+        'count': [row.count for row in rows],
+    }
+    return DeviceHistorySeries(
+        device_id=id,
+        parameter=parameter,
+        tier=tier.name,
+        bucket=int(step.total_seconds()),
+        time=[row.bucket for row in rows],
+        values={name: columns[name] for name in aggregates},
+    )
@@ -4,7 +4,7 @@ from typing import Any
 from fastapi import APIRouter, HTTPException
 from sqlmodel import func, select
 
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import SyncPrincipal, SessionDep
 from app.models.user import Message
 from app.models.item import Item, ItemCreate, ItemUpdate, ItemPublic, ItemsPublic
 
@@ -13,7 +13,7 @@ router = APIRouter(prefix="/items", tags=["items"])
 
 @router.get("/", response_model=ItemsPublic)
 def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep, current_user: SyncPrincipal, skip: int = 0, limit: int = 100
 ) -> Any:
     """
     Retrieve items.
@@ -43,7 +43,7 @@ def read_items(
 
 
 @router.get("/{id}", response_model=ItemPublic)
-def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
+def read_item(session: SessionDep, current_user: SyncPrincipal, id: uuid.UUID) -> Any:
     """
     Get item by ID.
     """
@@ -57,7 +57,7 @@ def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) ->
 
 @router.post("/", response_model=ItemPublic)
 def create_item(
-    *, session: SessionDep, current_user: CurrentUser, item_in: ItemCreate
+    *, session: SessionDep, current_user: SyncPrincipal, item_in: ItemCreate
 ) -> Any:
     """
     Create new item.
@@ -73,7 +73,7 @@ def create_item(
 def update_item(
     *,
     session: SessionDep,
-    current_user: CurrentUser,
+    current_user: SyncPrincipal,
     id: uuid.UUID,
     item_in: ItemUpdate,
 ) -> Any:
@@ -95,7 +95,7 @@ def update_item(
 
 @router.delete("/{id}")
 def delete_item(
-    session: SessionDep, current_user: CurrentUser, id: uuid.UUID
+    session: SessionDep, current_user: SyncPrincipal, id: uuid.UUID
 ) -> Message:
     """
     Delete an item.
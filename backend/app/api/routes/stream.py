@@ -0,0 +1,157 @@
+import asyncio
+import json
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+
+from app.api.deps import authenticate
+from app.core.config import settings
+from app.core.db import AsyncSession
+from app.models.device_state import DeviceStatePublic
+from app.repositories.controller_board_repository import get_controller_by_id, get_controllers_by_topic_prefix
+from app.services.state_cache import get_boards_states
+from app.services.state_hub import Subscription, state_hub
+from app.services.user_cache import Principal
+
+router = APIRouter(prefix='/stream', tags=['Stream'])
+
+# EventSource не умеет передавать заголовки: токен может прийти и в параметре token
+optional_oauth2 = OAuth2PasswordBearer(tokenUrl=f'{settings.API_V1_STR}/login/access-token', auto_error=False)
+
+
+async def get_snapshot(controller_id: Optional[int], topic: Optional[str]) -> list[DeviceStatePublic]:
+    # Своя короткая сессия: соединение не должно оставаться занятым на всё время потока
+    async with AsyncSession() as session:
+        if controller_id is not None:
+            controller = await get_controller_by_id(session=session, id=controller_id)
+            controllers = [controller] if controller is not None else []
+        else:
+            controllers = await get_controllers_by_topic_prefix(session=session, prefix=topic)
+        # Незакэшированные контроллеры префикса читаются одним запросом
+        boards_states = await get_boards_states(session=session, controllers=controllers)
+    return [
+        state
+        for states in boards_states.values()
+        for state in states
+        if topic is None or state.topic.startswith(topic)
+    ]
+
+
+def build_event(event_type: str, states: list[DeviceStatePublic]) -> str:
+    return json.dumps({'type': event_type, 'data': [state.model_dump(mode='json') for state in states]})
+
+
+async def authenticate_stream(token: str) -> Principal:
+    """Сессия запроса жила бы весь поток, поэтому проверка токена — на своей короткой сессии"""
+    async with AsyncSession() as session:
+        return await authenticate(session, token)
+
+
+async def authenticate_sse(
+    header_token: Optional[str] = Depends(optional_oauth2),
+    token: Optional[str] = None,
+) -> Principal:
+    """Токен из заголовка Authorization или, для EventSource, из параметра token"""
+    token = header_token or token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Not authenticated',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
+    return await authenticate_stream(token)
+
+
+def check_filter(controller_id: Optional[int], topic: Optional[str]) -> None:
+    if controller_id is None and not topic:
+        raise HTTPException(status_code=400, detail='Either controller_id or topic is required')
+
+
+async def stream_events(subscription: Subscription, snapshot: list[DeviceStatePublic]) -> AsyncIterator[tuple[str, str]]:
+    """Снимок, затем изменения; при простое — пустые события для поддержания соединения"""
+    yield 'snapshot', build_event('snapshot', snapshot)
+    while True:
+        states = await subscription.get(timeout=settings.STREAM_HEARTBEAT_INTERVAL)
+        if states:
+            yield 'state', build_event('state', states)
+        else:
+            yield 'ping', ''
+
+
+@router.get('/states', dependencies=[Depends(authenticate_sse)])
+async def stream_states_sse(
+    request: Request,
+    controller_id: Optional[int] = None,
+    topic: Optional[str] = None,
+):
+    """
+    Server-Sent Events: событие snapshot с текущими состояниями, затем события state
+    с изменениями. Подписка по контроллеру (controller_id) или префиксу топика (topic).
+    Токен — в заголовке Authorization или в параметре token (для EventSource).
+    """
+    check_filter(controller_id, topic)
+    # Подписываемся до снимка, чтобы не потерять изменения между ними
+    subscription = state_hub.subscribe(controller_id=controller_id, topic=topic)
+    try:
+        snapshot = await get_snapshot(controller_id, topic)
+    except Exception:
+        state_hub.unsubscribe(subscription)
+        raise
+
+    async def events():
+        try:
+            async for event_type, data in stream_events(subscription, snapshot):
+                if await request.is_disconnected():
+                    break
+                if event_type == 'ping':
+                    yield ': ping\n\n'
+                else:
+                    yield f'event: {event_type}\ndata: {data}\n\n'
+        finally:
+            state_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.websocket('/ws/states')
+async def stream_states_ws(
+    websocket: WebSocket,
+    token: str,
+    controller_id: Optional[int] = None,
+    topic: Optional[str] = None,
+):
+    """
+    WebSocket: сообщения {"type": "snapshot" | "state", "data": [...]}.
+    Браузер не может передать заголовок Authorization, поэтому токен — в параметре token.
+    """
+    try:
+        await authenticate_stream(token)
+        check_filter(controller_id, topic)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+
+    await websocket.accept()
+    subscription = state_hub.subscribe(controller_id=controller_id, topic=topic)
+    receiver = asyncio.create_task(websocket.receive_text())
+    try:
+        snapshot = await get_snapshot(controller_id, topic)
+        async for event_type, data in stream_events(subscription, snapshot):
+            if receiver.done():
+                if receiver.exception() is not None:
+                    break  # клиент закрыл соединение
+                # Входящие сообщения клиента не используются
+                receiver = asyncio.create_task(websocket.receive_text())
+            if event_type != 'ping':
+                await websocket.send_text(data)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        state_hub.unsubscribe(subscription)
@@ -54,6 +54,76 @@ class Settings(BaseSettings):
     RABBITMQ_PASSWORD: str = 'guest'
     RABBITMQ_API_PORT: int = 15672
     TOPIC: str = '#'
+    # Обработка входящих MQTT-сообщений
+    MQTT_WORKERS: int = 8
+    MQTT_SHARD_QUEUE_SIZE: int = 1000
+    # Политика переполнения очереди шарда: block | drop_oldest | latest
+    MQTT_QUEUE_POLICY: Literal['block', 'drop_oldest', 'latest'] = 'block'
+    # Лимит внутренней очереди aiomqtt, чтобы при block память не росла без ограничений
+    MQTT_MAX_QUEUED_INCOMING: int = 10000
+    # Несколько процессов с подпиской:
+    # all — каждый процесс получает все сообщения (один воркер uvicorn);
+    # shared — общая подписка MQTT v5 $share/<группа>/<TOPIC>, брокер делит поток;
+    # leader — сообщения обрабатывает только владелец advisory lock в Postgres
+    # (для брокеров без shared subscriptions, например RabbitMQ).
+    MQTT_INGEST_MODE: Literal['all', 'shared', 'leader'] = 'all'
+    MQTT_SHARED_GROUP: str = 'iot-hub'
+    MQTT_LEADER_LOCK_ID: int = 7260001
+    MQTT_LEADER_RETRY_INTERVAL: float = 5.0
+    # MQTT v5 no_local: брокер не возвращает нам наши же публикации (команды /set/).
+    # Требует MQTT v5 на брокере; для shared-подписок no_local запрещён протоколом.
+    MQTT_NO_LOCAL: bool = False
+    # Роль процесса: all — API и обработка MQTT в одном процессе;
+    # api — только API и клиент для публикации команд, обработку ведёт
+    # отдельный процесс `python -m app.ingest`; ingest — роль этого процесса
+    # (ставится им самим): пул БД INGEST_DB_*, API с этой ролью не запускается
+    APP_ROLE: Literal['all', 'api', 'ingest'] = 'all'
+    INGEST_DB_POOL_SIZE: int = 5
+    INGEST_DB_MAX_OVERFLOW: int = 10
+    MQTT_DRAIN_TIMEOUT: float = 5.0
+    # Отложенная запись состояний устройств: не дольше интервала или до порога
+    STATE_FLUSH_INTERVAL: float = 1.0
+    STATE_FLUSH_MAX_SIZE: int = 500
+    # Почасовые агрегаты истории сбрасываются в БД раз в интервал (секунды)
+    HISTORY_FLUSH_INTERVAL: float = 10.0
+    # Сырые значения (DeviceSample): пачки пишутся через COPY
+    RAW_SAMPLES_ENABLED: bool = True
+    RAW_SAMPLES_FLUSH_INTERVAL: float = 1.0
+    RAW_SAMPLES_FLUSH_MAX_SIZE: int = 5000
+    # Сколько значений держать в памяти, пока БД недоступна; старые отбрасываются
+    RAW_SAMPLES_BUFFER_LIMIT: int = 200000
+    # Суточные секции создаются на столько дней вперёд; 0 в RETENTION — хранить всё
+    RAW_SAMPLES_PARTITIONS_AHEAD: int = 2
+    RAW_SAMPLES_RETENTION_DAYS: int = 90
+    # Пересчёт уровня 1d из почасовых агрегатов раз в интервал (секунды)
+    HISTORY_COMPACT_INTERVAL: float = 60.0
+    # Зона нечувствительности по типу устройства (или префиксу типа): значение
+    # сохраняется, только если изменилось больше порога (абсолютного и/или в процентах),
+    # или с последнего сохранения прошло STATE_MAX_SILENCE секунд
+    STATE_DEADBAND_ABSOLUTE: dict[str, float] = {'DS18B20': 0.1, 'DHT': 0.2}
+    STATE_DEADBAND_PERCENT: dict[str, float] = {'MQ': 2.0}
+    STATE_MAX_SILENCE: float = 300.0
+    # Проверка триггеров на входящих значениях и публикация их действий
+    TRIGGERS_ENABLED: bool = True
+    # Потоковая раздача состояний: буфер подписчика (устройств) и интервал ping (секунды)
+    STREAM_BUFFER_SIZE: int = 256
+    STREAM_HEARTBEAT_INTERVAL: float = 15.0
+    # Шина изменений между процессами на Postgres LISTEN/NOTIFY (канал дополняется схемой)
+    CHANGE_BUS_ENABLED: bool = True
+    CHANGE_BUS_CHANNEL: str = 'iot_hub_changes'
+    CHANGE_BUS_RETRY_INTERVAL: float = 2.0
+    # Кэш аутентификации (токен → пользователь): размер и время жизни записи (секунды)
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL: float = 30
+    # Потоков для bcrypt: столько паролей хэшируется/проверяется одновременно
+    PASSWORD_HASH_WORKERS: int = 2
+    # Ограничения /devices/{id}/history: максимум корзин и число корзин по умолчанию
+    HISTORY_MAX_POINTS: int = 10000
+    HISTORY_DEFAULT_POINTS: int = 500
+    # Кэш контроллеров по топику (секунды); отрицательный результат живёт меньше
+    CONTROLLER_CACHE_SIZE: int = 10000
+    CONTROLLER_CACHE_TTL: float = 300
+    CONTROLLER_CACHE_NEGATIVE_TTL: float = 30
 
     @computed_field
     @property
@@ -69,6 +139,12 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = ''
     PROJECT_PATH: str = str(_base_path)
 
+    # Пул соединений (общий на процесс)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_TIMEOUT: int = 30
+
     @computed_field
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> PostgresDsn:
@@ -115,6 +191,8 @@ class Settings(BaseSettings):
     FIRST_SUPERUSER: EmailStr
     FIRST_SUPERUSER_PASSWORD: str
     TIME_ZONE: str = 'Europe/Moscow'
+    # Окно, за которое запросы /gettime собираются в одну пачку ответов (секунды)
+    TIME_SYNC_BATCH_WINDOW: float = 0.05
 
     @computed_field
     @property
@@ -1,77 +1,150 @@
+import asyncio
 import contextlib
+from collections.abc import Iterator, Sequence
 
-from sqlmodel import Session, create_engine, select, text
+from sqlalchemy import event
+from sqlmodel import Session, create_engine, select
 from sqlmodel.ext.asyncio.session import AsyncSession as AsyncSessionSQLModel
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 
 from app import crud
 from app.core.config import settings
 from app.models.user import User, UserCreate
 
-# Синхронный движок
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+# asyncpg ограничивает запрос 32767 параметрами: многострочные INSERT/VALUES режем на пачки
+MAX_ROWS_PER_STATEMENT = 1000
+
+
+def batched(rows: Sequence, size: int = MAX_ROWS_PER_STATEMENT) -> Iterator[Sequence]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _set_search_path(dbapi_connection, connection_record):
+    """
+    Устанавливает схему один раз на каждое новое соединение пула.
+    SET выполняется в autocommit, иначе он откатится вместе с первой транзакцией.
+    """
+    existing_autocommit = dbapi_connection.autocommit
+    dbapi_connection.autocommit = True
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"SET SESSION search_path TO {settings.POSTGRES_SCHEMA}")
+    cursor.close()
+    dbapi_connection.autocommit = existing_autocommit
 
 
 class DatabaseConnector:
-    @staticmethod
-    def get_engine():
+    """
+    Реестр движков: один синхронный и один асинхронный пул на процесс.
+    Создаётся в lifespan (init) и закрывается при остановке (dispose).
+    """
+    _engine = None
+    _sync_session_factory = None
+    _async_engine: AsyncEngine | None = None
+    _async_engine_loop: asyncio.AbstractEventLoop | None = None
+    _async_session_factory = None
+
+    @classmethod
+    def get_pool_options(cls) -> dict:
+        # Размер пула зависит от роли процесса: синхронный движок создаётся уже при импорте
+        ingest = settings.APP_ROLE == 'ingest'
+        return {
+            'pool_size': settings.INGEST_DB_POOL_SIZE if ingest else settings.DB_POOL_SIZE,
+            'max_overflow': settings.INGEST_DB_MAX_OVERFLOW if ingest else settings.DB_MAX_OVERFLOW,
+            'pool_recycle': settings.DB_POOL_RECYCLE,
+            'pool_timeout': settings.DB_POOL_TIMEOUT,
+            'pool_pre_ping': True,
+        }
+
+    @classmethod
+    def get_engine(cls):
         """Синхронный движок для основного кода"""
-        return create_engine(
-            str(settings.SQLALCHEMY_DATABASE_URI),
-            pool_pre_ping=True
-        )
+        if cls._engine is None:
+            cls._engine = create_engine(
+                str(settings.SQLALCHEMY_DATABASE_URI),
+                **cls.get_pool_options(),
+            )
+            cls._sync_session_factory = sessionmaker(
+                bind=cls._engine,
+                autocommit=False,
+                autoflush=False,
+                expire_on_commit=False
+            )
+        return cls._engine
 
-    @staticmethod
-    def get_async_engine():
-        """Асинхронный движок для основного кода"""
+    @classmethod
+    def create_async_engine(cls) -> AsyncEngine:
         uri = str(settings.SQLALCHEMY_DATABASE_URI)
         if 'options' in uri:
             uri = uri.split('?')[0]
-        return create_async_engine(
+        async_engine = create_async_engine(
             uri.replace(
                 "postgresql+psycopg",
                 "postgresql+asyncpg"
             ),
-            pool_pre_ping=True,
-            echo=False  # settings.DEBUG
+            echo=False,  # settings.DEBUG
+            **cls.get_pool_options(),
         )
+        # asyncpg не понимает options=-csearch_path, поэтому схема ставится на connect
+        event.listen(async_engine.sync_engine, 'connect', _set_search_path)
+        return async_engine
+
+    @classmethod
+    def get_async_engine(cls) -> AsyncEngine:
+        """Асинхронный движок для основного кода"""
+        loop = asyncio.get_running_loop()
+        if cls._async_engine is None or cls._async_engine_loop is not loop:
+            if cls._async_engine is not None:
+                # Пул привязан к циклу событий, в котором создан (pytest-asyncio, TestClient).
+                # Соединения чужого цикла закрыть нельзя — просто отпускаем их.
+                cls._async_engine.sync_engine.dispose(close=False)
+            cls._async_engine = cls.create_async_engine()
+            cls._async_engine_loop = loop
+            cls._async_session_factory = async_sessionmaker(
+                bind=cls._async_engine,
+                autocommit=False,
+                autoflush=False,
+                expire_on_commit=False
+            )
+        return cls._async_engine
+
+    @classmethod
+    def init(cls) -> None:
+        """Создаёт движки заранее (вызывается из lifespan внутри цикла событий)"""
+        cls.get_engine()
+        cls.get_async_engine()
+
+    @classmethod
+    async def dispose(cls) -> None:
+        """Закрывает пулы соединений при остановке приложения"""
+        if cls._async_engine is not None:
+            await cls._async_engine.dispose()
+            cls._async_engine = None
+            cls._async_engine_loop = None
+            cls._async_session_factory = None
+        if cls._engine is not None:
+            cls._engine.dispose()
 
     @classmethod
     @contextlib.contextmanager
     def get_sync_session(cls):
         """Синхронная сессия (для CLI, миграций и т.д.)"""
-        engine = cls.get_engine()
-        Session = sessionmaker(
-            bind=engine,
-            autocommit=False,
-            autoflush=False,
-            expire_on_commit=False
-        )
-        with Session() as session:
-            try:
-                yield session
-            finally:
-                session.close()
+        cls.get_engine()
+        with cls._sync_session_factory() as session:
+            yield session
 
     @classmethod
     @contextlib.asynccontextmanager
     async def get_async_session(cls):
         """Основная асинхронная сессия для приложения"""
-        async_engine = cls.get_async_engine()
-        AsyncSession = async_sessionmaker(
-            bind=async_engine,
-            autocommit=False,
-            autoflush=False,
-            expire_on_commit=False
-        )
-        async with AsyncSession() as session:
-            try:
-                # Устанавливаем схему из настроек
-                await session.execute(text(f"SET search_path TO {settings.POSTGRES_SCHEMA}"))
-                yield session
-            finally:
-                await session.close()
+        cls.get_async_engine()
+        async with cls._async_session_factory() as session:
+            yield session
+
+
+# Синхронный движок
+engine = DatabaseConnector.get_engine()
 
 # Глобальные фабрики сессий
 SyncSession = DatabaseConnector.get_sync_session
@@ -8,10 +8,21 @@ from app.models.user import User, UserCreate, UserUpdate
 from app.models.item import ItemCreate, Item
 
 
+def build_user(user_create: UserCreate, hashed_password: str) -> User:
+    """Новый пользователь; хэш пароля считает вызывающий (синхронно или в пуле)"""
+    return User.model_validate(user_create, update={"hashed_password": hashed_password})
+
+
+def apply_user_update(db_user: User, user_in: UserUpdate, hashed_password: str | None = None) -> User:
+    """Переносит изменения user_in; hashed_password — хэш user_in.password, если он задан"""
+    user_data = user_in.model_dump(exclude_unset=True)
+    extra_data = {"hashed_password": hashed_password} if hashed_password else {}
+    db_user.sqlmodel_update(user_data, update=extra_data)
+    return db_user
+
+
 def create_user(*, session: Session, user_create: UserCreate) -> User:
-    db_obj = User.model_validate(
-        user_create, update={"hashed_password": get_password_hash(user_create.password)}
-    )
+    db_obj = build_user(user_create, get_password_hash(user_create.password))
     session.add(db_obj)
     session.commit()
     session.refresh(db_obj)
@@ -19,13 +30,8 @@ def create_user(*, session: Session, user_create: UserCreate) -> User:
 
 
 def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
-    user_data = user_in.model_dump(exclude_unset=True)
-    extra_data = {}
-    if "password" in user_data:
-        password = user_data["password"]
-        hashed_password = get_password_hash(password)
-        extra_data["hashed_password"] = hashed_password
-    db_user.sqlmodel_update(user_data, update=extra_data)
+    hashed_password = get_password_hash(user_in.password) if user_in.password else None
+    apply_user_update(db_user, user_in, hashed_password)
     session.add(db_user)
     session.commit()
     session.refresh(db_user)
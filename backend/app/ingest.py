@@ -0,0 +1,41 @@
+"""
+Отдельный процесс обработки MQTT-сообщений, без HTTP API:
+
+    python -m app.ingest
+
+API в этом случае запускается с APP_ROLE=api и держит только клиент для публикации.
+"""
+import asyncio
+import os
+import signal
+
+# Роль — до создания Settings: по ней выбирается пул БД, а синхронный движок создаётся при импорте app.core.db
+os.environ.setdefault('APP_ROLE', 'ingest')
+
+from app.core.config import settings  # noqa: E402
+from app.core.setup_logger import setup_logger  # noqa: E402
+from app.mqtt.mqtt_client import mqtt_pipeline  # noqa: E402
+
+logger = setup_logger(__name__)
+
+
+async def run_ingest() -> None:
+    if settings.APP_ROLE != 'ingest':
+        logger.warning(f"APP_ROLE={settings.APP_ROLE} is set for the ingest worker: the API pool size is used")
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with mqtt_pipeline(ingest=True):
+        logger.info(f"Ingest worker started (mode: {settings.MQTT_INGEST_MODE})")
+        await stop.wait()
+    logger.info("Ingest worker stopped")
+
+
+def main() -> None:
+    asyncio.run(run_ingest())
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ from .controller_board import ControllerBoard
 from .device import Device
 from .device_state import DeviceState
 from .trigger import Trigger
-from .device_history import DeviceHistory
+from .device_history import DeviceHistory, DeviceHistoryDay, DeviceHistoryMinute
 
 ControllerBoard.model_rebuild()
 Device.model_rebuild()
@@ -3,6 +3,8 @@ from datetime import datetime
 from sqlmodel import Field, SQLModel, Relationship, Column, DateTime, func
 from typing import Optional, List
 
+from app.models.device_state import DeviceStatePublic
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -15,6 +17,8 @@ class ControllerBoardBase(SQLModel):
     period: int = Field(default=60, nullable=False)
     description: str = Field(max_length=255, nullable=True, default='')
     access_key: str = Field(max_length=32, nullable=False, default='')
+    # Часовой пояс для /gettime; None — settings.TIME_ZONE
+    time_zone: Optional[str] = Field(max_length=64, nullable=True, default=None)
 
 class ControllerBoard(ControllerBoardBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -43,6 +47,8 @@ class ControllerBoardPublic(ControllerBoardBase):
     id: int
     created_at: datetime
     updated_at: datetime
+    # Заполняется только при запросе /boards?with_states=true
+    states: Optional[list[DeviceStatePublic]] = None
 
 class ControllerBoardsPublic(SQLModel):
     data: list[ControllerBoardPublic]
@@ -2,13 +2,19 @@ from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional
 from datetime import datetime
 
+
 class DeviceHistoryBase(SQLModel):
+    """Почасовой агрегат значений параметра устройства"""
     device_id: int = Field(foreign_key="device.id", primary_key=True)
+    parameter: str = Field(max_length=32, default='', primary_key=True)
+    hour: datetime = Field(default_factory=datetime.now, primary_key=True)
     min_value: Optional[float] = None
     max_value: Optional[float] = None
+    sum_value: float = 0
+    count: int = 0
+    last_value: Optional[float] = None
     value: Optional[str] = None
     status: Optional[str] = None
-    hour: datetime = Field(default_factory=datetime.now, nullable=False)
     last_updated: datetime = Field(default_factory=datetime.now, nullable=False)
 
 class DeviceHistory(DeviceHistoryBase, table=True):
@@ -17,18 +23,41 @@ class DeviceHistory(DeviceHistoryBase, table=True):
 class DeviceHistoryPublic(DeviceHistoryBase):
     device_name: str
     device_type: str
+    avg_value: Optional[float] = None
 
     @classmethod
     def from_db_history(cls, db_history: DeviceHistory):
         return cls(
-            device_id=db_history.device_id,
+            **db_history.model_dump(),
             device_name=db_history.device.name,
             device_type=db_history.device.type,
-            min_value=db_history.min_value,
-            max_value=db_history.max_value,
-            relay_on_count=db_history.relay_on_count,
-            relay_off_count=db_history.relay_off_count,
-            rfid_success_count=db_history.rfid_success_count,
-            rfid_fail_count=db_history.rfid_fail_count,
-            last_updated=db_history.last_updated
+            avg_value=db_history.sum_value / db_history.count if db_history.count else None,
         )
+
+
+class DeviceHistoryRollupBase(SQLModel):
+    """Агрегат значений параметра устройства за интервал bucket (уровни 1m и 1d)"""
+    device_id: int = Field(foreign_key="device.id", primary_key=True, ondelete='CASCADE')
+    parameter: str = Field(max_length=32, default='', primary_key=True)
+    bucket: datetime = Field(primary_key=True)
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    sum_value: float = 0
+    count: int = 0
+    last_value: Optional[float] = None
+    last_updated: datetime = Field(default_factory=datetime.now, nullable=False)
+
+class DeviceHistoryMinute(DeviceHistoryRollupBase, table=True):
+    pass
+
+class DeviceHistoryDay(DeviceHistoryRollupBase, table=True):
+    pass
+
+class DeviceHistorySeries(SQLModel):
+    """Ряд истории в колоночном виде: time[i] соответствует values[agg][i]"""
+    device_id: int
+    parameter: str
+    tier: str
+    bucket: int  # ширина корзины, секунды
+    time: list[datetime]
+    values: dict[str, list[Optional[float]]]
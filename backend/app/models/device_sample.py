@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import Column, ForeignKey, Index, Integer
+from sqlmodel import Field, SQLModel
+
+
+class DeviceSample(SQLModel, table=True):
+    """
+    Сырые значения параметров устройств: только добавление, без обновлений.
+    Таблица секционирована по ts (RANGE, одна секция на сутки), секции создаёт
+    SampleWriter перед записью пачки.
+    Первичного ключа в БД нет, чтобы COPY не проверял уникальность и повторы
+    с одинаковым ts не роняли пачку; ORM он нужен — объявлен только в маппере.
+    """
+    __table_args__ = (
+        Index('ix_devicesample_device_parameter_ts', 'device_id', 'parameter', 'ts'),
+        {'postgresql_partition_by': 'RANGE (ts)'},
+    )
+    __mapper_args__ = {'primary_key': ['device_id', 'parameter', 'ts']}
+
+    device_id: int = Field(
+        sa_column=Column(Integer, ForeignKey('device.id', ondelete='CASCADE'), nullable=False)
+    )
+    parameter: str = Field(max_length=32, default='', sa_column_kwargs={'server_default': ''})
+    ts: datetime
+    value: float
@@ -7,6 +7,8 @@ class DeviceStateBase(SQLModel):
     parameter: Optional[str] = Field(max_length=32, default=None)
     value: float
     last_updated: datetime = Field(default_factory=datetime.now)
+    # Время последнего сообщения; last_updated — последнего сохранённого изменения
+    last_seen: Optional[datetime] = Field(default=None)
 
 class DeviceStateCreate(DeviceStateBase):
     device_id: int
@@ -28,6 +30,7 @@ class DeviceStatePublic(SQLModel):
     parameter: Optional[str]
     value: float
     last_updated: datetime
+    last_seen: Optional[datetime] = None
 
     @classmethod
     def from_db_state(cls, db_state: DeviceState):
@@ -39,7 +42,8 @@ class DeviceStatePublic(SQLModel):
             device_description=db_state.device.description,
             parameter=db_state.parameter,
             value=db_state.value,
-            last_updated=db_state.last_updated
+            last_updated=db_state.last_updated,
+            last_seen=db_state.last_seen,
         )
 
 class DeviceStatesPublic(SQLModel):
@@ -0,0 +1,127 @@
+# app/mqtt/dispatcher.py
+import asyncio
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from app.core.config import settings
+from app.core.setup_logger import setup_logger
+from app.mqtt.ingest_queue import IngestQueue, QueuePolicy
+from app.services.utils import get_root_topic
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class ShardStats:
+    processed: int = 0
+    errors: int = 0
+    busy_time: float = 0.0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+
+
+class MessageDispatcher:
+    """
+    Раздаёт входящие сообщения по шардам с отдельной очередью и воркером.
+    Шард выбирается по корневому топику контроллера, поэтому сообщения
+    одного контроллера обрабатываются по порядку, а разных — параллельно.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[None]],
+        workers: int | None = None,
+        queue_size: int | None = None,
+        policy: QueuePolicy | None = None,
+    ):
+        self._handler = handler
+        self.workers = workers or settings.MQTT_WORKERS
+        self.queue_size = queue_size or settings.MQTT_SHARD_QUEUE_SIZE
+        self.policy = policy or settings.MQTT_QUEUE_POLICY
+        self._queues: list[IngestQueue] = []
+        self._stats: list[ShardStats] = []
+        self._tasks: list[asyncio.Task] = []
+
+    def get_shard(self, topic: str) -> int:
+        # crc32 стабилен между процессами, в отличие от hash()
+        return zlib.crc32(get_root_topic(topic).encode()) % self.workers
+
+    async def start(self) -> None:
+        self._queues = [IngestQueue(self.queue_size, self.policy) for _ in range(self.workers)]
+        self._stats = [ShardStats() for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.create_task(self._worker(shard), name=f'mqtt-shard-{shard}')
+            for shard in range(self.workers)
+        ]
+        logger.info(f'Dispatcher started with {self.workers} workers')
+
+    async def submit(self, message) -> None:
+        """Ставит сообщение в очередь шарда; при переполнении действует политика очереди."""
+        topic = str(message.topic)
+        await self._queues[self.get_shard(topic)].put(topic, (time.monotonic(), message))
+
+    async def _worker(self, shard: int) -> None:
+        queue = self._queues[shard]
+        stats = self._stats[shard]
+        while True:
+            enqueued_at, message = await queue.get()
+            started = time.monotonic()
+            stats.last_lag = started - enqueued_at
+            stats.max_lag = max(stats.max_lag, stats.last_lag)
+            try:
+                await self._handler(message)
+            except Exception as e:
+                stats.errors += 1
+                logger.error(f'Failed to handle message from {message.topic}: {e}')
+            finally:
+                stats.busy_time += time.monotonic() - started
+                stats.processed += 1
+                queue.task_done()
+
+    async def stop(self, timeout: float | None = None) -> None:
+        """Дожидается разбора очередей (не дольше timeout) и останавливает воркеры."""
+        timeout = settings.MQTT_DRAIN_TIMEOUT if timeout is None else timeout
+        if self._queues:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(queue.join() for queue in self._queues)),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f'Dispatcher stopped with {self.queue_depth()} unprocessed messages')
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def queue_depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        shards = []
+        for shard, (queue, stats) in enumerate(zip(self._queues, self._stats)):
+            elapsed = now - stats.started_at
+            shards.append({
+                'shard': shard,
+                'depth': queue.qsize(),
+                'processed': stats.processed,
+                'dropped': queue.dropped,
+                'coalesced': queue.coalesced,
+                'errors': stats.errors,
+                'last_lag': round(stats.last_lag, 6),
+                'max_lag': round(stats.max_lag, 6),
+                'utilisation': round(stats.busy_time / elapsed, 4) if elapsed > 0 else 0.0,
+            })
+        return {
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'policy': self.policy,
+            'depth': self.queue_depth(),
+            'dropped': sum(queue.dropped for queue in self._queues),
+            'coalesced': sum(queue.coalesced for queue in self._queues),
+            'shards': shards,
+        }
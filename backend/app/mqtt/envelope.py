@@ -0,0 +1,64 @@
+# app/mqtt/envelope.py
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson — необязательная зависимость (extra "fast-json")
+    orjson = None
+
+_NOT_PARSED = object()
+
+
+def loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+class MessageEnvelope:
+    """
+    Входящее MQTT-сообщение с однократным разбором payload.
+    Байты разбираются в dict один раз, без промежуточного decode() и повторного json.loads.
+    """
+    __slots__ = ('topic', 'payload', '_text', '_data')
+
+    def __init__(self, topic: str, payload: bytes | bytearray | str):
+        self.topic = topic
+        self.payload = payload
+        self._text: str | None = None
+        self._data: Any = _NOT_PARSED
+
+    @classmethod
+    def from_message(cls, message) -> 'MessageEnvelope':
+        return cls(str(message.topic), message.payload)
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            payload = self.payload
+            if isinstance(payload, (bytes, bytearray)):
+                self._text = bytes(payload).decode()
+            else:
+                self._text = '' if payload is None else str(payload)
+        return self._text
+
+    @property
+    def data(self) -> dict | None:
+        """payload как dict; None, если это не JSON-объект"""
+        if self._data is _NOT_PARSED:
+            try:
+                data = loads(self.payload)
+            except (ValueError, TypeError):
+                data = None
+            self._data = data if isinstance(data, dict) else None
+        return self._data
+
+    def __str__(self) -> str:
+        return self.text
@@ -0,0 +1,68 @@
+# app/mqtt/ingest_queue.py
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import Any, Literal
+
+QueuePolicy = Literal['block', 'drop_oldest', 'latest']
+
+
+class IngestQueue:
+    """
+    Ограниченная очередь входящих сообщений с политикой переполнения:
+    - block — put() ждёт освобождения места (давление назад до брокера);
+    - drop_oldest — вытесняется самое старое сообщение;
+    - latest — в очереди остаётся только последнее сообщение по каждому топику
+      (оно занимает место первого), при переполнении вытесняется самое старое.
+    """
+
+    def __init__(self, maxsize: int, policy: QueuePolicy = 'block'):
+        if policy not in ('block', 'drop_oldest', 'latest'):
+            raise ValueError(f'Unknown queue policy: {policy}')
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self.coalesced = 0
+        self._items: OrderedDict[Any, Any] = OrderedDict()
+        self._seq = itertools.count()
+        self._changed = asyncio.Condition()
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    async def put(self, topic: str, item: Any) -> None:
+        async with self._changed:
+            if self.policy == 'latest' and topic in self._items:
+                self._items[topic] = item
+                self.coalesced += 1
+                return
+            if len(self._items) >= self.maxsize:
+                if self.policy == 'block':
+                    await self._changed.wait_for(lambda: len(self._items) < self.maxsize)
+                else:
+                    self._items.popitem(last=False)
+                    self.dropped += 1
+                    self._unfinished -= 1
+            key = topic if self.policy == 'latest' else next(self._seq)
+            self._items[key] = item
+            self._unfinished += 1
+            self._finished.clear()
+            self._changed.notify_all()
+
+    async def get(self) -> Any:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._items)
+            _, item = self._items.popitem(last=False)
+            self._changed.notify_all()
+            return item
+
+    def task_done(self) -> None:
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._finished.set()
+
+    async def join(self) -> None:
+        await self._finished.wait()
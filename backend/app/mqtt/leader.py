@@ -0,0 +1,78 @@
+# app/mqtt/leader.py
+import asyncio
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.db import DatabaseConnector
+from app.core.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class AdvisoryLockLeader:
+    """
+    Выбор ведущего процесса через pg_try_advisory_lock.
+    Блокировка сессионная и живёт, пока открыто выделенное соединение:
+    если процесс или соединение умирают, лидерство забирает другой процесс.
+
+        async with leader:
+            ...  # только один процесс одновременно
+    """
+
+    def __init__(self, lock_id: int | None = None, retry_interval: float | None = None):
+        self.lock_id = lock_id if lock_id is not None else settings.MQTT_LEADER_LOCK_ID
+        self.retry_interval = retry_interval or settings.MQTT_LEADER_RETRY_INTERVAL
+        self._connection = None
+
+    async def _try_acquire(self) -> bool:
+        connection = await DatabaseConnector.get_async_engine().connect()
+        try:
+            # autocommit: соединение не висит "idle in transaction", пока держит блокировку
+            await connection.execution_options(isolation_level='AUTOCOMMIT')
+            acquired = await connection.scalar(
+                text('SELECT pg_try_advisory_lock(:lock_id)'), {'lock_id': self.lock_id}
+            )
+        except Exception:
+            await connection.close()
+            raise
+        if not acquired:
+            await connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    async def __aenter__(self) -> 'AdvisoryLockLeader':
+        logger.info(f'Waiting for ingest leadership (advisory lock {self.lock_id})')
+        while True:
+            try:
+                if await self._try_acquire():
+                    logger.info('Acquired ingest leadership')
+                    return self
+            except Exception as e:
+                logger.error(f'Failed to acquire advisory lock: {e}')
+            await asyncio.sleep(self.retry_interval)
+
+    async def wait_lost(self) -> None:
+        """Завершается, когда соединение с блокировкой перестаёт отвечать"""
+        while True:
+            await asyncio.sleep(self.retry_interval)
+            try:
+                await self._connection.scalar(text('SELECT 1'))
+            except Exception as e:
+                logger.error(f'Lost ingest leadership: {e}')
+                return
+
+    async def __aexit__(self, *exc_info) -> None:
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        try:
+            await connection.execute(
+                text('SELECT pg_advisory_unlock(:lock_id)'), {'lock_id': self.lock_id}
+            )
+            await connection.close()
+        except Exception:
+            # Соединение уже сломано — не возвращаем его в пул, блокировка снимется вместе с ним
+            await connection.invalidate()
+        logger.info('Released ingest leadership')
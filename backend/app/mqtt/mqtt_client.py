@@ -7,37 +7,113 @@ from typing import Optional
 
 import aiomqtt
 from fastapi import FastAPI, Depends
+from paho.mqtt.subscribeoptions import SubscribeOptions
 
 from app.core.config import settings
+from app.core.db import AsyncSession, DatabaseConnector
 from app.core.setup_logger import setup_logger
+from app.mqtt.dispatcher import MessageDispatcher
+from app.mqtt.leader import AdvisoryLockLeader
 from app.mqtt.mqtt_messages import handle_message
+from app.services.change_bus import change_bus
+from app.services.device_registry import device_registry
+from app.services.history_services import history_aggregator, minute_history_aggregator
+from app.services.history_tiers import history_compactor
+from app.services.sample_writer import sample_writer
+from app.services.state_buffer import state_buffer
+from app.services.state_cache import state_cache
+from app.services.time_sync import time_sync
+from app.services.trigger_engine import trigger_engine
+from app.services.utils import is_command_topic
 
 logger = setup_logger(__name__)
 
 class MQTTClientManager:
-    def __init__(self):
+    def __init__(self, ingest: bool = True):
+        # ingest=False — только публикация команд (роль api)
+        self.ingest = ingest
         self.client: Optional[aiomqtt.Client] = None
+        # stop() обнуляет self.client, а воркеры ещё дорабатывают очередь
+        self._subscriber: Optional[aiomqtt.Client] = None
         self._should_stop = asyncio.Event()
+        self.dispatcher = MessageDispatcher(self._handle)
+        self.filtered = 0
 
     def create_client(self) -> aiomqtt.Client:
+        use_v5 = settings.MQTT_INGEST_MODE == 'shared' or settings.MQTT_NO_LOCAL
+        protocol = aiomqtt.ProtocolVersion.V5 if use_v5 else None
         return aiomqtt.Client(
             hostname=settings.RABBITMQ_HOST,
             port=int(settings.RABBITMQ_PORT),
             username=settings.RABBITMQ_USER,
             password=settings.RABBITMQ_PASSWORD,
+            protocol=protocol,
+            max_queued_incoming_messages=settings.MQTT_MAX_QUEUED_INCOMING,
         )
 
+    @staticmethod
+    def get_subscription_topic() -> str:
+        if settings.MQTT_INGEST_MODE == 'shared':
+            return f'$share/{settings.MQTT_SHARED_GROUP}/{settings.TOPIC}'
+        return settings.TOPIC
+
+    async def _handle(self, message):
+        await handle_message(self._subscriber, message)
+
+    @staticmethod
+    def get_subscribe_options() -> SubscribeOptions | None:
+        if settings.MQTT_NO_LOCAL and settings.MQTT_INGEST_MODE != 'shared':
+            return SubscribeOptions(noLocal=True)
+        return None
+
+    async def _consume(self):
+        topic = self.get_subscription_topic()
+        await self._subscriber.subscribe(topic, options=self.get_subscribe_options())
+        logger.info(f"Subscribed to topic: {topic}")
+        await self.dispatcher.start()
+        try:
+            async for message in self._subscriber.messages:
+                if self._should_stop.is_set():
+                    break
+                # Эхо наших собственных команд отбрасываем до очереди и разбора payload
+                if is_command_topic(message.topic.value):
+                    self.filtered += 1
+                    continue
+                await self.dispatcher.submit(message)
+        finally:
+            await self.dispatcher.stop()
+            # Ответы на /gettime, пришедшие до остановки, уходят, пока клиент ещё подключён
+            await time_sync.stop()
+
+    async def _consume_as_leader(self):
+        """Подписывается, только пока процесс владеет блокировкой; при потере — ждёт снова"""
+        leader = AdvisoryLockLeader()
+        while not self._should_stop.is_set():
+            async with leader:
+                consume = asyncio.create_task(self._consume())
+                lost = asyncio.create_task(leader.wait_lost())
+                try:
+                    done, _ = await asyncio.wait({consume, lost}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    for task in (consume, lost):
+                        task.cancel()
+                    await asyncio.gather(consume, lost, return_exceptions=True)
+                if consume in done:
+                    consume.result()
+                    return
+                await self._subscriber.unsubscribe(self.get_subscription_topic())
+
     async def start(self):
         try:
-            self.client = self.create_client()
+            self.client = self._subscriber = self.create_client()
             async with self.client:
                 logger.info("Connected to MQTT Broker!")
-                await self.client.subscribe(settings.TOPIC)
-                logger.info(f"Subscribed to topic: {settings.TOPIC}")
-                async for message in self.client.messages:
-                    if self._should_stop.is_set():
-                        break
-                    await handle_message(self.client, message)
+                if not self.ingest:
+                    await self._should_stop.wait()
+                elif settings.MQTT_INGEST_MODE == 'leader':
+                    await self._consume_as_leader()
+                else:
+                    await self._consume()
         except aiomqtt.MqttError as e:
             logger.error(f"MQTT error: {e}")
         except Exception as e:
@@ -61,14 +137,45 @@ class MQTTClientManager:
             raise
 
 
+async def warm_up_caches() -> None:
+    try:
+        async with AsyncSession() as session:
+            await device_registry.load(session)
+    except Exception as e:
+        # Без реестра обработка сообщений работает через запросы к БД
+        logger.error(f"Failed to load device registry: {e}")
+    if settings.TRIGGERS_ENABLED:
+        try:
+            async with AsyncSession() as session:
+                await trigger_engine.load(session)
+        except Exception as e:
+            logger.error(f"Failed to load triggers: {e}")
+
+
 @asynccontextmanager
-async def lifespan(app: FastAPI):
-    manager = MQTTClientManager()
-    app.state.mqtt_manager = manager
+async def mqtt_pipeline(ingest: bool = True):
+    """
+    Запускает MQTT-клиент; при ingest=True — вместе с обработкой входящих сообщений
+    (кэши, буфер состояний). Используется lifespan API и процессом app.ingest.
+    """
+    DatabaseConnector.init()
+    if settings.CHANGE_BUS_ENABLED:
+        await change_bus.start()
+    if ingest:
+        await warm_up_caches()
+        await state_buffer.start()
+        await history_aggregator.start()
+        await minute_history_aggregator.start()
+        if settings.RAW_SAMPLES_ENABLED:
+            await sample_writer.start()
+        await history_compactor.start()
+    manager = MQTTClientManager(ingest=ingest)
+    if ingest:
+        trigger_engine.set_publisher(manager.send_mqtt_message)
     task = asyncio.create_task(manager.start())
 
     try:
-        yield
+        yield manager
     finally:
         await manager.stop()
         task.cancel()
@@ -76,4 +183,40 @@ async def lifespan(app: FastAPI):
             await task
         except asyncio.CancelledError:
             pass
-        logger.info("Lifespan shutdown complete")
+        if ingest:
+            trigger_engine.set_publisher(None)
+            await time_sync.stop()
+            await history_compactor.stop()
+            await state_buffer.stop()
+            await history_aggregator.stop()
+            await minute_history_aggregator.stop()
+            await sample_writer.stop()
+        await change_bus.stop()
+        await DatabaseConnector.dispose()
+
+
+async def warm_up_state_cache() -> None:
+    try:
+        async with AsyncSession() as session:
+            await state_cache.load(session)
+    except Exception as e:
+        # Холодный кэш заполнится по контроллерам при первых запросах
+        logger.error(f"Failed to load state cache: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.APP_ROLE == 'ingest':
+        raise RuntimeError("APP_ROLE=ingest is reserved for `python -m app.ingest`; run the API with APP_ROLE=all or api")
+    ingest = settings.APP_ROLE == 'all'
+    async with mqtt_pipeline(ingest=ingest) as manager:
+        app.state.mqtt_manager = manager
+        # Кэш состояний полон, если этот процесс получает все сообщения или изменения по шине
+        state_cache.serving = True
+        state_cache.local_ingest = ingest and settings.MQTT_INGEST_MODE == 'all'
+        if state_cache.authoritative:
+            await warm_up_state_cache()
+        yield
+        state_cache.serving = state_cache.local_ingest = False
+        state_cache.clear()
+    logger.info("Lifespan shutdown complete")
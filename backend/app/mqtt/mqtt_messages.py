@@ -1,20 +1,25 @@
 import json
 import secrets
 from datetime import datetime
-import pytz
 from app.core.db import engine, AsyncSession
 from sqlmodel import Session
 from app.core.config import settings
 from app.core.setup_logger import setup_logger
-from app.repositories.controller_board_repository import create_or_update_controller_board
 from app.models.controller_file_request import ControllerFileRequest
 from app.repositories.controller_file_request_repository import create_controller_file_request
+from app.mqtt.envelope import MessageEnvelope
+from app.mqtt.router import TopicRouter
+from app.services.controller_boards import save_controller_board
+from app.services.controller_cache import controller_cache
 from app.services.process_messages import process_state_message
-from app.services.utils import is_json, get_root_topic
+from app.services.time_sync import time_sync
+from app.services.utils import get_root_topic
 import aiomqtt
 
 logger = setup_logger(__name__)
 
+router = TopicRouter()
+
 async def request_file_from_controller(client: aiomqtt.Client, device_topic: str, filename: str):
     """
     Формирует сообщение для запроса файла и регистрирует его в таблице ControllerFileRequest.
@@ -51,18 +56,16 @@ async def request_file_from_controller(client: aiomqtt.Client, device_topic: str
     logger.info(f'Sent sendFile command to {send_file_topic}')
 
 
-async def handle_startup(client: aiomqtt.Client, topic: str, payload: str):
+async def handle_startup(client: aiomqtt.Client, topic: str, payload_dict: dict | None):
     '''
     Обрабатывает сообщение /startup и отправляет команду на получение файлов.
     '''
-    try:
-        payload_dict = json.loads(payload)
-        device_ip = payload_dict.get('IP')
-        device_topic = payload_dict.get('topic', topic.rsplit('/', 1)[0]).rstrip('/')  # Убираем слэш
-        online_time = payload_dict.get('online')
-    except json.JSONDecodeError as e:
-        logger.error(f'Failed to decode startup payload: {e}')
+    if payload_dict is None:
+        logger.error(f'Failed to decode startup payload from {topic}')
         return
+    device_ip = payload_dict.get('IP')
+    device_topic = payload_dict.get('topic', topic.rsplit('/', 1)[0]).rstrip('/')  # Убираем слэш
+    online_time = payload_dict.get('online')
 
     # Запрашиваем два файла: devices.json и mqtt.json
     await request_file_from_controller(client, device_topic, 'devices.json')
@@ -70,7 +73,7 @@ async def handle_startup(client: aiomqtt.Client, topic: str, payload: str):
 
     # Регистрируем в таблице модели ControllerBoard
     async with AsyncSession() as session:
-        await create_or_update_controller_board(
+        await save_controller_board(
             session=session,
             topic=device_topic,
             ip=device_ip,
@@ -85,55 +88,43 @@ async def handle_gettime(client: aiomqtt.Client, topic: str):
     # Формируем топик для ответа
     response_topic = topic.replace('/gettime', '/set/time')
 
-    # Получаем текущее время
-    timezone = pytz.timezone('Europe/Moscow')
-    current_time = datetime.now(timezone)
-
-    # Формируем ответ в JSON
-    time_data = {
-        "abbreviation": "MSK",
-        "client_ip": "0.0.0.0",  # Можно оставить заглушку
-        "datetime": current_time.isoformat(),
-        "day_of_week": str(current_time.weekday() + 1),  # 1-7 (понедельник-воскресенье)
-        "day_of_year": str(current_time.timetuple().tm_yday),
-        "dst": False,
-        "dst_from": None,
-        "dst_offset": 0,
-        "dst_until": None,
-        "raw_offset": 10800,
-        "timezone": "Europe/Moscow",
-        "unixtime": int(current_time.timestamp()),
-        "utc_datetime": current_time.astimezone(pytz.utc).isoformat(),
-        "utc_offset": "+03:00",
-        "week_number": str(current_time.isocalendar()[1]),
-    }
+    # Часовой пояс контроллера (из кэша), по умолчанию — settings.TIME_ZONE
+    async with AsyncSession() as session:
+        controller = await controller_cache.get(session=session, topic=get_root_topic(topic))
+    time_sync.request(client, response_topic, controller.time_zone if controller else None)
+
+
+@router.route('#/gettime')
+async def on_gettime(client: aiomqtt.Client, envelope: MessageEnvelope):
+    await handle_gettime(client, envelope.topic)
 
-    # Отправляем ответ устройству
-    await client.publish(response_topic, json.dumps(time_data))
-    logger.info(f"Sent time data to {response_topic}")
+
+@router.route('#/startup')
+async def on_startup(client: aiomqtt.Client, envelope: MessageEnvelope):
+    logger.info("Received `%s` from `%s` topic", envelope, envelope.topic)
+    await handle_startup(client, envelope.topic, envelope.data)
+
+
+@router.default
+async def on_state(client: aiomqtt.Client, envelope: MessageEnvelope):
+    # Логируем и сохраняем сообщение в базу данных
+    payload_dict = envelope.data
+    if payload_dict is not None:
+        # save_to_db(topic, payload)
+        root_topic = get_root_topic(envelope.topic)
+        logger.info("Received `%s` from `%s` topic", envelope, envelope.topic)
+        await process_state_message(payload=payload_dict, topic=root_topic)
 
 
 async def handle_message(client: aiomqtt.Client, message):
     """
     Обрабатывает входящие сообщения.
     """
-    topic = str(message.topic)
-    payload = message.payload.decode()
-
-    # Если запрос на получение времени
-    if topic.endswith("/gettime"):
-        await handle_gettime(client, topic)
-    elif topic.endswith("/startup"):
-        logger.info(f"Received `{payload}` from `{topic}` topic")
-        await handle_startup(client, topic, payload)
-    else:
-        # Логируем и сохраняем сообщение в базу данных
-        if is_json(payload):
-            # save_to_db(topic, payload)
-            root_topic = get_root_topic(topic)
-            payload_dict = json.loads(payload)
-            logger.info(f"Received `{payload}` from `{topic}` topic")
-            await process_state_message(payload=payload_dict, topic=root_topic)
+    envelope = message if isinstance(message, MessageEnvelope) else MessageEnvelope.from_message(message)
+
+    handler = router.resolve(envelope.topic)
+    if handler is not None:
+        await handler(client, envelope)
 
 
 # def save_to_db(topic: str, payload: str):
@@ -0,0 +1,84 @@
+# app/mqtt/router.py
+from typing import Any, Awaitable, Callable, Optional
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+class _Node:
+    __slots__ = ('children', 'handler')
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        self.handler: Optional[Handler] = None
+
+
+class TopicRouter:
+    """
+    Маршрутизатор топиков на префиксном дереве по сегментам.
+
+    Шаблоны в стиле MQTT: '+' — ровно один сегмент, '#' — любое число сегментов.
+    '#' в конце шаблона — совпадение по префиксу ('flat/+/ctrl/#'),
+    '#' в начале — совпадение по суффиксу ('#/gettime'); такие шаблоны хранятся
+    в отдельном дереве развёрнутыми, так что поиск в обоих случаях идёт за O(глубины).
+    Порядок: префиксные/точные шаблоны, затем суффиксные, затем обработчик по умолчанию.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._suffix_root = _Node()
+        self._default: Optional[Handler] = None
+
+    def add(self, pattern: str, handler: Handler) -> None:
+        segments = pattern.split('/')
+        if segments[0] == '#' and len(segments) > 1:
+            root, segments = self._suffix_root, list(reversed(segments[1:])) + ['#']
+        else:
+            root = self._root
+        if '#' in segments[:-1]:
+            raise ValueError(f"'#' must be the first or the last segment: {pattern}")
+        node = root
+        for segment in segments:
+            node = node.children.setdefault(segment, _Node())
+        if node.handler is not None:
+            raise ValueError(f'Handler for {pattern} is already registered')
+        node.handler = handler
+
+    def route(self, pattern: str) -> Callable[[Handler], Handler]:
+        """Декоратор: @router.route('#/gettime')"""
+        def decorator(handler: Handler) -> Handler:
+            self.add(pattern, handler)
+            return handler
+        return decorator
+
+    def default(self, handler: Handler) -> Handler:
+        """Декоратор обработчика для топиков, не совпавших ни с одним шаблоном"""
+        self._default = handler
+        return handler
+
+    @classmethod
+    def _match(cls, node: _Node, segments: list[str], index: int) -> Optional[Handler]:
+        if index == len(segments):
+            if node.handler is not None:
+                return node.handler
+            # 'a/#' совпадает и с самим 'a'
+            tail = node.children.get('#')
+            return tail.handler if tail is not None else None
+        child = node.children.get(segments[index])
+        if child is not None:
+            handler = cls._match(child, segments, index + 1)
+            if handler is not None:
+                return handler
+        child = node.children.get('+')
+        if child is not None:
+            handler = cls._match(child, segments, index + 1)
+            if handler is not None:
+                return handler
+        tail = node.children.get('#')
+        return tail.handler if tail is not None else None
+
+    def resolve(self, topic: str) -> Optional[Handler]:
+        segments = topic.split('/')
+        handler = self._match(self._root, segments, 0)
+        if handler is None and self._suffix_root.children:
+            handler = self._match(self._suffix_root, segments[::-1], 0)
+        return handler or self._default
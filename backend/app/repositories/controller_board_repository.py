@@ -1,7 +1,7 @@
 import asyncio
 from datetime import datetime
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.exc import IntegrityError
 from sqlmodel import select, Session
 
@@ -24,6 +24,29 @@ async def get_controller_by_id(session: AsyncSession, id: int) -> ControllerBoar
 
 
 
+async def get_controllers_page(session: AsyncSession, skip: int = 0, limit: int = 100) -> tuple[list[ControllerBoard], int]:
+    """Страница контроллеров и их общее число одним запросом (count(*) OVER ())"""
+    result = await session.execute(
+        select(ControllerBoard, func.count().over().label('total'))
+        .order_by(ControllerBoard.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    rows = result.all()
+    if rows:
+        return [row[0] for row in rows], rows[0].total
+    # За пределами последней страницы оконная функция не вернёт ни одной строки
+    count = await session.scalar(select(func.count()).select_from(ControllerBoard))
+    return [], count
+
+
+async def get_controllers_by_topic_prefix(session: AsyncSession, prefix: str) -> list[ControllerBoard]:
+    result = await session.scalars(
+        select(ControllerBoard).where(ControllerBoard.topic.startswith(prefix, autoescape=True))
+    )
+    return list(result.all())
+
+
 async def create_or_update_controller_board(session: AsyncSession, topic: str, **kwargs):
     # Попробуем найти запись с данным topic
     statement = select(ControllerBoard).where(ControllerBoard.topic == topic)
@@ -47,5 +70,4 @@ async def create_or_update_controller_board(session: AsyncSession, topic: str, *
     except IntegrityError:
         await session.rollback()
         raise
-
     return controller_board
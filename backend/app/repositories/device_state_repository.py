@@ -1,9 +1,13 @@
 from datetime import datetime
 
+from sqlalchemy import DateTime, Integer, column, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import contains_eager
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel import select
 
-from app.models import DeviceState, Device
+from app.core.db import MAX_ROWS_PER_STATEMENT, batched
+from app.models import ControllerBoard, DeviceState, Device
 
 
 async def get_device_state_by_device_id(session: AsyncSession, device_id: int) -> DeviceState | None:
@@ -50,3 +54,87 @@ async def update_or_create_device_state_by_device_id(session: AsyncSession, devi
         await session.commit()
         await session.refresh(device_state)
     return device_state
+
+
+async def bulk_upsert_device_states(
+        session: AsyncSession,
+        rows: list[dict],
+        batch_size: int = MAX_ROWS_PER_STATEMENT,
+) -> None:
+    """
+    Записывает состояния INSERT ... ON CONFLICT DO UPDATE пачками по batch_size строк
+    в одной транзакции.
+    rows: [{'device_id': ..., 'parameter': ..., 'value': ..., 'last_updated': ..., 'last_seen': ...}]
+    """
+    if not rows:
+        return
+    for batch in batched(rows, batch_size):
+        statement = insert(DeviceState).values(list(batch))
+        statement = statement.on_conflict_do_update(
+            index_elements=[DeviceState.device_id],
+            set_={
+                'parameter': statement.excluded.parameter,
+                'value': statement.excluded.value,
+                'last_updated': statement.excluded.last_updated,
+                'last_seen': statement.excluded.last_seen,
+            },
+        )
+        await session.execute(statement)
+    await session.commit()
+
+
+async def bulk_touch_device_states(
+        session: AsyncSession,
+        rows: dict[int, datetime],
+        batch_size: int = MAX_ROWS_PER_STATEMENT,
+) -> None:
+    """
+    Обновляет только last_seen состояний UPDATE ... FROM (VALUES ...) пачками по batch_size строк.
+    rows: {device_id: last_seen}
+    """
+    if not rows:
+        return
+    for batch in batched(list(rows.items()), batch_size):
+        seen = values(
+            column('device_id', Integer),
+            column('last_seen', DateTime),
+            name='seen',
+        ).data(batch)
+        statement = (
+            update(DeviceState)
+            .where(DeviceState.device_id == seen.c.device_id)
+            .values(last_seen=seen.c.last_seen)
+        )
+        await session.execute(statement)
+    await session.commit()
+
+
+def get_device_states_statement(controller_id: int | None = None):
+    """Состояния вместе с device и controller одним запросом (без ленивых догрузок)"""
+    statement = (
+        select(DeviceState)
+        .join(DeviceState.device)
+        .join(Device.controller)
+        .options(contains_eager(DeviceState.device).contains_eager(Device.controller))
+    )
+    if controller_id is not None:
+        statement = statement.where(Device.controller_id == controller_id)
+    return statement
+
+
+async def get_controller_device_states(
+        session: AsyncSession,
+        controller_id: int,
+) -> tuple[ControllerBoard | None, list[DeviceState]]:
+    result = await session.scalars(get_device_states_statement(controller_id))
+    states = list(result.unique().all())
+    if states:
+        return states[0].device.controller, states
+    return await session.get(ControllerBoard, controller_id), states
+
+
+async def get_device_states_by_controller_ids(session: AsyncSession, controller_ids: list[int]) -> list[DeviceState]:
+    if not controller_ids:
+        return []
+    result = await session.scalars(get_device_states_statement().where(Device.controller_id.in_(controller_ids)))
+    return list(result.all())
@@ -1,8 +1,15 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from sqlalchemy import DateTime, Interval, case, func, literal, or_, text
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel.ext.asyncio.session import AsyncSession
-from sqlmodel import select
+from sqlmodel import SQLModel, select
+from app.core.db import MAX_ROWS_PER_STATEMENT, batched
 from app.models import DeviceHistory
+from app.models.device_sample import DeviceSample
+
+# Начало отсчёта корзин date_bin: полночь, чтобы корзины в часы и сутки совпадали с date_trunc
+BUCKET_ORIGIN = datetime(2000, 1, 1)
 
 
 async def get_history_by_hour_and_device_id(
@@ -19,3 +26,157 @@ async def get_history_by_hour_and_device_id(
         )
     )
     return result.first()
+
+
+async def upsert_history_buckets(
+        session: AsyncSession,
+        rows: list[dict],
+        model: type[SQLModel] = DeviceHistory,
+        batch_size: int = MAX_ROWS_PER_STATEMENT,
+) -> None:
+    """
+    Добавляет к агрегатам model (почасовым DeviceHistory или минутным DeviceHistoryMinute)
+    накопленные в памяти приращения, пачками по batch_size строк в одной транзакции.
+    rows: [{'device_id', 'parameter', 'hour' | 'bucket', 'min_value', 'max_value', 'sum_value', 'count', 'last_value', 'last_updated'}]
+    """
+    if not rows:
+        return
+    table = model.__table__
+    time_column = table.c.hour if model is DeviceHistory else table.c.bucket
+    for batch in batched(rows, batch_size):
+        statement = insert(model).values(list(batch))
+        excluded = statement.excluded
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.device_id, table.c.parameter, time_column],
+            set_={
+                'min_value': func.least(table.c.min_value, excluded.min_value),
+                'max_value': func.greatest(table.c.max_value, excluded.max_value),
+                'sum_value': table.c.sum_value + excluded.sum_value,
+                'count': table.c.count + excluded.count,
+                # Опоздавшие данные не перезаписывают более свежее последнее значение
+                'last_value': case(
+                    (
+                        or_(table.c.last_updated.is_(None), excluded.last_updated >= table.c.last_updated),
+                        excluded.last_value,
+                    ),
+                    else_=table.c.last_value,
+                ),
+                'last_updated': func.greatest(table.c.last_updated, excluded.last_updated),
+            },
+        )
+        await session.execute(statement)
+    await session.commit()
+
+
+# Пересчёт уровня целиком заменяет корзины за интервал: повторный запуск безопасен,
+# опоздавшие данные учитываются при следующем проходе по их интервалу
+_ROLLUP_CONFLICT = (
+    'ON CONFLICT (device_id, parameter, bucket) DO UPDATE SET '
+    'min_value = excluded.min_value, max_value = excluded.max_value, '
+    'sum_value = excluded.sum_value, count = excluded.count, '
+    'last_value = excluded.last_value, last_updated = excluded.last_updated'
+)
+
+_COMPACT_DAY = text(
+    'INSERT INTO devicehistoryday '
+    '(device_id, parameter, bucket, min_value, max_value, sum_value, count, last_value, last_updated) '
+    "SELECT device_id, parameter, date_trunc('day', hour), min(min_value), max(max_value), "
+    'sum(sum_value), sum(count), (array_agg(last_value ORDER BY last_updated DESC))[1], max(last_updated) '
+    'FROM devicehistory WHERE hour >= :since AND hour < :until AND count > 0 '
+    'GROUP BY 1, 2, 3 '
+    + _ROLLUP_CONFLICT
+)
+
+
+async def compact_day_history(session: AsyncSession, since: datetime, until: datetime) -> int:
+    """Пересчитывает суточные корзины [since, until) из почасовых агрегатов"""
+    result = await session.execute(_COMPACT_DAY, {'since': since, 'until': until})
+    await session.commit()
+    return result.rowcount
+
+
+def _bucketed_history_statement(
+    model: type[SQLModel],
+    device_id: int,
+    parameter: str,
+    start: datetime,
+    end: datetime,
+    bucket: timedelta,
+):
+    if model is DeviceSample:
+        time_column = DeviceSample.ts
+        aggregates = (
+            func.min(DeviceSample.value),
+            func.max(DeviceSample.value),
+            func.sum(DeviceSample.value),
+            func.count(),
+        )
+    else:
+        time_column = model.hour if model is DeviceHistory else model.bucket
+        aggregates = (
+            func.min(model.min_value),
+            func.max(model.max_value),
+            func.sum(model.sum_value),
+            func.sum(model.count),
+        )
+    bucket_column = func.date_bin(
+        literal(bucket, Interval()), time_column, literal(BUCKET_ORIGIN, DateTime())
+    ).label('bucket')
+    return (
+        select(
+            bucket_column,
+            aggregates[0].label('min_value'),
+            aggregates[1].label('max_value'),
+            aggregates[2].label('sum_value'),
+            aggregates[3].label('count'),
+        )
+        .where(
+            model.device_id == device_id,
+            model.parameter == parameter,
+            time_column >= start,
+            time_column < end,
+        )
+        .group_by(bucket_column)
+    )
+
+
+async def get_bucketed_history(
+    session: AsyncSession,
+    model: type[SQLModel],
+    device_id: int,
+    parameter: str,
+    start: datetime,
+    end: datetime,
+    bucket: timedelta,
+    fill_gaps: bool = False,
+) -> list:
+    """
+    Строки (bucket, min_value, max_value, sum_value, count, avg_value) из уровня model,
+    перегруппированные в корзины шириной bucket функцией date_bin.
+    model — DeviceSample (сырые значения) или таблица агрегатов.
+    fill_gaps: корзины без данных возвращаются с NULL (generate_series по [start, end)),
+    start при этом должен быть выровнен по bucket.
+    """
+    buckets = _bucketed_history_statement(model, device_id, parameter, start, end, bucket).subquery()
+    if fill_gaps:
+        series = select(
+            func.generate_series(
+                literal(start, DateTime()),
+                literal(end - timedelta(microseconds=1), DateTime()),
+                literal(bucket, Interval()),
+            ).label('bucket')
+        ).subquery()
+        bucket_column = series.c.bucket
+        statement = select(series.c.bucket).outerjoin(buckets, buckets.c.bucket == series.c.bucket)
+    else:
+        bucket_column = buckets.c.bucket
+        statement = select(buckets.c.bucket)
+    statement = statement.add_columns(
+        buckets.c.min_value,
+        buckets.c.max_value,
+        buckets.c.sum_value,
+        buckets.c.count,
+        (buckets.c.sum_value / func.nullif(buckets.c.count, 0)).label('avg_value'),
+    ).order_by(bucket_column)
+    result = await session.execute(statement)
+    return result.all()
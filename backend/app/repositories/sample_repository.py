@@ -0,0 +1,70 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.models.device_sample import DeviceSample
+
+SAMPLE_TABLE = DeviceSample.__tablename__
+SAMPLE_COLUMNS = ('device_id', 'parameter', 'ts', 'value')
+
+
+def get_partition_name(day: date) -> str:
+    return f'{SAMPLE_TABLE}_{day:%Y%m%d}'
+
+
+async def get_sample_partitions(connection: AsyncConnection) -> set[date]:
+    """Суточные секции, которые уже есть в БД"""
+    result = await connection.execute(
+        text(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'JOIN pg_namespace ns ON ns.oid = parent.relnamespace '
+            'WHERE parent.relname = :table AND ns.nspname = :schema'
+        ),
+        {'table': SAMPLE_TABLE, 'schema': settings.POSTGRES_SCHEMA},
+    )
+    days = set()
+    for (name,) in result:
+        try:
+            days.add(datetime.strptime(name.rsplit('_', 1)[-1], '%Y%m%d').date())
+        except ValueError:
+            continue  # devicesample_default
+    return days
+
+
+async def create_sample_partition(connection: AsyncConnection, day: date) -> None:
+    start = datetime.combine(day, time.min)
+    end = start + timedelta(days=1)
+    await connection.execute(
+        text(
+            f'CREATE TABLE IF NOT EXISTS {get_partition_name(day)} PARTITION OF {SAMPLE_TABLE} '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    )
+
+
+async def drop_sample_partitions_before(connection: AsyncConnection, day: date) -> list[date]:
+    """Удаляет суточные секции старше day целиком — без DELETE и VACUUM"""
+    dropped = sorted(d for d in await get_sample_partitions(connection) if d < day)
+    for partition_day in dropped:
+        await connection.execute(text(f'DROP TABLE IF EXISTS {get_partition_name(partition_day)}'))
+    return dropped
+
+
+async def copy_samples(connection: AsyncConnection, records: list[tuple]) -> None:
+    """
+    Пишет пачку (device_id, parameter, ts, value) протоколом COPY asyncpg.
+    Выполняется в транзакции connection; commit — на вызывающей стороне.
+    """
+    if not records:
+        return
+    raw_connection = await connection.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        SAMPLE_TABLE,
+        records=records,
+        columns=SAMPLE_COLUMNS,
+        schema_name=settings.POSTGRES_SCHEMA,
+    )
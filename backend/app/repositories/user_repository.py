@@ -0,0 +1,46 @@
+from sqlmodel import select
+
+from app import crud
+from app.core.db import AsyncSession
+from app.core.security import get_password_hash_async, verify_password_async
+from app.models.user import User, UserCreate, UserUpdate
+
+
+async def get_user_by_email(session: AsyncSession, email: str) -> User | None:
+    result = await session.scalars(select(User).where(User.email == email))
+    return result.first()
+
+
+async def authenticate(session: AsyncSession, email: str, password: str) -> User | None:
+    """Как crud.authenticate, но bcrypt выполняется в пуле хэширования, не блокируя event loop"""
+    user = await get_user_by_email(session=session, email=email)
+    if not user:
+        return None
+    if not await verify_password_async(password, user.hashed_password):
+        return None
+    return user
+
+
+async def create_user(session: AsyncSession, user_create: UserCreate) -> User:
+    """crud.create_user на асинхронной сессии; хэш считается в пуле"""
+    user = crud.build_user(user_create, await get_password_hash_async(user_create.password))
+    session.add(user)
+    await session.commit()
+    await session.refresh(user)
+    return user
+
+
+async def update_user(session: AsyncSession, db_user: User, user_in: UserUpdate) -> User:
+    """crud.update_user на асинхронной сессии; хэш считается в пуле"""
+    hashed_password = await get_password_hash_async(user_in.password) if user_in.password else None
+    crud.apply_user_update(db_user, user_in, hashed_password)
+    session.add(db_user)
+    await session.commit()
+    await session.refresh(db_user)
+    return db_user
+
+
+async def set_password(session: AsyncSession, user: User, password: str) -> None:
+    user.hashed_password = await get_password_hash_async(password)
+    session.add(user)
+    await session.commit()
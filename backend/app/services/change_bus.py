@@ -0,0 +1,200 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Optional
+
+import asyncpg
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.db import AsyncSession, DatabaseConnector
+from app.core.setup_logger import setup_logger
+from app.services.controller_cache import controller_cache
+from app.services.device_registry import device_registry
+from app.services.state_cache import state_cache
+from app.services.state_hub import state_hub
+from app.services.trigger_engine import trigger_engine
+from app.services.user_cache import user_cache
+
+logger = setup_logger(__name__)
+
+# NOTIFY принимает payload до 8000 байт
+MAX_PAYLOAD_SIZE = 7500
+
+
+def get_listener_dsn() -> str:
+    uri = str(settings.SQLALCHEMY_DATABASE_URI).split('?')[0]
+    return uri.replace('postgresql+psycopg', 'postgresql')
+
+
+def pack_payloads(origin: str, events: list[dict]) -> list[str]:
+    """Раскладывает события по сообщениям NOTIFY, не превышая MAX_PAYLOAD_SIZE"""
+    payloads, chunk, size = [], [], 0
+    overhead = len(json.dumps({'origin': origin, 'events': []}))
+    for event in events:
+        encoded = json.dumps(event, default=str)
+        if chunk and overhead + size + len(encoded) + 1 > MAX_PAYLOAD_SIZE:
+            payloads.append(f'{{"origin": "{origin}", "events": [{",".join(chunk)}]}}')
+            chunk, size = [], 0
+        chunk.append(encoded)
+        size += len(encoded) + 1
+    if chunk:
+        payloads.append(f'{{"origin": "{origin}", "events": [{",".join(chunk)}]}}')
+    return payloads
+
+
+class ChangeBus:
+    """
+    Шина изменений между процессами (uvicorn workers, app.ingest) на Postgres LISTEN/NOTIFY.
+    Отправка — через пул, пачкой событий на каждый flush буфера состояний;
+    приём — на отдельном соединении asyncpg, которое держит LISTEN и переподключается.
+    Свои события процесс пропускает по origin: локально они уже применены.
+    """
+
+    def __init__(self, channel: str | None = None):
+        self.channel = channel or f'{settings.CHANGE_BUS_CHANNEL}_{settings.POSTGRES_SCHEMA}'
+        self.origin = uuid.uuid4().hex
+        self.connected = False
+        self.received = 0
+        self._task: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def notify(self, *events: dict) -> None:
+        """Отправляет события одной транзакцией: слушатели получат их после commit"""
+        if not events:
+            return
+        try:
+            async with DatabaseConnector.get_async_engine().begin() as connection:
+                for payload in pack_payloads(self.origin, list(events)):
+                    await connection.execute(
+                        text('SELECT pg_notify(:channel, :payload)'),
+                        {'channel': self.channel, 'payload': payload},
+                    )
+        except Exception as e:
+            logger.error(f'Failed to publish {len(events)} change events: {e}')
+
+    async def notify_states(self, rows: list[dict]) -> None:
+        await self.notify(*(
+            {
+                'type': 'state',
+                'device_id': row['device_id'],
+                'parameter': row['parameter'],
+                'value': row['value'],
+                'last_updated': row['last_updated'].isoformat(),
+                'last_seen': row['last_seen'].isoformat() if row.get('last_seen') else None,
+            }
+            for row in rows
+        ))
+
+    async def notify_controller(self, controller_id: int, topic: Optional[str] = None) -> None:
+        await self.notify({'type': 'controller', 'controller_id': controller_id, 'topic': topic})
+
+    async def notify_user(self, user_id: uuid.UUID) -> None:
+        await self.notify({'type': 'user', 'user_id': str(user_id)})
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f'Malformed change bus payload: {payload[:200]!r}')
+            return
+        if message.get('origin') == self.origin:
+            return
+        for event in message.get('events', []):
+            self.received += 1
+            try:
+                self.handle(event)
+            except Exception as e:
+                logger.error(f'Failed to apply change event {event}: {e}')
+
+    def handle(self, event: dict[str, Any]) -> None:
+        match event.get('type'):
+            case 'state':
+                applied = state_cache.apply(
+                    device_id=event['device_id'],
+                    value=event['value'],
+                    parameter=event['parameter'],
+                    last_updated=datetime.fromisoformat(event['last_updated']),
+                    last_seen=datetime.fromisoformat(event['last_seen']) if event.get('last_seen') else None,
+                )
+                if applied is not None:
+                    controller_id, state = applied
+                    state_hub.publish(controller_id, event['device_id'], state)
+            case 'controller':
+                if event.get('topic'):
+                    controller_cache.invalidate(event['topic'])
+                state_cache.invalidate_controller(event['controller_id'])
+                self._spawn(self._reload_controller(event['controller_id']))
+            case 'user':
+                user_cache.invalidate(uuid.UUID(event['user_id']))
+            case _:
+                logger.warning(f'Unknown change event: {event}')
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _reload_controller(self, controller_id: int) -> None:
+        """Реестр и триггеры загружены только в процессах с ingest"""
+        if not device_registry.loaded and not trigger_engine.loaded:
+            return
+        async with AsyncSession() as session:
+            if device_registry.loaded:
+                await device_registry.reload_controller(session=session, controller_id=controller_id)
+            if trigger_engine.loaded:
+                await trigger_engine.reload_controller(session=session, controller_id=controller_id)
+
+    async def _resync(self) -> None:
+        """После разрыва часть событий потеряна: сбрасываем кэши и перечитываем реестры"""
+        controller_cache.clear()
+        state_cache.clear()
+        user_cache.clear()
+        async with AsyncSession() as session:
+            if device_registry.loaded:
+                await device_registry.load(session)
+            if trigger_engine.loaded:
+                await trigger_engine.load(session)
+
+    async def _listen(self) -> None:
+        # Пока соединения не было, события могли пройти мимо — после переподключения нужен resync
+        missed = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(get_listener_dsn())
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                if missed:
+                    await self._resync()
+                self.connected = state_cache.synced = True
+                logger.info(f'Change bus listening on `{self.channel}`')
+                await lost.wait()
+                logger.warning('Change bus listener connection lost')
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f'Change bus listener error: {e}')
+            finally:
+                missed = True
+                self.connected = state_cache.synced = False
+                if connection is not None and not connection.is_closed():
+                    await connection.close(timeout=1)
+            await asyncio.sleep(settings.CHANGE_BUS_RETRY_INTERVAL)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen(), name='change-bus')
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for task in list(self._tasks):
+            task.cancel()
+
+
+change_bus = ChangeBus()
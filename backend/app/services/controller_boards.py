@@ -0,0 +1,28 @@
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.db import AsyncSession
+from app.models import ControllerBoard
+from app.repositories.controller_board_repository import create_or_update_controller_board
+from app.services.change_bus import change_bus
+from app.services.controller_cache import controller_cache
+from app.services.state_cache import state_cache
+
+
+async def save_controller_board(session: AsyncSession, topic: str, **kwargs) -> ControllerBoard:
+    """
+    Создаёт или обновляет контроллер и сбрасывает его в кэшах этого
+    и остальных процессов (топик, описание и часовой пояс могли измениться)
+    """
+    try:
+        controller_board = await create_or_update_controller_board(session=session, topic=topic, **kwargs)
+    except IntegrityError:
+        # Контроллер создан параллельно: отрицательный результат в кэше устарел
+        controller_cache.invalidate(topic)
+        raise
+
+    controller_cache.update(controller_board)
+    state_cache.invalidate_controller(controller_board.id)
+    if settings.CHANGE_BUS_ENABLED:
+        await change_bus.notify_controller(controller_board.id, topic)
+    return controller_board
@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlmodel import select
+
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.core.db import AsyncSession
+from app.core.setup_logger import setup_logger
+from app.models import ControllerBoard
+
+logger = setup_logger(__name__)
+
+
+@dataclass(frozen=True)
+class ControllerInfo:
+    id: int
+    topic: str
+    period: int
+    description: Optional[str] = None
+    time_zone: Optional[str] = None
+
+
+class ControllerCache:
+    """
+    Кэш контроллеров по топику с отрицательным кэшированием:
+    сообщения от незарегистрированных контроллеров не ходят в БД на каждое сообщение.
+    """
+
+    def __init__(
+        self,
+        maxsize: int | None = None,
+        ttl: float | None = None,
+        negative_ttl: float | None = None,
+    ):
+        self.negative_ttl = negative_ttl if negative_ttl is not None else settings.CONTROLLER_CACHE_NEGATIVE_TTL
+        self._cache = TTLCache(
+            maxsize=maxsize or settings.CONTROLLER_CACHE_SIZE,
+            ttl=ttl if ttl is not None else settings.CONTROLLER_CACHE_TTL,
+        )
+
+    async def get(self, session: AsyncSession, topic: str) -> ControllerInfo | None:
+        cached = self._cache.get(topic)
+        if cached is not MISSING:
+            return cached
+        result = await session.execute(
+            select(
+                ControllerBoard.id,
+                ControllerBoard.topic,
+                ControllerBoard.period,
+                ControllerBoard.description,
+                ControllerBoard.time_zone,
+            ).where(ControllerBoard.topic == topic)
+        )
+        row = result.first()
+        if row is None:
+            # Логируем один раз на время жизни отрицательной записи
+            logger.error(f"Controller with topic {topic} not found")
+            self._cache.set(topic, None, ttl=self.negative_ttl)
+            return None
+        info = ControllerInfo(
+            id=row.id,
+            topic=row.topic,
+            period=row.period,
+            description=row.description,
+            time_zone=row.time_zone,
+        )
+        self._cache.set(topic, info)
+        return info
+
+    def update(self, controller: ControllerBoard) -> ControllerInfo:
+        info = ControllerInfo(
+            id=controller.id,
+            topic=controller.topic,
+            period=controller.period,
+            description=controller.description,
+            time_zone=controller.time_zone,
+        )
+        self._cache.set(controller.topic, info)
+        return info
+
+    def invalidate(self, topic: str) -> None:
+        self._cache.pop(topic)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+controller_cache = ControllerCache()
@@ -0,0 +1,84 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True, slots=True)
+class Deadband:
+    absolute: float = 0.0
+    percent: float = 0.0
+
+    def exceeded(self, previous: float, value: float) -> bool:
+        """Изменение больше абсолютного порога и (если задан) больше процента от прежнего значения"""
+        delta = abs(value - previous)
+        return delta > self.absolute and (not self.percent or delta > abs(previous) * self.percent / 100)
+
+
+def _lookup(table: dict[str, float], device_type: Optional[str]) -> float:
+    if not device_type:
+        return 0.0
+    if device_type in table:
+        return table[device_type]
+    # Семейства датчиков (MQ2, MQ135, ...) настраиваются по префиксу, как экстракторы
+    for prefix, threshold in table.items():
+        if device_type.startswith(prefix):
+            return threshold
+    return 0.0
+
+
+def get_deadband(device_type: Optional[str]) -> Deadband:
+    return Deadband(
+        absolute=_lookup(settings.STATE_DEADBAND_ABSOLUTE, device_type),
+        percent=_lookup(settings.STATE_DEADBAND_PERCENT, device_type),
+    )
+
+
+class ChangeFilter:
+    """
+    Решает, нужно ли сохранять значение: только если оно вышло за зону
+    нечувствительности типа устройства относительно последнего сохранённого
+    или если с последнего сохранения прошло больше max_silence секунд.
+    """
+
+    def __init__(self, max_silence: float | None = None):
+        self.max_silence = max_silence if max_silence is not None else settings.STATE_MAX_SILENCE
+        self._deadbands: dict[Optional[str], Deadband] = {}
+        self._last: dict[tuple[int, str], tuple[float, float]] = {}
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def _get_deadband(self, device_type: Optional[str]) -> Deadband:
+        deadband = self._deadbands.get(device_type)
+        if deadband is None:
+            deadband = self._deadbands[device_type] = get_deadband(device_type)
+        return deadband
+
+    def should_persist(
+        self,
+        device_id: int,
+        value: float,
+        parameter: Optional[str] = None,
+        device_type: Optional[str] = None,
+        now: Optional[float] = None,
+    ) -> bool:
+        now = time.monotonic() if now is None else now
+        key = (device_id, parameter or '')
+        last = self._last.get(key)
+        if last is not None:
+            previous, persisted_at = last
+            if now - persisted_at < self.max_silence and not self._get_deadband(device_type).exceeded(previous, value):
+                self.suppressed += 1
+                return False
+        self._last[key] = (value, now)
+        return True
+
+    def clear(self) -> None:
+        self._last = {}
+        self._deadbands = {}
+
+
+change_filter = ChangeFilter()
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlmodel import select
+
+from app.core.db import AsyncSession
+from app.core.setup_logger import setup_logger
+from app.models import ControllerBoard, Device
+
+logger = setup_logger(__name__)
+
+
+@dataclass(frozen=True)
+class DeviceInfo:
+    id: int
+    controller_id: int
+    name: str
+    extra_name: Optional[str]
+    type: str
+    description: Optional[str] = None
+
+
+class DeviceRegistry:
+    """
+    Кэш устройств для обработки входящих сообщений:
+    (топик контроллера, имя устройства, extra_name) → id и тип устройства.
+    Загружается одним запросом при старте и обновляется при загрузке devices.json.
+    """
+
+    def __init__(self):
+        self._devices: dict[tuple[str, str, Optional[str]], DeviceInfo] = {}
+        self._types: dict[tuple[str, str], str] = {}
+        self._topics: dict[int, str] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def get(self, topic: str, name: str, extra_name: Optional[str] = None) -> DeviceInfo | None:
+        return self._devices.get((topic, name, extra_name))
+
+    def get_type(self, topic: str, name: str) -> str | None:
+        return self._types.get((topic, name))
+
+    def get_topic(self, controller_id: int) -> str | None:
+        return self._topics.get(controller_id)
+
+    def add(self, topic: str, device: Device) -> DeviceInfo:
+        info = DeviceInfo(
+            id=device.id,
+            controller_id=device.controller_id,
+            name=device.name,
+            extra_name=device.extra_name,
+            type=device.type,
+            description=device.description,
+        )
+        self._devices[(topic, info.name, info.extra_name)] = info
+        self._types[(topic, info.name)] = info.type
+        self._topics[info.controller_id] = topic
+        return info
+
+    def invalidate_controller(self, topic: str) -> None:
+        self._devices = {key: info for key, info in self._devices.items() if key[0] != topic}
+        self._types = {key: type_ for key, type_ in self._types.items() if key[0] != topic}
+
+    def clear(self) -> None:
+        self._devices = {}
+        self._types = {}
+        self._topics = {}
+        self.loaded = False
+
+    @staticmethod
+    def _statement():
+        return select(Device, ControllerBoard.topic).join(
+            ControllerBoard, Device.controller_id == ControllerBoard.id
+        )
+
+    async def load(self, session: AsyncSession) -> None:
+        """Загружает все устройства одним запросом"""
+        result = await session.execute(self._statement())
+        self.clear()
+        for device, topic in result.all():
+            self.add(topic, device)
+        self.loaded = True
+        logger.info(f'Device registry loaded: {len(self)} devices')
+
+    async def reload_controller(self, session: AsyncSession, controller_id: int) -> None:
+        """Перечитывает устройства одного контроллера (после загрузки devices.json)"""
+        result = await session.execute(
+            self._statement().where(Device.controller_id == controller_id)
+        )
+        rows = result.all()
+        topic = self._topics.get(controller_id)
+        if topic is None:
+            topic = await session.scalar(
+                select(ControllerBoard.topic).where(ControllerBoard.id == controller_id)
+            )
+        if topic is not None:
+            self.invalidate_controller(topic)
+        for device, device_topic in rows:
+            self.add(device_topic, device)
+
+
+device_registry = DeviceRegistry()
@@ -0,0 +1,53 @@
+import asyncio
+from abc import ABC, abstractmethod
+
+from app.core.setup_logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class BackgroundFlusher(ABC):
+    """
+    Основа для буферов с отложенной записью: фоновая задача вызывает flush()
+    раз в flush_interval секунд или раньше, по request_flush().
+    При остановке выполняется последний flush().
+    """
+    name = 'flusher'
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def request_flush(self) -> None:
+        self._flush_requested.set()
+
+    @abstractmethod
+    async def flush(self) -> int:
+        """Записывает накопленное; возвращает число записанных элементов"""
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f'{self.name} flush failed: {e}')
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._lock = asyncio.Lock()
+            self._flush_requested = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
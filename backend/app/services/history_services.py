@@ -1,26 +1,33 @@
 from datetime import datetime, timezone
 from typing import Optional, Union
 
+from sqlmodel import SQLModel
+
 from app.core.config import settings
 from app.core.db import AsyncSession
-from app.models import Device
+from app.core.setup_logger import setup_logger
+from app.models import DeviceHistory, DeviceHistoryMinute
+from app.repositories.history_repository import upsert_history_buckets
+from app.services.flusher import BackgroundFlusher
 
+logger = setup_logger(__name__)
 
-def get_current_hour(
+
+def get_local_time(
         time: Optional[Union[datetime, int, float]] = None
 ) -> datetime:
     """
-    Возвращает время с обнулёнными минутами/секундами в settings.TIME_ZONE.
-    - Если time=None или отличается от текущего на >24 часа → возвращает текущий час.
+    Возвращает время в settings.TIME_ZONE.
+    - Если time=None или отличается от текущего на >24 часа → возвращает текущее время.
     - UNIX-время (int/float) считается UTC.
     - Наивный datetime (без временной зоны) считается локальным временем.
     """
     local_tz = settings.local_tz
     current_time = datetime.now(local_tz)
 
-    # Если time=None, возвращаем текущий час
+    # Если time=None, возвращаем текущее время
     if time is None:
-        return current_time.replace(minute=0, second=0, microsecond=0)
+        return current_time
 
     # Пытаемся преобразовать time в локальное время
     try:
@@ -37,39 +44,139 @@ def get_current_hour(
 
         # Проверяем отклонение от текущего времени
         if abs((input_time - current_time).total_seconds()) <= 24 * 3600:
-            return input_time.replace(minute=0, second=0, microsecond=0)
+            return input_time
 
-    except (ValueError, OSError):
+    except (ValueError, OSError, TypeError, AttributeError):
         pass  # В случае ошибок игнорируем переданное время
 
     # Fallback: текущее время
-    return current_time.replace(minute=0, second=0, microsecond=0)
+    return current_time
+
+
+def get_current_hour(
+        time: Optional[Union[datetime, int, float]] = None
+) -> datetime:
+    """
+    Возвращает время с обнулёнными минутами/секундами в settings.TIME_ZONE
+    (правила разбора time — как в get_local_time).
+    """
+    return get_local_time(time).replace(minute=0, second=0, microsecond=0)
+
+
+class HourlyBucket:
+    __slots__ = ('min_value', 'max_value', 'sum_value', 'count', 'last_value', 'last_updated')
+
+    def __init__(self, value: float, time: datetime):
+        self.min_value = value
+        self.max_value = value
+        self.sum_value = value
+        self.count = 1
+        self.last_value = value
+        self.last_updated = time
+
+    def add(self, value: float, time: datetime) -> None:
+        self.min_value = min(self.min_value, value)
+        self.max_value = max(self.max_value, value)
+        self.sum_value += value
+        self.count += 1
+        if time >= self.last_updated:
+            self.last_value = value
+            self.last_updated = time
 
 
-async def save_to_history(
-    session: AsyncSession,
-    device: Device,
-    data: dict,
-):
+class HistoryAggregator(BackgroundFlusher):
     """
-    Получаем Весь payload. Фильтруем его здесь.
-    {"Bedroom":"on","Passage":"on","FloorSensors":{"Bedroom":26.5625,"Passage":26.5625},"RoomClimate":{"temperature":27.10000038,"humidity":37.79999924},"GasSensor":{"gas_raw":58,"gas_ppm":6.718621254},"time":1743968248}
+    Почасовые min/max/sum/count/last по (device_id, parameter, hour) в памяти.
+    flush() записывает приращения всех корзин — и закрытых, и текущего часа —
+    upsert'ом, который складывает их с тем, что уже есть в БД.
     """
-    # if device.type == 'Relay':
-    #     value = data[device.name]
-    # elif device.type == 'DS18B20':
-    #     for sensor in data[device.name]:
-    #     value = data[device.name]['temperature']
-    # elif device.type == 'DHT22':
-    #     value = data[device.name]['temperature']
-    # else:
-    #     return
-    #
-    # hour = get_current_hour()
-    # await session.exec(
-    #     insert(DeviceHistory).values(
-    #         device_id=device.id,
-    #         value=value,
-    #         hour=hour,
-    #     )
-    # )
\ No newline at end of file
+    name = 'history-aggregator'
+    model: type[SQLModel] = DeviceHistory
+    time_field = 'hour'
+
+    def __init__(self, flush_interval: float | None = None):
+        super().__init__(flush_interval or settings.HISTORY_FLUSH_INTERVAL)
+        self._buckets: dict[tuple[int, str, datetime], HourlyBucket] = {}
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    @staticmethod
+    def truncate(time: datetime) -> datetime:
+        """Начало корзины, в которую попадает time"""
+        return time.replace(minute=0, second=0, microsecond=0)
+
+    def add(
+        self,
+        device_id: int,
+        value: float,
+        parameter: Optional[str] = None,
+        time: Optional[Union[datetime, int, float]] = None,
+    ) -> None:
+        # Колонки без часового пояса: храним локальное время settings.TIME_ZONE
+        sample_time = get_local_time(time).replace(tzinfo=None)
+        key = (device_id, parameter or '', self.truncate(sample_time))
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = HourlyBucket(value, sample_time)
+        else:
+            bucket.add(value, sample_time)
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._buckets:
+                return 0
+            buckets, self._buckets = self._buckets, {}
+            rows = [
+                {
+                    'device_id': device_id,
+                    'parameter': parameter,
+                    self.time_field: start,
+                    'min_value': bucket.min_value,
+                    'max_value': bucket.max_value,
+                    'sum_value': bucket.sum_value,
+                    'count': bucket.count,
+                    'last_value': bucket.last_value,
+                    'last_updated': bucket.last_updated,
+                }
+                for (device_id, parameter, start), bucket in buckets.items()
+            ]
+            try:
+                async with AsyncSession() as session:
+                    await upsert_history_buckets(session, rows, model=self.model)
+            except Exception as e:
+                logger.error(f'{self.name}: failed to flush {len(rows)} buckets: {e}')
+                # Приращения не потеряны: сливаем их обратно с накопленными за время записи
+                for key, bucket in buckets.items():
+                    current = self._buckets.get(key)
+                    if current is None:
+                        self._buckets[key] = bucket
+                    else:
+                        current.min_value = min(current.min_value, bucket.min_value)
+                        current.max_value = max(current.max_value, bucket.max_value)
+                        current.sum_value += bucket.sum_value
+                        current.count += bucket.count
+                        if bucket.last_updated > current.last_updated:
+                            current.last_value = bucket.last_value
+                            current.last_updated = bucket.last_updated
+                return 0
+            return len(rows)
+
+
+class MinuteHistoryAggregator(HistoryAggregator):
+    """
+    Те же агрегаты по минутам (уровень 1m). Считаются в памяти по всем значениям,
+    как и почасовые: без запросов к сырым DeviceSample и без зависимости
+    от RAW_SAMPLES_ENABLED.
+    """
+    name = 'minute-history-aggregator'
+    model = DeviceHistoryMinute
+    time_field = 'bucket'
+
+    @staticmethod
+    def truncate(time: datetime) -> datetime:
+        return time.replace(second=0, microsecond=0)
+
+
+history_aggregator = HistoryAggregator()
+minute_history_aggregator = MinuteHistoryAggregator()
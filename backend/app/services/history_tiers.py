@@ -0,0 +1,167 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession as AsyncSessionType
+
+from app.core.config import settings
+from app.core.db import AsyncSession
+from app.core.setup_logger import setup_logger
+from app.models import DeviceHistory, DeviceHistoryDay, DeviceHistoryMinute
+from app.models.device_sample import DeviceSample
+from app.repositories.history_repository import (
+    BUCKET_ORIGIN,
+    compact_day_history,
+    get_bucketed_history,
+)
+from app.services.flusher import BackgroundFlusher
+from app.services.history_services import history_aggregator
+
+logger = setup_logger(__name__)
+
+
+@dataclass(frozen=True)
+class HistoryTier:
+    name: str
+    step: timedelta
+    model: type[SQLModel]
+
+
+# От мелкого к крупному; raw — все сырые значения без агрегации,
+# 1m и 1h агрегируются в памяти по тем же значениям, 1d — из 1h:
+# count/avg/min/max на любом уровне означают одно и то же.
+TIERS = (
+    HistoryTier('raw', timedelta(0), DeviceSample),
+    HistoryTier('1m', timedelta(minutes=1), DeviceHistoryMinute),
+    HistoryTier('1h', timedelta(hours=1), DeviceHistory),
+    HistoryTier('1d', timedelta(days=1), DeviceHistoryDay),
+)
+
+
+def select_tier(bucket: timedelta) -> HistoryTier:
+    """
+    Самый крупный уровень, корзины которого целиком укладываются в bucket:
+    шаг уровня делит bucket без остатка (90 минут → 1m, 2 часа → 1h, 7 дней → 1d).
+    Без сырых значений (RAW_SAMPLES_ENABLED=False) мелкие корзины строятся из 1m.
+    """
+    for tier in reversed(TIERS):
+        if tier.step and bucket >= tier.step and bucket % tier.step == timedelta(0):
+            return tier
+    return TIERS[0] if settings.RAW_SAMPLES_ENABLED else TIERS[1]
+
+
+async def query_history(
+    session: AsyncSessionType,
+    device_id: int,
+    parameter: str,
+    start: datetime,
+    end: datetime,
+    bucket: timedelta,
+    fill_gaps: bool = False,
+) -> tuple[HistoryTier, list]:
+    """
+    Корзины шириной bucket за [start, end) из подходящего уровня.
+    start выравнивается вниз по bucket, чтобы крайняя корзина уровня не выпадала.
+    """
+    tier = select_tier(bucket)
+    rows = await get_bucketed_history(
+        session,
+        tier.model,
+        device_id=device_id,
+        parameter=parameter,
+        start=align_time(start, bucket),
+        end=end,
+        bucket=bucket,
+        fill_gaps=fill_gaps,
+    )
+    return tier, rows
+
+
+_BUCKET_UNITS = {
+    's': timedelta(seconds=1),
+    'm': timedelta(minutes=1),
+    'h': timedelta(hours=1),
+    'd': timedelta(days=1),
+    'w': timedelta(weeks=1),
+}
+
+# Шаги, из которых выбирается корзина, если клиент её не указал
+BUCKET_STEPS = tuple(
+    timedelta(seconds=seconds)
+    for seconds in (1, 5, 10, 30, 60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 86400, 7 * 86400)
+)
+
+
+def parse_bucket(value: str) -> timedelta:
+    """'30s', '5m', '1h', '1d', '1w' или число секунд → timedelta"""
+    value = value.strip().lower()
+    unit = _BUCKET_UNITS.get(value[-1:])
+    number = value[:-1] if unit else value
+    if not number.isdigit() or int(number) <= 0:
+        raise ValueError(f'Invalid bucket: {value!r}')
+    return int(number) * (unit or timedelta(seconds=1))
+
+
+def choose_bucket(start: datetime, end: datetime, points: int) -> timedelta:
+    """Наименьший шаг из BUCKET_STEPS, при котором в [start, end) не больше points корзин"""
+    for step in BUCKET_STEPS:
+        if (end - start) / step <= points:
+            return step
+    return BUCKET_STEPS[-1]
+
+
+def align_time(time: datetime, step: timedelta) -> datetime:
+    """Округляет наивное время вниз до шага step от BUCKET_ORIGIN (как date_bin)"""
+    return BUCKET_ORIGIN + (time - BUCKET_ORIGIN) // step * step
+
+
+class HistoryCompactor(BackgroundFlusher):
+    """
+    Фоновый пересчёт уровня 1d из почасовых DeviceHistory.
+    Каждый проход пересчитывает корзины от отметки прошлого прохода до текущего
+    момента; опоздавшие значения (mark) сдвигают начало следующего прохода назад,
+    и их корзины пересчитываются заново.
+    """
+
+    name = 'history-compactor'
+
+    def __init__(self, flush_interval: float | None = None):
+        super().__init__(flush_interval or settings.HISTORY_COMPACT_INTERVAL)
+        self._watermark: Optional[datetime] = None
+        self._dirty_from: Optional[datetime] = None
+
+    def mark(self, time: datetime) -> None:
+        """Отмечает, что пришло значение за время time (наивное локальное)"""
+        if self._watermark is not None and time >= self._watermark:
+            return
+        if self._dirty_from is None or time < self._dirty_from:
+            self._dirty_from = time
+
+    async def flush(self) -> int:
+        async with self._lock:
+            now = datetime.now(settings.local_tz).replace(tzinfo=None)
+            since = self._watermark or align_time(now, timedelta(days=1))
+            if self._dirty_from is not None:
+                since = min(since, self._dirty_from)
+                self._dirty_from = None
+            # Пересчёт читает из БД: сначала дописываем то, что ещё в буфере
+            await history_aggregator.flush()
+            try:
+                async with AsyncSession() as session:
+                    days = await compact_day_history(
+                        session,
+                        since=align_time(since, timedelta(days=1)),
+                        until=align_time(now, timedelta(days=1)) + timedelta(days=1),
+                    )
+            except Exception as e:
+                logger.error(f'History compaction since {since} failed: {e}')
+                # Интервал не пересчитан — повторим его в следующий проход
+                self._dirty_from = min(since, self._dirty_from or since)
+                return 0
+            # Текущий час ещё не закрыт — следующий проход начнёт с него
+            self._watermark = align_time(now, timedelta(hours=1))
+            return days
+
+
+history_compactor = HistoryCompactor()
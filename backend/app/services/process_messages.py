@@ -1,134 +1,157 @@
-import json
 import logging
+from datetime import datetime
 
+from app.core.config import settings
 from app.core.db import AsyncSession
+from app.models import Device
 # from sqlmodel.ext.asyncio.session import AsyncSession
 
 # from app.core.db import async_engine
-from app.repositories.controller_board_repository import get_controller_by_topic
 from app.repositories.device_repository import get_device_by_name_and_controller_id, \
     get_device_type_by_name_and_controller_id
-from app.repositories.device_state_repository import update_or_create_device_state_by_device_id
-from app.services.history_services import save_to_history
+from app.services.controller_cache import controller_cache
+from app.services.deadband import change_filter
+from app.services.device_registry import DeviceInfo, device_registry
+from app.services.history_services import get_local_time, history_aggregator, minute_history_aggregator
+from app.services.history_tiers import history_compactor
+from app.services.sample_writer import sample_writer
+from app.services.state_buffer import state_buffer
+from app.services.state_cache import state_cache
+from app.services.state_hub import state_hub
+from app.services.state_extractors import StateTuple, get_extractor
+from app.services.trigger_engine import trigger_engine
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
+async def get_device_type(session: AsyncSession, topic: str, controller_id: int, device_name: str) -> str | None:
+    """Тип устройства из реестра, без реестра (не загружен) — из БД"""
+    if device_registry.loaded:
+        return device_registry.get_type(topic, device_name)
+    return await get_device_type_by_name_and_controller_id(
+        session=session,
+        device_name=device_name,
+        controller_id=controller_id,
+    )
+
+
+async def get_device_id(
+        session: AsyncSession,
+        topic: str,
+        controller_id: int,
+        device_name: str,
+        extra_name: str | None = None,
+) -> int | None:
+    device = await get_device(session, topic, controller_id, device_name, extra_name)
+    return device.id if device is not None else None
+
+
+async def get_device(
+        session: AsyncSession,
+        topic: str,
+        controller_id: int,
+        device_name: str,
+        extra_name: str | None = None,
+) -> DeviceInfo | Device | None:
+    """Устройство из реестра, без реестра (не загружен) — из БД"""
+    if device_registry.loaded:
+        device = device_registry.get(topic, device_name, extra_name)
+    else:
+        device = await get_device_by_name_and_controller_id(
+            session=session,
+            device_name=device_name,
+            controller_id=controller_id,
+            extra_name=extra_name,
+        )
+    if device is None:
+        logger.error(f"Device {device_name}/{extra_name} not found for controller {controller_id}")
+    return device
+
+
+def extract_states(device_name: str, device_type: str, state) -> list[StateTuple]:
+    extractor = get_extractor(device_type)
+    if extractor is None:
+        logger.error(f"Unknown device type {device_type}")
+        return []
+    try:
+        return extractor(device_name, state)
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        logger.error(f"Malformed state of {device_type} device {device_name}: {state!r} ({e})")
+        return []
+
+
+async def write_states(
+        session: AsyncSession,
+        topic: str,
+        controller_id: int,
+        states: list[StateTuple],
+        time: int | float | None = None,
+        device_types: dict[str, str] | None = None,
+) -> None:
+    """
+    Общий путь записи: разрешает устройства, передаёт все значения в историю
+    и сырые значения, изменения — в буфер состояний, проверяет триггеры.
+    Состояние пишется, только если значение вышло за зону
+    нечувствительности типа устройства (device_types) или пора записать heartbeat;
+    иначе обновляется лишь last_seen.
+    """
+    sample_time = get_local_time(time).replace(tzinfo=None)
+    history_compactor.mark(sample_time)
+    now = datetime.now()
+    for (device_name, extra_name), parameter, value in states:
+        device = await get_device(
+            session=session,
+            topic=topic,
+            controller_id=controller_id,
+            device_name=device_name,
+            extra_name=extra_name,
+        )
+        if device is None:
+            continue
+        device_id = device.id
+        # Почасовые и минутные агрегаты считаются в памяти по всем значениям, иначе исказятся avg и count
+        history_aggregator.add(device_id=device_id, value=value, parameter=parameter, time=sample_time)
+        minute_history_aggregator.add(device_id=device_id, value=value, parameter=parameter, time=sample_time)
+        if settings.RAW_SAMPLES_ENABLED:
+            # Сырые значения — полное разрешение: зона нечувствительности сокращает только записи DeviceState
+            sample_writer.put(device_id=device_id, value=value, parameter=parameter, ts=sample_time)
+        device_type = device_types.get(device_name) if device_types else None
+        if change_filter.should_persist(device_id, value, parameter=parameter, device_type=device_type):
+            state_buffer.put(device_id=device_id, value=value, parameter=parameter, last_updated=now)
+            public_state = state_cache.update(controller_id, device, value=value, parameter=parameter, last_updated=now)
+            if public_state is not None:
+                state_hub.publish(controller_id, device_id, public_state)
+        else:
+            state_buffer.touch(device_id=device_id, last_seen=now)
+            state_cache.touch(controller_id, device_id, last_seen=now)
+        if settings.TRIGGERS_ENABLED:
+            trigger_engine.process(controller_id, device_name, parameter, value)
+
+
 async def process_state_message(payload: dict, topic: str):
     async with AsyncSession() as session:
-    # with Session(engine) as session:
-        controller = await get_controller_by_topic(session=session, topic=topic)
+        controller = await controller_cache.get(session=session, topic=topic)
         if not controller:
-            logger.error(f"Controller with topic {topic} not found")
             return
 
+        states: list[StateTuple] = []
+        device_types: dict[str, str] = {}
         for device_name, state in payload.items():
-            device_type = await get_device_type_by_name_and_controller_id(session=session, device_name=device_name, controller_id=controller.id)
             if device_name == 'time':
                 continue
-
+            device_type = await get_device_type(session=session, topic=topic, controller_id=controller.id, device_name=device_name)
             if not device_type:
                 logger.error(f"Device {device_name} not found for controller {controller.id}")
                 continue
-            value = json.dumps(state)
-            if device_type == 'Relay':
-                device = await get_device_by_name_and_controller_id(
-                    session=session,
-                    device_name=device_name,
-                    controller_id=controller.id
-                )
-                value = 1 if state =='on' else 0
-                device_state = await update_or_create_device_state_by_device_id(
-                    session=session,
-                    device_id=device.id,
-                    value=value,
-                )
-
-            elif device_type == 'DS18B20':
-                for parameter, value in state.items():
-                    parameter = parameter
-                    value = value
-                    device = await get_device_by_name_and_controller_id(
-                        session=session,
-                        device_name=device_name,
-                        controller_id=controller.id,
-                        extra_name=parameter,
-                    )
-                    device_state = await update_or_create_device_state_by_device_id(
-                        session=session,
-                        device_id=device.id,
-                        value=value,
-                        parameter=parameter,
-                    )
-            elif device_type == 'DHT':
-                parameter = 'temperature'
-                value = state['temperature']
-                device = await get_device_by_name_and_controller_id(
-                    session=session,
-                    device_name=device_name,
-                    controller_id=controller.id,
-                    extra_name=parameter,
-                )
-                device_state = await update_or_create_device_state_by_device_id(
-                    session=session,
-                    device_id=device.id,
-                    value=value,
-                    parameter=parameter,
-                )
-                parameter = 'humidity'
-                value = state['humidity']
-                device = await get_device_by_name_and_controller_id(
-                    session=session,
-                    device_name=device_name,
-                    controller_id=controller.id,
-                    extra_name=parameter,
-                )
-                device_state = await update_or_create_device_state_by_device_id(
-                    session=session,
-                    device_id=device.id,
-                    value=value,
-                    parameter=parameter,
-                )
-            elif device_type.startswith('MQ'):
-                parameter = 'gas_raw'
-                value = state['gas_raw']
-                device = await get_device_by_name_and_controller_id(
-                    session=session,
-                    device_name=device_name,
-                    controller_id=controller.id,
-                    extra_name=parameter,
-                )
-                device_state = await update_or_create_device_state_by_device_id(
-                    session=session,
-                    device_id=device.id,
-                    value=value,
-                    parameter=parameter,
-                )
-                parameter = 'gas_ppm'
-                value = state['gas_ppm']
-                device = await get_device_by_name_and_controller_id(
-                    session=session,
-                    device_name=device_name,
-                    controller_id=controller.id,
-                    extra_name=parameter,
-                )
-                device_state = await update_or_create_device_state_by_device_id(
-                    session=session,
-                    device_id=device.id,
-                    value=value,
-                    parameter=parameter,
-                )
-            # Update DeviceState
-            else:
-                logger.error(f"Unknown device type {device.type}")
-            continue
-
-            # Update DeviceHistory
-            # await save_to_history(
-            #     session=session,
-            #     device=device,
-            #     data=payload,
-            # )
+            device_types[device_name] = device_type
+            states.extend(extract_states(device_name, device_type, state))
 
-        await session.commit()
+        await write_states(
+            session=session,
+            topic=topic,
+            controller_id=controller.id,
+            states=states,
+            time=payload.get('time'),
+            device_types=device_types,
+        )
@@ -1,9 +1,14 @@
 from copy import deepcopy
 from typing import Optional
 from sqlmodel import select
+from app.core.config import settings
 from app.core.db import AsyncSession
 from app.models import Trigger, Device
 from app.repositories.device_repository import get_or_create_device_by_name_and_controller_id
+from app.services.change_bus import change_bus
+from app.services.device_registry import device_registry
+from app.services.state_cache import state_cache
+from app.services.trigger_engine import trigger_engine
 
 
 async def process_device(
@@ -48,27 +53,34 @@ async def process_triggers(
         device: Device,
         triggers_data: list[dict]
 ) -> None:
-    """Создает или обновляет триггеры устройства"""
+    """
+    Создает или обновляет триггеры устройства.
+    trigger_data: {'device', 'parameter', 'condition', 'threshold', 'action', 'active'}
+    """
     for trigger_data in triggers_data:
-        existing_trigger = await session.exec(
+        result = await session.scalars(
             select(Trigger).where(
                 Trigger.device_id == device.id,
                 Trigger.trigger_device == trigger_data['device'],
-                Trigger.parameter == trigger_data['parameter'],
+                Trigger.parameter == trigger_data.get('parameter', ''),
                 Trigger.condition == trigger_data['condition'],
-                Trigger.threshold == trigger_data['threshold']
+                Trigger.threshold == float(trigger_data['threshold']),
             )
-        ).first()
-
-        if not existing_trigger:
+        )
+        trigger = result.first()
+        if trigger is None:
             trigger = Trigger(
-                **trigger_data,
                 device_id=device.id,
-                active=bool(trigger_data.get('active', True)),
+                trigger_device=trigger_data['device'],
+                parameter=trigger_data.get('parameter', ''),
+                condition=trigger_data['condition'],
+                threshold=float(trigger_data['threshold']),
             )
-            session.add(trigger)
+        trigger.action = trigger_data['action']
+        trigger.active = bool(trigger_data.get('active', True))
+        session.add(trigger)
 
-            await session.commit()
+    await session.commit()
 
 
 async def process_startup_message(
@@ -90,7 +102,7 @@ async def process_startup_message(
         # Обработка разных типов устройств
         match device_data["type"]:
             case "DS18B20":
-                devices = await process_device(
+                created_devices = await process_device(
                     session=session,
                     controller_id=controller_id,
                     device_key=device_key,
@@ -99,7 +111,7 @@ async def process_startup_message(
                 )
 
             case "DHT":
-                devices = await process_device(
+                created_devices = await process_device(
                     session=session,
                     controller_id=controller_id,
                     device_key=device_key,
@@ -108,7 +120,7 @@ async def process_startup_message(
                 )
 
             case "MQ":
-                devices = await process_device(
+                created_devices = await process_device(
                     session=session,
                     controller_id=controller_id,
                     device_key=device_key,
@@ -117,18 +129,24 @@ async def process_startup_message(
                 )
 
             case _:
-                devices = await process_device(
+                created_devices = await process_device(
                     session=session,
                     controller_id=controller_id,
                     device_key=device_key,
                     base_data=base_data
                 )
 
-        # Обработка триггеров для всех устройств
-        # for device in devices:
-        #     if "triggers" in device_data:
-        #         await process_triggers(
-        #             session=session,
-        #             device=device,
-        #             triggers_data=device_data["triggers"]
-        #         )
+        # Команда триггера адресуется устройству по имени, поэтому для датчиков
+        # с несколькими записями триггеры привязываются к первой из них
+        if device_data.get("triggers") and created_devices:
+            await process_triggers(
+                session=session,
+                device=created_devices[0],
+                triggers_data=device_data["triggers"]
+            )
+
+    await device_registry.reload_controller(session=session, controller_id=controller_id)
+    await trigger_engine.reload_controller(session=session, controller_id=controller_id)
+    state_cache.invalidate_controller(controller_id)
+    if settings.CHANGE_BUS_ENABLED:
+        await change_bus.notify_controller(controller_id)
@@ -0,0 +1,105 @@
+from collections import deque
+from datetime import date, datetime, timedelta
+
+from app.core.config import settings
+from app.core.db import DatabaseConnector
+from app.core.setup_logger import setup_logger
+from app.repositories.sample_repository import (
+    copy_samples,
+    create_sample_partition,
+    drop_sample_partitions_before,
+    get_sample_partitions,
+)
+from app.services.flusher import BackgroundFlusher
+
+logger = setup_logger(__name__)
+
+
+def local_now() -> datetime:
+    """Текущее время в settings.TIME_ZONE без зоны — в таком виде хранится ts"""
+    return datetime.now(settings.local_tz).replace(tzinfo=None)
+
+
+class SampleWriter(BackgroundFlusher):
+    """
+    Пишет сырые значения в DeviceSample пачками через COPY.
+    Перед записью создаёт недостающие суточные секции, раз в сутки удаляет
+    секции старше RAW_SAMPLES_RETENTION_DAYS.
+    Пока БД недоступна, значения копятся в ограниченной очереди (старые вытесняются).
+    """
+
+    name = 'sample-writer'
+
+    def __init__(
+        self,
+        flush_interval: float | None = None,
+        max_size: int | None = None,
+        buffer_limit: int | None = None,
+    ):
+        super().__init__(flush_interval or settings.RAW_SAMPLES_FLUSH_INTERVAL)
+        self.max_size = max_size or settings.RAW_SAMPLES_FLUSH_MAX_SIZE
+        self._pending: deque[tuple] = deque(maxlen=buffer_limit or settings.RAW_SAMPLES_BUFFER_LIMIT)
+        self._partitions: set[date] | None = None
+        self._maintained_on: date | None = None
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def put(
+        self,
+        device_id: int,
+        value: float,
+        parameter: str | None = None,
+        ts: datetime | None = None,
+    ) -> None:
+        if len(self._pending) == self._pending.maxlen:
+            self.dropped += 1
+        self._pending.append((device_id, parameter or '', ts or local_now(), float(value)))
+        if len(self._pending) >= self.max_size:
+            self.request_flush()
+
+    async def _prepare_partitions(self, connection, days: set[date]) -> None:
+        if self._partitions is None:
+            self._partitions = await get_sample_partitions(connection)
+
+        # Секции по дням settings.TIME_ZONE, как и ts значений, а не часового пояса сервера
+        today = local_now().date()
+        if self._maintained_on != today:
+            days = days | {today + timedelta(days=n) for n in range(settings.RAW_SAMPLES_PARTITIONS_AHEAD + 1)}
+            if settings.RAW_SAMPLES_RETENTION_DAYS > 0:
+                dropped = await drop_sample_partitions_before(
+                    connection, today - timedelta(days=settings.RAW_SAMPLES_RETENTION_DAYS)
+                )
+                self._partitions.difference_update(dropped)
+            self._maintained_on = today
+
+        for day in sorted(days - self._partitions):
+            await create_sample_partition(connection, day)
+            self._partitions.add(day)
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending:
+                return 0
+            records = list(self._pending)
+            self._pending.clear()
+            try:
+                async with DatabaseConnector.get_async_engine().begin() as connection:
+                    await self._prepare_partitions(connection, {record[2].date() for record in records})
+                    await copy_samples(connection, records)
+            except Exception as e:
+                logger.error(f'Failed to write {len(records)} raw samples: {e}')
+                # Секции могли не создаться — перечитаем их при следующей попытке
+                self._partitions = None
+                self._maintained_on = None
+                # Возвращаем пачку в начало очереди; при переполнении вытесняются самые старые
+                pending = self._pending
+                self._pending = deque(records, maxlen=pending.maxlen)
+                self.dropped += max(0, len(records) + len(pending) - pending.maxlen)
+                self._pending.extend(pending)
+                return 0
+            return len(records)
+
+
+sample_writer = SampleWriter()
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+from app.core.config import settings
+from app.core.db import AsyncSession
+from app.core.setup_logger import setup_logger
+from app.repositories.device_state_repository import bulk_touch_device_states, bulk_upsert_device_states
+from app.services.change_bus import change_bus
+from app.services.flusher import BackgroundFlusher
+
+logger = setup_logger(__name__)
+
+
+class StateBuffer(BackgroundFlusher):
+    """
+    Write-behind буфер состояний устройств.
+    Хранит только последнее значение по устройству и сбрасывает накопленное
+    одним multi-row upsert по таймеру или при достижении порога.
+    DeviceState хранит одну строку на устройство (PK device_id), поэтому
+    ключ (device_id, parameter) сводится к device_id.
+    touch() отмечает только last_seen для значений, отсечённых зоной нечувствительности:
+    они сбрасываются одним UPDATE, без перезаписи value.
+    """
+
+    name = 'state-buffer'
+
+    def __init__(self, flush_interval: float | None = None, max_size: int | None = None):
+        super().__init__(flush_interval or settings.STATE_FLUSH_INTERVAL)
+        self.max_size = max_size or settings.STATE_FLUSH_MAX_SIZE
+        self._pending: dict[int, dict] = {}
+        self._seen: dict[int, datetime] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def put(
+        self,
+        device_id: int,
+        value: float,
+        parameter: str | None = None,
+        last_updated: datetime | None = None,
+    ) -> None:
+        last_updated = last_updated or datetime.now()
+        self._pending[device_id] = {
+            'device_id': device_id,
+            'parameter': parameter,
+            'value': value,
+            'last_updated': last_updated,
+            'last_seen': last_updated,
+        }
+        self._seen.pop(device_id, None)
+        if len(self._pending) >= self.max_size:
+            self.request_flush()
+
+    def touch(self, device_id: int, last_seen: datetime | None = None) -> None:
+        last_seen = last_seen or datetime.now()
+        row = self._pending.get(device_id)
+        if row is not None:
+            row['last_seen'] = last_seen
+        else:
+            self._seen[device_id] = last_seen
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending and not self._seen:
+                return 0
+            rows, self._pending = self._pending, {}
+            seen, self._seen = self._seen, {}
+            try:
+                async with AsyncSession() as session:
+                    await bulk_upsert_device_states(session, list(rows.values()))
+                    await bulk_touch_device_states(session, seen)
+            except Exception as e:
+                logger.error(f'Failed to flush {len(rows)} device states: {e}')
+                # Возвращаем в буфер то, что не успели перезаписать более свежими значениями
+                for device_id, row in rows.items():
+                    self._pending.setdefault(device_id, row)
+                for device_id, last_seen in seen.items():
+                    if device_id not in self._pending:
+                        self._seen.setdefault(device_id, last_seen)
+                return 0
+            if settings.CHANGE_BUS_ENABLED and rows:
+                await change_bus.notify_states(list(rows.values()))
+            return len(rows)
+
+
+state_buffer = StateBuffer()
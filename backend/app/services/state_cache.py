@@ -0,0 +1,293 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.setup_logger import setup_logger
+from app.models import ControllerBoard, DeviceState
+from app.models.device_state import DeviceStatePublic
+from app.repositories.device_state_repository import (
+    get_controller_device_states,
+    get_device_states_by_controller_ids,
+    get_device_states_statement,
+)
+from app.services.device_registry import DeviceInfo
+
+logger = setup_logger(__name__)
+
+
+class StateCache:
+    """
+    Последние состояния устройств по контроллерам для /controller_state.
+    Наполняется обработкой входящих сообщений в этом же процессе (local_ingest)
+    и изменениями других процессов через шину LISTEN/NOTIFY (synced).
+    Отвечать из памяти можно, только если кэш видит все изменения (authoritative);
+    иначе изменения не принимаются вовсе — например, в процессе app.ingest,
+    где кэш никто не читает (serving выставляет только lifespan API).
+    Контроллер, которого нет в кэше, загружается одним запросом и дальше
+    поддерживается ingest'ом.
+    Изменения, которые некуда положить (контроллер не загружен или сброшен,
+    устройство неизвестно), откладываются по устройству и накладываются на
+    результат загрузки, если они новее прочитанного: иначе значение, ещё не
+    записанное буфером или пришедшее во время запроса, потерялось бы до
+    следующего изменения (с зоной нечувствительности — до STATE_MAX_SILENCE).
+    """
+
+    def __init__(self):
+        self._states: dict[int, dict[int, DeviceStatePublic]] = {}
+        self._controllers: dict[int, tuple[str, Optional[str]]] = {}
+        self._device_controllers: dict[int, int] = {}
+        # device_id → отложенные изменения: value/parameter/last_updated, last_seen,
+        # device (DeviceInfo) и controller_id, если известны
+        self._deferred: dict[int, dict] = {}
+        self.serving = False
+        self.local_ingest = False
+        self.synced = False
+
+    @property
+    def authoritative(self) -> bool:
+        return self.serving and (self.local_ingest or self.synced)
+
+    def __len__(self) -> int:
+        return sum(len(states) for states in self._states.values())
+
+    def get_controller(self, controller_id: int) -> list[DeviceStatePublic] | None:
+        """Состояния контроллера или None, если контроллер ещё не загружен"""
+        states = self._states.get(controller_id)
+        if states is None:
+            return None
+        return list(states.values())
+
+    def _defer(self, device_id: int, **changes) -> None:
+        deferred = self._deferred.setdefault(device_id, {})
+        last_updated = changes.get('last_updated')
+        if last_updated is not None and last_updated >= deferred.get('last_updated', last_updated):
+            deferred.update(value=changes['value'], parameter=changes['parameter'], last_updated=last_updated)
+        last_seen = changes.get('last_seen') or last_updated
+        if last_seen is not None and last_seen > deferred.get('last_seen', datetime.min):
+            deferred['last_seen'] = last_seen
+        for key in ('device', 'controller_id'):
+            if changes.get(key) is not None:
+                deferred[key] = changes[key]
+
+    def apply_deferred(self, controller: ControllerBoard, states: dict[int, DeviceStatePublic]) -> None:
+        """Накладывает отложенные изменения на прочитанные из БД состояния контроллера"""
+        if not self._deferred:
+            return
+        for device_id, state in states.items():
+            deferred = self._deferred.pop(device_id, None)
+            if deferred:
+                states[device_id] = merge_changes(state, deferred)
+        # Устройства, которых ещё нет в БД (первое значение не записано), — по данным ingest
+        new_devices = [
+            device_id for device_id, deferred in self._deferred.items()
+            if deferred.get('controller_id') == controller.id and deferred.get('device') and 'value' in deferred
+        ]
+        for device_id in new_devices:
+            deferred = self._deferred.pop(device_id)
+            device = deferred['device']
+            states[device_id] = DeviceStatePublic(
+                topic=controller.topic,
+                controller_description=controller.description,
+                device_name=device.name,
+                device_type=device.type,
+                device_description=device.description,
+                parameter=deferred['parameter'],
+                value=deferred['value'],
+                last_updated=deferred['last_updated'],
+                last_seen=deferred.get('last_seen'),
+            )
+
+    def load_controller(self, controller: ControllerBoard, states: list[DeviceState]) -> list[DeviceStatePublic]:
+        """
+        Кладёт в кэш результат запроса с уже загруженными device и controller
+        вместе с отложенными изменениями, пришедшими до загрузки
+        """
+        self._controllers[controller.id] = (controller.topic, controller.description)
+        public_states = {state.device_id: DeviceStatePublic.from_db_state(state) for state in states}
+        self.apply_deferred(controller, public_states)
+        self._states[controller.id] = public_states
+        self._device_controllers.update((device_id, controller.id) for device_id in public_states)
+        return list(public_states.values())
+
+    def update(
+        self,
+        controller_id: int,
+        device: DeviceInfo,
+        value: float,
+        parameter: Optional[str] = None,
+        last_updated: Optional[datetime] = None,
+    ) -> DeviceStatePublic | None:
+        """Обновляет состояние и возвращает его; None — контроллер не загружен"""
+        if not self.authoritative:
+            return None
+        last_updated = last_updated or datetime.now()
+        states = self._states.get(controller_id)
+        if states is None:
+            # Контроллер прочитается из БД при первом запросе, значение — наложится
+            self._defer(
+                device.id,
+                value=value,
+                parameter=parameter,
+                last_updated=last_updated,
+                device=device,
+                controller_id=controller_id,
+            )
+            return None
+        topic, controller_description = self._controllers[controller_id]
+        state = states[device.id] = DeviceStatePublic(
+            topic=topic,
+            controller_description=controller_description,
+            device_name=device.name,
+            device_type=device.type,
+            device_description=device.description,
+            parameter=parameter,
+            value=value,
+            last_updated=last_updated,
+            last_seen=last_updated,
+        )
+        self._device_controllers[device.id] = controller_id
+        return state
+
+    def apply(
+        self,
+        device_id: int,
+        value: float,
+        parameter: Optional[str],
+        last_updated: datetime,
+        last_seen: Optional[datetime] = None,
+    ) -> tuple[int, DeviceStatePublic] | None:
+        """
+        Применяет изменение, записанное другим процессом. Если контроллер не
+        загружен, откладывает изменение до загрузки. Для неизвестного устройства
+        загруженного контроллера сбрасывает контроллер целиком (описание
+        устройства взять неоткуда) и возвращает None.
+        """
+        if not self.authoritative:
+            return None
+        controller_id = self._device_controllers.get(device_id)
+        states = self._states.get(controller_id) if controller_id is not None else None
+        if states is None:
+            self._defer(device_id, value=value, parameter=parameter, last_updated=last_updated, last_seen=last_seen)
+            return None
+        state = states.get(device_id)
+        if state is None:
+            self._defer(device_id, value=value, parameter=parameter, last_updated=last_updated, last_seen=last_seen)
+            self.invalidate_controller(controller_id)
+            return None
+        state = states[device_id] = state.model_copy(update={
+            'value': value,
+            'parameter': parameter,
+            'last_updated': last_updated,
+            'last_seen': last_seen or last_updated,
+        })
+        return controller_id, state
+
+    def touch(self, controller_id: int, device_id: int, last_seen: Optional[datetime] = None) -> None:
+        if not self.authoritative:
+            return
+        last_seen = last_seen or datetime.now()
+        states = self._states.get(controller_id)
+        if states is None:
+            self._defer(device_id, last_seen=last_seen, controller_id=controller_id)
+            return
+        state = states.get(device_id)
+        if state is not None:
+            state.last_seen = last_seen
+
+    def invalidate_controller(self, controller_id: int) -> None:
+        """
+        Сбрасывает контроллер. Его значения откладываются: в БД их ещё может не быть
+        (буфер не записан), а при перезагрузке более свежие из БД их перекроют.
+        """
+        states = self._states.pop(controller_id, None) or {}
+        self._controllers.pop(controller_id, None)
+        for device_id, state in states.items():
+            self._device_controllers.pop(device_id, None)
+            self._defer(
+                device_id,
+                value=state.value,
+                parameter=state.parameter,
+                last_updated=state.last_updated,
+                last_seen=state.last_seen,
+            )
+
+    def clear(self) -> None:
+        self._states = {}
+        self._controllers = {}
+        self._device_controllers = {}
+        self._deferred = {}
+
+    async def load(self, session: AsyncSession) -> None:
+        """Загружает все контроллеры и состояния (прогрев при старте ingest)"""
+        controllers = (await session.scalars(select(ControllerBoard))).all()
+        states = (await session.scalars(get_device_states_statement())).unique().all()
+        by_controller: dict[int, list[DeviceState]] = {controller.id: [] for controller in controllers}
+        for state in states:
+            by_controller.setdefault(state.device.controller_id, []).append(state)
+        self.clear()
+        for controller in controllers:
+            self.load_controller(controller, by_controller[controller.id])
+        logger.info(f'State cache loaded: {len(self)} states of {len(controllers)} controllers')
+
+
+state_cache = StateCache()
+
+
+def merge_changes(state: DeviceStatePublic, changes: dict) -> DeviceStatePublic:
+    """Состояние с изменениями changes, если они новее (по last_updated / last_seen)"""
+    update = {}
+    last_updated = changes.get('last_updated')
+    if last_updated is not None and last_updated >= state.last_updated:
+        update.update(value=changes['value'], parameter=changes['parameter'], last_updated=last_updated)
+    last_seen = changes.get('last_seen')
+    if last_seen is not None and (state.last_seen is None or last_seen > state.last_seen):
+        update['last_seen'] = last_seen
+    return state.model_copy(update=update) if update else state
+
+
+async def get_controller_states(session: AsyncSession, controller_id: int) -> list[DeviceStatePublic] | None:
+    """
+    Состояния контроллера: из кэша, если он полон, иначе одним запросом
+    (результат заполняет кэш). None — контроллер не найден.
+    """
+    if state_cache.authoritative:
+        public_states = state_cache.get_controller(controller_id)
+        if public_states is not None:
+            return public_states
+
+    controller, device_states = await get_controller_device_states(session=session, controller_id=controller_id)
+    if not controller:
+        return None
+    if state_cache.authoritative:
+        return state_cache.load_controller(controller, device_states)
+    return [DeviceStatePublic.from_db_state(state) for state in device_states]
+
+
+async def get_boards_states(session: AsyncSession, controllers: list[ControllerBoard]) -> dict[int, list[DeviceStatePublic]]:
+    """
+    Состояния страницы контроллеров: закэшированные — из памяти,
+    остальные — одним запросом на всю страницу, а не по запросу на контроллер.
+    """
+    result: dict[int, list[DeviceStatePublic]] = {}
+    missing = []
+    for controller in controllers:
+        public_states = state_cache.get_controller(controller.id) if state_cache.authoritative else None
+        if public_states is None:
+            missing.append(controller)
+        else:
+            result[controller.id] = public_states
+    if not missing:
+        return result
+
+    by_controller: dict[int, list[DeviceState]] = {controller.id: [] for controller in missing}
+    states = await get_device_states_by_controller_ids(session=session, controller_ids=list(by_controller))
+    for state in states:
+        by_controller[state.device.controller_id].append(state)
+    for controller in missing:
+        if state_cache.authoritative:
+            result[controller.id] = state_cache.load_controller(controller, by_controller[controller.id])
+        else:
+            result[controller.id] = [DeviceStatePublic.from_db_state(state) for state in by_controller[controller.id]]
+    return result
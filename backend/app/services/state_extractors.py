@@ -0,0 +1,55 @@
+from typing import Any, Callable, Optional
+
+# ((имя устройства, extra_name), параметр, значение)
+DeviceKey = tuple[str, Optional[str]]
+StateTuple = tuple[DeviceKey, Optional[str], float]
+Extractor = Callable[[str, Any], list[StateTuple]]
+
+_extractors: dict[str, Extractor] = {}
+
+
+def register_extractor(*device_types: str) -> Callable[[Extractor], Extractor]:
+    """
+    Регистрирует функцию, превращающую фрагмент payload устройства
+    в плоский список (device_key, parameter, value).
+    """
+    def decorator(extractor: Extractor) -> Extractor:
+        for device_type in device_types:
+            _extractors[device_type] = extractor
+        return extractor
+    return decorator
+
+
+def get_extractor(device_type: str) -> Extractor | None:
+    extractor = _extractors.get(device_type)
+    if extractor is None:
+        # Семейства датчиков (MQ2, MQ135, ...) регистрируются по префиксу
+        for prefix, candidate in _extractors.items():
+            if device_type.startswith(prefix):
+                return candidate
+    return extractor
+
+
+def fixed_parameters_extractor(*parameters: str) -> Extractor:
+    """Датчик с фиксированным набором параметров, каждый параметр — отдельное устройство (extra_name)"""
+    def extract(device_name: str, state: dict) -> list[StateTuple]:
+        return [
+            ((device_name, parameter), parameter, float(state[parameter]))
+            for parameter in parameters
+            if parameter in state
+        ]
+    return extract
+
+
+@register_extractor('Relay')
+def extract_relay(device_name: str, state: str) -> list[StateTuple]:
+    return [((device_name, None), None, 1 if state == 'on' else 0)]
+
+
+@register_extractor('DS18B20')
+def extract_ds18b20(device_name: str, state: dict) -> list[StateTuple]:
+    return [((device_name, sensor), sensor, float(value)) for sensor, value in state.items()]
+
+
+register_extractor('DHT')(fixed_parameters_extractor('temperature', 'humidity'))
+register_extractor('MQ')(fixed_parameters_extractor('gas_raw', 'gas_ppm'))
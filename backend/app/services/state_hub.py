@@ -0,0 +1,94 @@
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+from app.core.setup_logger import setup_logger
+from app.models.device_state import DeviceStatePublic
+
+logger = setup_logger(__name__)
+
+
+class Subscription:
+    """
+    Подписка на изменения состояний: по контроллеру или по префиксу топика.
+    Буфер ограничен и хранит только последнее значение каждого устройства:
+    медленный клиент получает свежие значения, пропуская промежуточные,
+    а публикация никогда не ждёт клиента.
+    """
+
+    def __init__(self, controller_id: Optional[int] = None, topic: Optional[str] = None, maxsize: int | None = None):
+        self.controller_id = controller_id
+        self.topic = topic
+        self.maxsize = maxsize or settings.STREAM_BUFFER_SIZE
+        self._pending: OrderedDict[int, DeviceStatePublic] = OrderedDict()
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self.coalesced = 0
+
+    def matches(self, controller_id: int, state: DeviceStatePublic) -> bool:
+        if self.controller_id is not None and self.controller_id != controller_id:
+            return False
+        return self.topic is None or state.topic.startswith(self.topic)
+
+    def offer(self, device_id: int, state: DeviceStatePublic) -> None:
+        if device_id in self._pending:
+            self.coalesced += 1
+            self._pending.move_to_end(device_id)
+        elif len(self._pending) >= self.maxsize:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        self._pending[device_id] = state
+        self._ready.set()
+
+    async def get(self, timeout: float | None = None) -> list[DeviceStatePublic]:
+        """Ждёт изменений и забирает все накопленные; по таймауту — пустой список"""
+        if not self._pending:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                return []
+        states = list(self._pending.values())
+        self._pending.clear()
+        self._ready.clear()
+        return states
+
+
+class StateHub:
+    """Раздаёт изменения состояний из ingest подписчикам WebSocket/SSE этого процесса"""
+
+    def __init__(self):
+        self._by_controller: dict[int, set[Subscription]] = {}
+        self._by_topic: set[Subscription] = set()
+
+    def __len__(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._by_controller.values()) + len(self._by_topic)
+
+    def subscribe(self, controller_id: Optional[int] = None, topic: Optional[str] = None) -> Subscription:
+        subscription = Subscription(controller_id=controller_id, topic=topic)
+        if controller_id is not None:
+            self._by_controller.setdefault(controller_id, set()).add(subscription)
+        else:
+            self._by_topic.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        if subscription.controller_id is not None:
+            subscriptions = self._by_controller.get(subscription.controller_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._by_controller[subscription.controller_id]
+        else:
+            self._by_topic.discard(subscription)
+
+    def publish(self, controller_id: int, device_id: int, state: DeviceStatePublic) -> None:
+        for subscription in self._by_controller.get(controller_id, ()):
+            if subscription.matches(controller_id, state):
+                subscription.offer(device_id, state)
+        for subscription in self._by_topic:
+            if subscription.matches(controller_id, state):
+                subscription.offer(device_id, state)
+
+
+state_hub = StateHub()
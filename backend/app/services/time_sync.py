@@ -0,0 +1,111 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytz
+
+from app.core.config import settings
+from app.core.setup_logger import setup_logger
+from app.mqtt.envelope import dumps
+
+logger = setup_logger(__name__)
+
+
+def get_time_zone(name: str | None):
+    """Часовой пояс по имени; неизвестное или пустое имя — settings.TIME_ZONE"""
+    if name:
+        try:
+            return pytz.timezone(name)
+        except pytz.UnknownTimeZoneError:
+            logger.warning(f'Unknown time zone {name}, using {settings.TIME_ZONE}')
+    return settings.local_tz
+
+
+def build_time_data(current_time: datetime) -> dict:
+    """Ответ в формате worldtimeapi.org, который ожидают контроллеры"""
+    utc_offset = current_time.utcoffset()
+    dst_offset = current_time.dst()
+    offset_seconds = int(utc_offset.total_seconds())
+    sign = '+' if offset_seconds >= 0 else '-'
+    hours, minutes = divmod(abs(offset_seconds) // 60, 60)
+    return {
+        "abbreviation": current_time.tzname(),
+        "client_ip": "0.0.0.0",  # Можно оставить заглушку
+        "datetime": current_time.isoformat(),
+        "day_of_week": str(current_time.weekday() + 1),  # 1-7 (понедельник-воскресенье)
+        "day_of_year": str(current_time.timetuple().tm_yday),
+        "dst": bool(dst_offset),
+        "dst_from": None,
+        "dst_offset": int(dst_offset.total_seconds()) if dst_offset else 0,
+        "dst_until": None,
+        "raw_offset": offset_seconds - (int(dst_offset.total_seconds()) if dst_offset else 0),
+        "timezone": current_time.tzinfo.zone,
+        "unixtime": int(current_time.timestamp()),
+        "utc_datetime": current_time.astimezone(pytz.utc).isoformat(),
+        "utc_offset": f"{sign}{hours:02d}:{minutes:02d}",
+        "week_number": str(current_time.isocalendar()[1]),
+    }
+
+
+class TimeSyncService:
+    """
+    Ответы на /gettime.
+    Сериализованный ответ кэшируется на секунду для каждого часового пояса,
+    а запросы, пришедшие за TIME_SYNC_BATCH_WINDOW, отправляются одним циклом публикаций.
+    """
+
+    def __init__(self, batch_window: float | None = None):
+        self.batch_window = batch_window if batch_window is not None else settings.TIME_SYNC_BATCH_WINDOW
+        self._payloads: dict[str, tuple[int, str]] = {}
+        self._pending: dict[str, str] = {}
+        self._client = None
+        self._flush_task: asyncio.Task | None = None
+
+    def get_payload(self, tz_name: str | None = None) -> str:
+        tz = get_time_zone(tz_name)
+        second = int(time.time())
+        cached = self._payloads.get(tz.zone)
+        if cached is not None and cached[0] == second:
+            return cached[1]
+        current_time = datetime.fromtimestamp(second, tz)
+        payload = dumps(build_time_data(current_time))
+        self._payloads[tz.zone] = (second, payload)
+        return payload
+
+    def request(self, client, response_topic: str, tz_name: str | None = None) -> None:
+        """Ставит ответ в ближайшую пачку; повторные запросы одного топика схлопываются"""
+        self._client = client
+        self._pending[response_topic] = tz_name
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.batch_window)
+        await self.flush()
+
+    async def stop(self) -> None:
+        """Отменяет отложенную отправку и сразу отправляет накопленные ответы, пока клиент подключён"""
+        task, self._flush_task = self._flush_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._pending:
+            await self.flush()
+        self._client = None
+
+    async def flush(self) -> int:
+        pending, self._pending = self._pending, {}
+        for response_topic, tz_name in pending.items():
+            try:
+                await self._client.publish(response_topic, self.get_payload(tz_name))
+            except Exception as e:
+                logger.error(f"Failed to send time data to {response_topic}: {e}")
+        if pending:
+            logger.info(f"Sent time data to {len(pending)} controllers")
+        return len(pending)
+
+
+time_sync = TimeSyncService()
@@ -0,0 +1,165 @@
+import asyncio
+import operator
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from sqlmodel import select
+
+from app.core.db import AsyncSession
+from app.core.setup_logger import setup_logger
+from app.models import ControllerBoard, Device, Trigger
+
+logger = setup_logger(__name__)
+
+# Publisher(topic, payload) — MQTTClientManager.send_mqtt_message
+Publisher = Callable[[str, str], Awaitable[None]]
+# (controller_id, имя устройства-источника, параметр)
+TriggerKey = tuple[int, str, str]
+
+CONDITIONS: dict[str, Callable[[float, float], bool]] = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledTrigger:
+    id: int
+    compare: Callable[[float, float], bool]
+    threshold: float
+    topic: str  # куда публикуется команда: <топик контроллера>/set/<устройство>
+    action: str
+
+    def matches(self, value: float) -> bool:
+        return self.compare(value, self.threshold)
+
+
+class TriggerEngine:
+    """
+    Активные триггеры, скомпилированные в индекс
+    (controller_id, trigger_device, parameter) → триггеры.
+    Каждое входящее значение проверяет только свои триггеры; действие
+    публикуется при переходе условия из «ложно» в «истинно», а не на каждое сообщение.
+    Индекс строится целиком в стороне и подменяется одной ссылкой — обработка
+    сообщений не ждёт перестроения.
+    """
+
+    def __init__(self):
+        self._index: dict[TriggerKey, tuple[CompiledTrigger, ...]] = {}
+        self._controllers: dict[int, frozenset[TriggerKey]] = {}
+        self._active: set[int] = set()
+        self._publisher: Optional[Publisher] = None
+        self._tasks: set[asyncio.Task] = set()
+        self.loaded = False
+        self.fired = 0
+
+    def __len__(self) -> int:
+        return sum(len(triggers) for triggers in self._index.values())
+
+    def set_publisher(self, publisher: Optional[Publisher]) -> None:
+        self._publisher = publisher
+
+    @staticmethod
+    def compile(trigger: Trigger, topic: str, device_name: str) -> CompiledTrigger | None:
+        compare = CONDITIONS.get(trigger.condition.strip())
+        if compare is None:
+            logger.warning(f'Trigger {trigger.id}: unknown condition `{trigger.condition}`, skipped')
+            return None
+        return CompiledTrigger(
+            id=trigger.id,
+            compare=compare,
+            threshold=trigger.threshold,
+            topic=f'{topic}/set/{device_name}',
+            action=trigger.action,
+        )
+
+    @staticmethod
+    def _statement():
+        return (
+            select(Trigger, Device.controller_id, Device.name, ControllerBoard.topic)
+            .join(Device, Trigger.device_id == Device.id)
+            .join(ControllerBoard, Device.controller_id == ControllerBoard.id)
+            .where(Trigger.active)
+        )
+
+    def _build(self, rows) -> dict[int, dict[TriggerKey, list[CompiledTrigger]]]:
+        by_controller: dict[int, dict[TriggerKey, list[CompiledTrigger]]] = {}
+        for trigger, controller_id, device_name, topic in rows:
+            compiled = self.compile(trigger, topic, device_name)
+            if compiled is None:
+                continue
+            key = (controller_id, trigger.trigger_device, trigger.parameter or '')
+            by_controller.setdefault(controller_id, {}).setdefault(key, []).append(compiled)
+        return by_controller
+
+    def _swap(self, index: dict, controllers: dict) -> None:
+        self._index = index
+        self._controllers = controllers
+        ids = {trigger.id for triggers in index.values() for trigger in triggers}
+        # Состояние «условие выполнено» сохраняем только для оставшихся триггеров
+        self._active &= ids
+
+    async def load(self, session: AsyncSession) -> None:
+        """Загружает все активные триггеры одним запросом"""
+        result = await session.execute(self._statement())
+        index, controllers = {}, {}
+        for controller_id, entries in self._build(result.all()).items():
+            controllers[controller_id] = frozenset(entries)
+            index.update({key: tuple(triggers) for key, triggers in entries.items()})
+        self._swap(index, controllers)
+        self.loaded = True
+        logger.info(f'Trigger engine loaded: {len(self)} triggers')
+
+    async def reload_controller(self, session: AsyncSession, controller_id: int) -> None:
+        """Перестраивает триггеры одного контроллера (после загрузки devices.json)"""
+        result = await session.execute(self._statement().where(Device.controller_id == controller_id))
+        entries = self._build(result.all()).get(controller_id, {})
+        stale = self._controllers.get(controller_id, frozenset())
+        index = {key: triggers for key, triggers in self._index.items() if key not in stale}
+        index.update({key: tuple(triggers) for key, triggers in entries.items()})
+        controllers = {**self._controllers, controller_id: frozenset(entries)}
+        self._swap(index, controllers)
+
+    def evaluate(self, controller_id: int, device_name: str, parameter: Optional[str], value: float) -> list[CompiledTrigger]:
+        """Проверяет значение и возвращает сработавшие триггеры"""
+        triggers = self._index.get((controller_id, device_name, parameter or ''))
+        if not triggers:
+            return []
+        fired = []
+        for trigger in triggers:
+            if trigger.matches(value):
+                if trigger.id not in self._active:
+                    self._active.add(trigger.id)
+                    fired.append(trigger)
+            else:
+                self._active.discard(trigger.id)
+        return fired
+
+    def process(self, controller_id: int, device_name: str, parameter: Optional[str], value: float) -> None:
+        """evaluate() и публикация действий в фоне, не задерживая обработку сообщения"""
+        for trigger in self.evaluate(controller_id, device_name, parameter, value):
+            self.fired += 1
+            if self._publisher is None:
+                logger.warning(f'Trigger {trigger.id} fired but MQTT publisher is not set')
+                continue
+            task = asyncio.create_task(self._publish(trigger))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _publish(self, trigger: CompiledTrigger) -> None:
+        try:
+            await self._publisher(trigger.topic, trigger.action)
+            logger.info(f'Trigger {trigger.id} fired: {trigger.topic} <- {trigger.action}')
+        except Exception as e:
+            logger.error(f'Trigger {trigger.id}: failed to publish action: {e}')
+
+    def clear(self) -> None:
+        self._swap({}, {})
+        self.loaded = False
+
+
+trigger_engine = TriggerEngine()
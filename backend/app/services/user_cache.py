@@ -0,0 +1,91 @@
+import time
+import uuid
+from dataclasses import dataclass
+
+import jwt
+from jwt.exceptions import InvalidTokenError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import Session
+
+from app.core import security
+from app.core.cache import MISSING, TTLCache
+from app.core.config import settings
+from app.models.user import TokenPayload, User
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Всё, что нужно проверкам доступа, без загрузки пользователя целиком"""
+    id: uuid.UUID
+    is_active: bool
+    is_superuser: bool
+
+
+class UserCache:
+    """
+    Кэш аутентификации: токен → id пользователя (до истечения токена, не дольше ttl)
+    и id → Principal (ttl). Изменение или удаление пользователя сбрасывает его запись,
+    в других процессах — через шину изменений; ttl ограничивает устаревание в остальных случаях.
+    """
+
+    def __init__(self, maxsize: int | None = None, ttl: float | None = None):
+        maxsize = maxsize or settings.AUTH_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else settings.AUTH_CACHE_TTL
+        self._tokens = TTLCache(maxsize=maxsize, ttl=self.ttl)
+        self._users = TTLCache(maxsize=maxsize, ttl=self.ttl)
+
+    def decode(self, token: str) -> uuid.UUID:
+        """id пользователя из токена; InvalidTokenError — токен невалиден"""
+        user_id = self._tokens.get(token)
+        if user_id is not MISSING:
+            return user_id
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+        try:
+            user_id = uuid.UUID(TokenPayload(**payload).sub)
+        except (TypeError, ValueError):
+            raise InvalidTokenError('Invalid token subject')
+        ttl = self.ttl
+        if 'exp' in payload:
+            ttl = min(ttl, payload['exp'] - time.time())
+        if ttl > 0:
+            self._tokens.set(token, user_id, ttl=ttl)
+        return user_id
+
+    @staticmethod
+    def _statement(user_id: uuid.UUID):
+        return select(User.id, User.is_active, User.is_superuser).where(User.id == user_id)
+
+    def _store(self, row) -> Principal | None:
+        if row is None:
+            return None
+        principal = Principal(id=row.id, is_active=row.is_active, is_superuser=row.is_superuser)
+        self._users.set(row.id, principal)
+        return principal
+
+    async def get(self, session: AsyncSession, token: str) -> Principal | None:
+        """Principal по токену; None — пользователь не найден"""
+        user_id = self.decode(token)
+        principal = self._users.get(user_id)
+        if principal is not MISSING:
+            return principal
+        result = await session.execute(self._statement(user_id))
+        return self._store(result.first())
+
+    def get_sync(self, session: Session, token: str) -> Principal | None:
+        """get() на синхронной сессии — для эндпоинтов, работающих через SessionDep"""
+        user_id = self.decode(token)
+        principal = self._users.get(user_id)
+        if principal is not MISSING:
+            return principal
+        return self._store(session.exec(self._statement(user_id)).first())
+
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        self._users.pop(user_id)
+
+    def clear(self) -> None:
+        self._tokens.clear()
+        self._users.clear()
+
+
+user_cache = UserCache()
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import engine
+from app.models import DeviceHistory
+
+
+def test_get_device_history_fills_gaps(
+    client: TestClient, superuser_token_headers: dict[str, str], created_device
+) -> None:
+    hour = datetime(2025, 4, 6, 10)
+    with Session(engine) as session:
+        session.add(DeviceHistory(
+            device_id=created_device.id, hour=hour, min_value=1, max_value=5, sum_value=12, count=4,
+        ))
+        session.add(DeviceHistory(
+            device_id=created_device.id, hour=hour + timedelta(hours=2), min_value=2, max_value=2, sum_value=2, count=1,
+        ))
+        session.commit()
+
+    response = client.get(
+        f"{settings.API_V1_STR}/devices/{created_device.id}/history",
+        headers=superuser_token_headers,
+        params={'from': '2025-04-06T10:00:00', 'to': '2025-04-06T13:00:00', 'bucket': '1h', 'agg': 'min,max,avg'},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content['tier'] == '1h'
+    assert content['bucket'] == 3600
+    assert content['time'] == ['2025-04-06T10:00:00', '2025-04-06T11:00:00', '2025-04-06T12:00:00']
+    assert content['values'] == {
+        'min': [1, None, 2],
+        'max': [5, None, 2],
+        'avg': [3, None, 2],
+    }
+
+
+def test_get_device_history_rejects_unknown_aggregate(
+    client: TestClient, superuser_token_headers: dict[str, str], created_device
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/devices/{created_device.id}/history",
+        headers=superuser_token_headers,
+        params={'agg': 'median'},
+    )
+    assert response.status_code == 400
+
+
+def test_get_device_history_not_found(client: TestClient, superuser_token_headers: dict[str, str]) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/devices/999999/history",
+        headers=superuser_token_headers,
+    )
+    assert response.status_code == 404
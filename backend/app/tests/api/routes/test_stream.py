@@ -0,0 +1,29 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.routes.stream import authenticate_sse, get_snapshot
+
+
+@pytest.mark.asyncio
+async def test_authenticate_sse_requires_token():
+    with pytest.raises(HTTPException) as e:
+        await authenticate_sse(header_token=None, token=None)
+    assert e.value.status_code == 401
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_authenticate_sse_accepts_query_token(superuser_token_headers):
+    token = superuser_token_headers['Authorization'].removeprefix('Bearer ')
+    principal = await authenticate_sse(header_token=None, token=token)
+    assert principal.is_superuser
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_get_snapshot_by_topic_prefix(created_device_state, created_controller_board):
+    snapshot = await get_snapshot(controller_id=None, topic='test1/')
+    assert [state.topic for state in snapshot] == ['test1/test2/test3']
+    assert await get_snapshot(controller_id=None, topic='missing/') == []
+    snapshot = await get_snapshot(controller_id=created_controller_board.id, topic=None)
+    assert [state.topic for state in snapshot] == ['test1/test2/test3']
@@ -0,0 +1,49 @@
+import sys
+import threading
+
+from app.core.cache import MISSING, TTLCache
+
+
+def test_ttl_cache_expiry_and_lru():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', None)
+    assert cache.get('a') is None  # отрицательный результат тоже кэшируется
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is MISSING  # вытеснена давно не использованная запись
+    cache.set('d', 4, ttl=-1)
+    assert cache.get('d') is MISSING
+
+
+def test_ttl_cache_concurrent_access():
+    # Частое переключение потоков, чтобы гонка между проверкой и удалением проявлялась
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    # Записи истекают сразу: потоки одновременно удаляют и перечитывают одни и те же ключи
+    cache = TTLCache(maxsize=50, ttl=0)
+    errors = []
+    start = threading.Barrier(8)
+
+    def worker(seed: int):
+        start.wait()
+        try:
+            for i in range(5000):
+                key = (seed + i) % 100
+                cache.set(key, i)
+                cache.get(key)
+                if i % 7 == 0:
+                    cache.pop(key)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert errors == []
+    assert len(cache) <= 50
@@ -0,0 +1,34 @@
+import pytest
+from sqlmodel import text
+
+from app.core.config import settings
+from app.core.db import AsyncSession, DatabaseConnector
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_async_sessions_share_engine():
+    async with AsyncSession() as session:
+        first_bind = session.bind
+    async with AsyncSession() as session:
+        second_bind = session.bind
+    assert first_bind is second_bind
+    assert first_bind is DatabaseConnector.get_async_engine()
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_search_path_set_on_connect():
+    async with AsyncSession() as session:
+        result = await session.execute(text('SHOW search_path'))
+    assert settings.POSTGRES_SCHEMA in result.scalar()
+
+
+def test_ingest_role_uses_ingest_pool(monkeypatch):
+    monkeypatch.setattr(settings, 'APP_ROLE', 'ingest')
+    options = DatabaseConnector.get_pool_options()
+    assert options['pool_size'] == settings.INGEST_DB_POOL_SIZE
+    assert options['max_overflow'] == settings.INGEST_DB_MAX_OVERFLOW
+
+    monkeypatch.setattr(settings, 'APP_ROLE', 'api')
+    assert DatabaseConnector.get_pool_options()['pool_size'] == settings.DB_POOL_SIZE
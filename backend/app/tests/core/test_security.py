@@ -0,0 +1,13 @@
+import pytest
+
+from app.core.security import get_password_hash, get_password_hash_async, verify_password, verify_password_async
+
+
+@pytest.mark.asyncio
+async def test_password_hash_async_round_trip():
+    hashed = await get_password_hash_async('secret')
+    assert await verify_password_async('secret', hashed)
+    assert not await verify_password_async('wrong', hashed)
+    # Синхронные функции идут через тот же пул и совместимы по формату
+    assert verify_password('secret', hashed)
+    assert await verify_password_async('secret', get_password_hash('secret'))
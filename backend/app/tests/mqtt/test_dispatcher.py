@@ -0,0 +1,50 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.mqtt.dispatcher import MessageDispatcher
+
+
+def make_message(topic: str, n: int):
+    return SimpleNamespace(topic=topic, payload=str(n).encode())
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_keeps_order_within_controller():
+    handled = []
+
+    async def handler(message):
+        await asyncio.sleep(0)
+        handled.append((message.topic, int(message.payload)))
+
+    dispatcher = MessageDispatcher(handler, workers=4, queue_size=100)
+    await dispatcher.start()
+    for n in range(20):
+        await dispatcher.submit(make_message('flat/room/c1/state', n))
+        await dispatcher.submit(make_message('flat/room/c2/state', n))
+    await dispatcher.stop()
+
+    for topic in ('flat/room/c1/state', 'flat/room/c2/state'):
+        values = [n for t, n in handled if t == topic]
+        assert values == list(range(20))
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_runs_controllers_in_parallel():
+    dispatcher = MessageDispatcher(lambda message: asyncio.sleep(0.1), workers=8, queue_size=10)
+    topics = [f'flat/room/c{n}' for n in range(50)]
+    shards = {dispatcher.get_shard(topic) for topic in topics}
+    await dispatcher.start()
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for topic in topics:
+        if dispatcher.get_shard(topic) in shards:
+            shards.discard(dispatcher.get_shard(topic))
+            await dispatcher.submit(make_message(topic, 0))
+    await dispatcher.stop()
+    assert loop.time() - started < 0.5
+
+    stats = dispatcher.stats()
+    assert stats['depth'] == 0
+    assert sum(shard['processed'] for shard in stats['shards']) > 1
@@ -0,0 +1,16 @@
+import pytest
+
+from app.mqtt.envelope import MessageEnvelope
+
+
+def test_envelope_parses_payload_once():
+    envelope = MessageEnvelope('flat/room/ctrl', b'{"Bedroom":"on","time":1743968248}')
+    data = envelope.data
+    assert data == {'Bedroom': 'on', 'time': 1743968248}
+    assert envelope.data is data
+    assert envelope.text == '{"Bedroom":"on","time":1743968248}'
+
+
+@pytest.mark.parametrize('payload', [b'on', b'26.5', b'"text"', b'', None])
+def test_envelope_non_object_payload(payload):
+    assert MessageEnvelope('flat/room/ctrl', payload).data is None
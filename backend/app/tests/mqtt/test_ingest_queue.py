@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from app.mqtt.ingest_queue import IngestQueue
+
+
+async def drain(queue: IngestQueue) -> list:
+    items = []
+    while queue.qsize():
+        items.append(await queue.get())
+        queue.task_done()
+    return items
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest():
+    queue = IngestQueue(maxsize=3, policy='drop_oldest')
+    for n in range(5):
+        await queue.put('ctrl/state', n)
+    assert queue.dropped == 2
+    assert await drain(queue) == [2, 3, 4]
+    await asyncio.wait_for(queue.join(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_latest_per_topic():
+    queue = IngestQueue(maxsize=10, policy='latest')
+    await queue.put('ctrl1/state', 1)
+    await queue.put('ctrl2/state', 1)
+    await queue.put('ctrl1/state', 2)
+    await queue.put('ctrl1/state', 3)
+    assert queue.coalesced == 2
+    assert await drain(queue) == [3, 1]
+    await asyncio.wait_for(queue.join(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_block_waits_for_space():
+    queue = IngestQueue(maxsize=1, policy='block')
+    await queue.put('ctrl/state', 1)
+    blocked = asyncio.create_task(queue.put('ctrl/state', 2))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    assert await queue.get() == 1
+    queue.task_done()
+    await asyncio.wait_for(blocked, timeout=1)
+    assert await drain(queue) == [2]
+    assert queue.dropped == 0
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        IngestQueue(maxsize=1, policy='drop_newest')
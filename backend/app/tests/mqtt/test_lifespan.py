@@ -0,0 +1,29 @@
+import pytest
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.mqtt.mqtt_client import lifespan
+from app.services.state_cache import state_cache
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_lifespan_warms_up_state_cache(created_device_state, created_controller_board, monkeypatch):
+    monkeypatch.setattr(settings, 'APP_ROLE', 'all')
+    monkeypatch.setattr(settings, 'MQTT_INGEST_MODE', 'all')
+    app = FastAPI()
+    async with lifespan(app):
+        assert app.state.mqtt_manager is not None
+        assert state_cache.authoritative
+        [state] = state_cache.get_controller(created_controller_board.id)
+        assert state.value == created_device_state.value
+    assert not state_cache.local_ingest
+    assert state_cache.get_controller(created_controller_board.id) is None
+
+
+@pytest.mark.asyncio
+async def test_lifespan_refuses_ingest_role(monkeypatch):
+    monkeypatch.setattr(settings, 'APP_ROLE', 'ingest')
+    with pytest.raises(RuntimeError):
+        async with lifespan(FastAPI()):
+            pass
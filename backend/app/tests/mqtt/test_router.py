@@ -0,0 +1,69 @@
+import pytest
+
+from app.mqtt.router import TopicRouter
+
+
+async def gettime(*args):
+    pass
+
+
+async def startup(*args):
+    pass
+
+
+async def controller_events(*args):
+    pass
+
+
+async def rfid(*args):
+    pass
+
+
+async def state(*args):
+    pass
+
+
+@pytest.fixture
+def router():
+    router = TopicRouter()
+    router.add('#/gettime', gettime)
+    router.add('#/startup', startup)
+    router.add('flat/+/ctrl/#', controller_events)
+    router.add('+/+/+/rfid/+', rfid)
+    router.default(state)
+    return router
+
+
+@pytest.mark.parametrize('topic, handler', [
+    ('flat/room/ctrl1/gettime', gettime),
+    ('a/b/c/d/e/gettime', gettime),
+    ('flat/room/ctrl1/startup', startup),
+    ('flat/room/ctrl', controller_events),
+    ('flat/room/ctrl/anything/else', controller_events),
+    ('flat/room/ctrl1/rfid/reader1', rfid),
+    ('flat/room/ctrl1', state),
+    ('flat/room/ctrl1/gettime/extra', state),
+])
+def test_resolve(router, topic, handler):
+    assert router.resolve(topic) is handler
+
+
+def test_prefix_patterns_take_precedence_over_suffix(router):
+    assert router.resolve('flat/room/ctrl/gettime') is controller_events
+
+
+def test_invalid_pattern():
+    router = TopicRouter()
+    with pytest.raises(ValueError):
+        router.add('flat/#/gettime', gettime)
+
+
+def test_route_decorator():
+    router = TopicRouter()
+
+    @router.route('+/ack')
+    async def on_ack(*args):
+        pass
+
+    assert router.resolve('ctrl/ack') is on_ack
+    assert router.resolve('ctrl/nack') is None
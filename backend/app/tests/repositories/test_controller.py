@@ -2,7 +2,7 @@ import pytest
 
 from app.core.db import AsyncSession
 from app.models import ControllerBoard
-from app.repositories.controller_board_repository import create_or_update_controller_board
+from app.repositories.controller_board_repository import create_or_update_controller_board, get_controllers_page
 
 @pytest.mark.asyncio()
 @pytest.mark.usefixtures('apply_migrations')
@@ -33,3 +33,14 @@ async def test_create_or_update_controller_board_update(created_controller_board
     assert controller.period == 60
 
 
+@pytest.mark.asyncio()
+@pytest.mark.usefixtures('apply_migrations')
+async def test_get_controllers_page(created_controller_board):
+    async with AsyncSession() as session:
+        controllers, count = await get_controllers_page(session=session, skip=0, limit=10)
+        assert count == 1
+        assert [controller.id for controller in controllers] == [created_controller_board.id]
+
+        controllers, count = await get_controllers_page(session=session, skip=10, limit=10)
+        assert controllers == []
+        assert count == 1
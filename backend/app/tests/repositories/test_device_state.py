@@ -1,9 +1,12 @@
+from datetime import datetime
+
 import pytest
 
 from app.core.db import AsyncSession, engine
-from app.models import DeviceState
+from app.models import Device, DeviceState
 from app.repositories.device_state_repository import get_device_state_by_device_id, \
-    get_or_create_device_state_by_device_id, update_or_create_device_state_by_device_id
+    get_or_create_device_state_by_device_id, update_or_create_device_state_by_device_id, \
+    get_device_states_by_controller_ids, bulk_upsert_device_states
 from sqlmodel import Session, select
 
 
@@ -78,3 +81,38 @@ async def test_update_or_create_device_state_by_device_id_create(created_device_
         result = session.exec(select(DeviceState).where(DeviceState.device_id == created_device_state.device_id)).first()
         assert result is not None
         assert result.value == new_value
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_get_device_states_by_controller_ids(created_device_state, created_controller_board):
+    async with AsyncSession() as session:
+        states = await get_device_states_by_controller_ids(session=session, controller_ids=[created_controller_board.id])
+        assert [state.device_id for state in states] == [created_device_state.device_id]
+        # device и controller загружены тем же запросом
+        assert states[0].device.controller.id == created_controller_board.id
+        assert await get_device_states_by_controller_ids(session=session, controller_ids=[]) == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_bulk_upsert_device_states_in_batches(created_controller_board):
+    with Session(engine) as session:
+        devices = [
+            Device(name=f'relay{n}', type='Relay', pin=f'D{n}', controller_id=created_controller_board.id)
+            for n in range(5)
+        ]
+        session.add_all(devices)
+        session.commit()
+        device_ids = [device.id for device in devices]
+    now = datetime.now()
+    rows = [
+        {'device_id': device_id, 'parameter': None, 'value': n, 'last_updated': now, 'last_seen': now}
+        for n, device_id in enumerate(device_ids)
+    ]
+    async with AsyncSession() as session:
+        # Пять строк при пачке в две — три запроса в одной транзакции
+        await bulk_upsert_device_states(session, rows, batch_size=2)
+    with Session(engine) as session:
+        states = session.exec(select(DeviceState).where(DeviceState.device_id.in_(device_ids))).all()
+        assert {state.device_id: state.value for state in states} == {row['device_id']: row['value'] for row in rows}
@@ -0,0 +1,39 @@
+import pytest
+
+from app.core.db import AsyncSession
+from app.core.security import verify_password
+from app.models.user import UserCreate, UserUpdate
+from app.repositories import user_repository
+from app.tests.utils.utils import random_email, random_lower_string
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_create_user_and_change_password():
+    email, password = random_email(), random_lower_string()
+    async with AsyncSession() as session:
+        user = await user_repository.create_user(session=session, user_create=UserCreate(email=email, password=password))
+        assert user.email == email
+        assert verify_password(password, user.hashed_password)
+        assert await user_repository.authenticate(session=session, email=email, password=password)
+
+        new_password = random_lower_string()
+        await user_repository.set_password(session=session, user=user, password=new_password)
+        assert await user_repository.authenticate(session=session, email=email, password=new_password)
+        assert await user_repository.authenticate(session=session, email=email, password=password) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_update_user_hashes_password():
+    email = random_email()
+    async with AsyncSession() as session:
+        user = await user_repository.create_user(
+            session=session, user_create=UserCreate(email=email, password=random_lower_string())
+        )
+        new_password = random_lower_string()
+        user = await user_repository.update_user(
+            session=session, db_user=user, user_in=UserUpdate(password=new_password, full_name='Updated')
+        )
+        assert user.full_name == 'Updated'
+        assert verify_password(new_password, user.hashed_password)
@@ -0,0 +1,67 @@
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.models import ControllerBoard, Device, DeviceState
+from app.services.change_bus import MAX_PAYLOAD_SIZE, ChangeBus, pack_payloads
+from app.services.state_cache import state_cache
+from app.services.state_hub import state_hub
+from app.services.user_cache import Principal, user_cache
+
+
+def test_pack_payloads_splits_by_size():
+    events = [{'type': 'state', 'device_id': i, 'value': 1.5, 'padding': 'x' * 100} for i in range(200)]
+    payloads = pack_payloads('origin', events)
+    assert len(payloads) > 1
+    assert all(len(payload) <= MAX_PAYLOAD_SIZE for payload in payloads)
+    decoded = [json.loads(payload) for payload in payloads]
+    assert {message['origin'] for message in decoded} == {'origin'}
+    assert [event['device_id'] for message in decoded for event in message['events']] == list(range(200))
+
+
+@pytest.mark.asyncio
+async def test_remote_state_updates_cache_and_hub(monkeypatch):
+    monkeypatch.setattr(state_cache, 'serving', True)
+    monkeypatch.setattr(state_cache, 'synced', True)
+    controller = ControllerBoard(id=1, topic='home/room', ip='1.1.1.1', rabbitmq_user='user', period=20)
+    device = Device(id=10, name='relay1', type='Relay', pin='D1', controller_id=1, controller=controller)
+    state_cache.load_controller(controller, [DeviceState(device_id=10, value=0, device=device)])
+    subscription = state_hub.subscribe(controller_id=1)
+    bus = ChangeBus(channel='test')
+    try:
+        now = datetime.now()
+        payload = json.dumps({
+            'origin': 'other-worker',
+            'events': [{'type': 'state', 'device_id': 10, 'parameter': None, 'value': 1, 'last_updated': now.isoformat()}],
+        })
+        bus._on_notification(None, 0, 'test', payload)
+        # Свои события пропускаются
+        bus._on_notification(None, 0, 'test', payload.replace('other-worker', bus.origin))
+
+        assert bus.received == 1
+        [state] = state_cache.get_controller(1)
+        assert (state.value, state.last_updated) == (1, now)
+        assert [item.value for item in await subscription.get(timeout=0.1)] == [1]
+    finally:
+        state_hub.unsubscribe(subscription)
+        state_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_remote_controller_event_invalidates_cache():
+    controller = ControllerBoard(id=2, topic='home/kitchen', ip='1.1.1.1', rabbitmq_user='user', period=20)
+    state_cache.load_controller(controller, [])
+    bus = ChangeBus(channel='test')
+    bus.handle({'type': 'controller', 'controller_id': 2, 'topic': 'home/kitchen'})
+    assert state_cache.get_controller(2) is None
+    await bus.stop()
+
+
+def test_remote_user_event_invalidates_auth_cache():
+    user_id = uuid.uuid4()
+    principal = Principal(id=user_id, is_active=True, is_superuser=False)
+    user_cache._users.set(user_id, principal)
+    ChangeBus(channel='test').handle({'type': 'user', 'user_id': str(user_id)})
+    assert user_cache._users.get(user_id, None) is None
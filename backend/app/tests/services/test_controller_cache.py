@@ -0,0 +1,35 @@
+import pytest
+
+from app.core.db import AsyncSession
+from app.services.controller_boards import save_controller_board
+from app.services.controller_cache import ControllerCache, controller_cache
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_controller_cache_hit(created_controller_board):
+    cache = ControllerCache()
+    async with AsyncSession() as session:
+        controller = await cache.get(session=session, topic=created_controller_board.topic)
+    assert controller.id == created_controller_board.id
+    assert controller.period == created_controller_board.period
+
+    # Второй запрос обслуживается из кэша, без сессии
+    assert await cache.get(session=None, topic=created_controller_board.topic) == controller
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_controller_cache_negative_result_refreshed_on_create():
+    controller_cache.clear()
+    topic = 'unknown/room/controller'
+    async with AsyncSession() as session:
+        assert await controller_cache.get(session=session, topic=topic) is None
+        assert await controller_cache.get(session=None, topic=topic) is None
+
+        controller = await save_controller_board(session=session, topic=topic, ip='127.0.0.1')
+
+    cached = await controller_cache.get(session=None, topic=topic)
+    assert cached is not None
+    assert cached.id == controller.id
+    controller_cache.clear()
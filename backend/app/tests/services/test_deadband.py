@@ -0,0 +1,44 @@
+import pytest
+
+from app.services.deadband import ChangeFilter, Deadband, get_deadband
+
+
+@pytest.mark.parametrize('deadband, previous, value, expected', [
+    (Deadband(), 26.5625, 26.5625, False),
+    (Deadband(), 26.5625, 26.625, True),
+    (Deadband(absolute=0.1), 26.5625, 26.625, False),
+    (Deadband(absolute=0.1), 26.5625, 26.75, True),
+    (Deadband(percent=2), 100, 101.5, False),
+    (Deadband(percent=2), 100, 97, True),
+    (Deadband(absolute=1, percent=2), 10, 10.5, False),
+])
+def test_deadband_exceeded(deadband, previous, value, expected):
+    assert deadband.exceeded(previous, value) is expected
+
+
+def test_get_deadband_by_type_and_prefix():
+    assert get_deadband('DS18B20').absolute == 0.1
+    assert get_deadband('MQ135').percent == 2.0
+    assert get_deadband('Relay') == Deadband()
+    assert get_deadband(None) == Deadband()
+
+
+def test_change_filter_suppresses_repeats_until_heartbeat():
+    change_filter = ChangeFilter(max_silence=300)
+    assert change_filter.should_persist(1, 26.5625, 'sensor1', 'DS18B20', now=0)
+    assert not change_filter.should_persist(1, 26.5625, 'sensor1', 'DS18B20', now=10)
+    assert not change_filter.should_persist(1, 26.625, 'sensor1', 'DS18B20', now=20)
+    # Другой параметр того же устройства отслеживается отдельно
+    assert change_filter.should_persist(1, 26.5625, 'sensor2', 'DS18B20', now=20)
+    assert change_filter.should_persist(1, 27, 'sensor1', 'DS18B20', now=30)
+    # Heartbeat: без изменений, но молчание дольше max_silence
+    assert not change_filter.should_persist(1, 27, 'sensor1', 'DS18B20', now=329)
+    assert change_filter.should_persist(1, 27, 'sensor1', 'DS18B20', now=331)
+    assert change_filter.suppressed == 3
+
+
+def test_change_filter_relay_persists_every_switch():
+    change_filter = ChangeFilter(max_silence=300)
+    assert change_filter.should_persist(5, 1, device_type='Relay', now=0)
+    assert not change_filter.should_persist(5, 1, device_type='Relay', now=1)
+    assert change_filter.should_persist(5, 0, device_type='Relay', now=2)
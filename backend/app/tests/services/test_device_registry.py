@@ -0,0 +1,41 @@
+import pytest
+
+from app.core.db import AsyncSession
+from app.services.device_registry import DeviceRegistry
+from app.services.process_startup_message import process_startup_message
+from app.services.device_registry import device_registry
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_device_registry_load(created_device, created_controller_board):
+    registry = DeviceRegistry()
+    async with AsyncSession() as session:
+        await registry.load(session)
+
+    assert registry.loaded
+    info = registry.get(created_controller_board.topic, created_device.name)
+    assert info is not None
+    assert info.id == created_device.id
+    assert registry.get_type(created_controller_board.topic, created_device.name) == 'Relay'
+    assert registry.get(created_controller_board.topic, 'unknown') is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_device_registry_updated_by_startup_message(created_controller_board):
+    async with AsyncSession() as session:
+        await device_registry.load(session)
+        await process_startup_message(
+            session=session,
+            devices={
+                'Device1': {'name': 'Climate', 'type': 'DHT', 'pin': 'D3'},
+            },
+            controller_id=created_controller_board.id,
+        )
+
+    topic = created_controller_board.topic
+    assert device_registry.get_type(topic, 'Climate') == 'DHT'
+    assert device_registry.get(topic, 'Climate', 'temperature') is not None
+    assert device_registry.get(topic, 'Climate', 'humidity') is not None
+    device_registry.clear()
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, func, select
+
+from app.core.db import MAX_ROWS_PER_STATEMENT, engine
+from app.models import DeviceHistory
+from app.services.history_services import HistoryAggregator
+
+
+def test_history_aggregator_groups_by_parameter_and_hour():
+    aggregator = HistoryAggregator(flush_interval=60)
+    now = datetime.now().replace(microsecond=0)
+    for value in (10, 30, 20):
+        aggregator.add(device_id=1, value=value, parameter='temperature', time=now)
+    aggregator.add(device_id=1, value=50, parameter='humidity', time=now)
+    aggregator.add(device_id=1, value=1, parameter='temperature', time=now - timedelta(hours=2))
+    assert len(aggregator) == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_history_aggregator_flush_merges_with_db(created_device):
+    aggregator = HistoryAggregator(flush_interval=60)
+    now = datetime.now().replace(minute=30, second=0, microsecond=0)
+    hour = now.replace(minute=0)
+
+    aggregator.add(device_id=created_device.id, value=10, parameter='temperature', time=now)
+    aggregator.add(device_id=created_device.id, value=30, parameter='temperature', time=now + timedelta(minutes=1))
+    assert await aggregator.flush() == 1
+
+    # Вторая порция за тот же час складывается с уже записанной
+    aggregator.add(device_id=created_device.id, value=20, parameter='temperature', time=now + timedelta(minutes=2))
+    aggregator.add(device_id=created_device.id, value=5, parameter='temperature', time=now - timedelta(minutes=5))
+    await aggregator.stop()
+    assert len(aggregator) == 0
+
+    with Session(engine) as session:
+        history = session.exec(
+            select(DeviceHistory).where(
+                DeviceHistory.device_id == created_device.id,
+                DeviceHistory.parameter == 'temperature',
+                DeviceHistory.hour == hour,
+            )
+        ).one()
+    assert history.min_value == 5
+    assert history.max_value == 30
+    assert history.count == 4
+    assert history.sum_value == 65
+    assert history.last_value == 20
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_history_aggregator_flush_larger_than_batch(created_device):
+    aggregator = HistoryAggregator(flush_interval=60)
+    now = datetime.now()
+    # Корзины по параметрам одного часа: больше строк, чем помещается в один INSERT
+    for n in range(MAX_ROWS_PER_STATEMENT + 10):
+        aggregator.add(device_id=created_device.id, value=n, parameter=f'sensor{n}', time=now)
+    assert await aggregator.flush() == MAX_ROWS_PER_STATEMENT + 10
+    assert len(aggregator) == 0
+
+    with Session(engine) as session:
+        count = session.exec(
+            select(func.count()).select_from(DeviceHistory).where(DeviceHistory.device_id == created_device.id)
+        ).one()
+    assert count == MAX_ROWS_PER_STATEMENT + 10
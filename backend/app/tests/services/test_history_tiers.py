@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from app.core.db import AsyncSession, engine
+from app.models import DeviceHistoryDay, DeviceHistoryMinute
+from app.core.config import settings
+from app.services.history_services import history_aggregator, minute_history_aggregator
+from app.services.history_tiers import (
+    HistoryCompactor,
+    align_time,
+    choose_bucket,
+    parse_bucket,
+    query_history,
+    select_tier,
+)
+
+
+@pytest.mark.parametrize('bucket, expected', [
+    (timedelta(seconds=10), 'raw'),
+    (timedelta(minutes=1), '1m'),
+    (timedelta(minutes=90), '1m'),
+    (timedelta(hours=2), '1h'),
+    (timedelta(days=1), '1d'),
+    (timedelta(days=7), '1d'),
+    (timedelta(hours=36), '1h'),
+])
+def test_select_tier(bucket, expected):
+    assert select_tier(bucket).name == expected
+
+
+def test_select_tier_without_raw_samples(monkeypatch):
+    monkeypatch.setattr(settings, 'RAW_SAMPLES_ENABLED', False)
+    assert select_tier(timedelta(seconds=10)).name == '1m'
+    assert select_tier(timedelta(hours=2)).name == '1h'
+
+
+def test_align_time():
+    time = datetime(2025, 4, 6, 22, 37, 28, 500)
+    assert align_time(time, timedelta(minutes=1)) == datetime(2025, 4, 6, 22, 37)
+    assert align_time(time, timedelta(minutes=15)) == datetime(2025, 4, 6, 22, 30)
+    assert align_time(time, timedelta(days=1)) == datetime(2025, 4, 6)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('30s', timedelta(seconds=30)),
+    ('5m', timedelta(minutes=5)),
+    ('1H', timedelta(hours=1)),
+    ('1d', timedelta(days=1)),
+    ('2w', timedelta(weeks=2)),
+    ('600', timedelta(minutes=10)),
+])
+def test_parse_bucket(value, expected):
+    assert parse_bucket(value) == expected
+
+
+@pytest.mark.parametrize('value', ['', 'm', '0m', '-5m', '1y', '1.5h'])
+def test_parse_bucket_invalid(value):
+    with pytest.raises(ValueError):
+        parse_bucket(value)
+
+
+def test_choose_bucket():
+    start = datetime(2025, 4, 6)
+    assert choose_bucket(start, start + timedelta(days=1), 500) == timedelta(minutes=5)
+    assert choose_bucket(start, start + timedelta(days=30), 500) == timedelta(hours=3)
+    assert choose_bucket(start, start + timedelta(days=3650), 500) == timedelta(weeks=1)
+
+
+def test_compactor_marks_only_late_samples():
+    compactor = HistoryCompactor(flush_interval=60)
+    now = datetime(2025, 4, 6, 22, 37)
+    compactor._watermark = now
+    compactor.mark(now + timedelta(seconds=5))
+    assert compactor._dirty_from is None
+    compactor.mark(now - timedelta(hours=1))
+    compactor.mark(now - timedelta(minutes=5))
+    assert compactor._dirty_from == now - timedelta(hours=1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_minute_and_day_tiers_agree_with_hourly(created_device):
+    now = datetime.now().replace(second=0, microsecond=0)
+    for second, value in ((1, 10), (20, 30), (40, 20)):
+        time = now + timedelta(seconds=second)
+        history_aggregator.add(device_id=created_device.id, value=value, parameter='temperature', time=time)
+        minute_history_aggregator.add(device_id=created_device.id, value=value, parameter='temperature', time=time)
+
+    await minute_history_aggregator.flush()
+    compactor = HistoryCompactor(flush_interval=60)
+    await compactor.flush()
+
+    with Session(engine) as session:
+        minute = session.exec(select(DeviceHistoryMinute).where(DeviceHistoryMinute.device_id == created_device.id)).one()
+        day = session.exec(select(DeviceHistoryDay).where(DeviceHistoryDay.device_id == created_device.id)).one()
+    assert (minute.bucket, minute.min_value, minute.max_value, minute.count, minute.last_value) == (now, 10, 30, 3, 20)
+    assert (day.bucket, day.sum_value, day.count) == (now.replace(hour=0, minute=0), 60, 3)
+
+    async with AsyncSession() as session:
+        tier, rows = await query_history(
+            session,
+            device_id=created_device.id,
+            parameter='temperature',
+            start=now - timedelta(hours=1),
+            end=now + timedelta(hours=1),
+            bucket=timedelta(minutes=5),
+        )
+    assert tier.name == '1m'
+    assert [(row.min_value, row.max_value, row.count) for row in rows] == [(10, 30, 3)]
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.repositories.sample_repository import get_partition_name
+from app.services import sample_writer as sample_writer_module
+from app.services.sample_writer import SampleWriter
+
+
+def test_sample_writer_buffer_is_bounded():
+    writer = SampleWriter(flush_interval=60, max_size=100, buffer_limit=3)
+    for value in range(5):
+        writer.put(device_id=1, value=value, parameter='temperature')
+    assert len(writer) == 3
+    assert writer.dropped == 2
+    assert [record[3] for record in writer._pending] == [2.0, 3.0, 4.0]
+
+
+@pytest.mark.asyncio
+async def test_sample_writer_partitions_follow_local_time_zone(monkeypatch):
+    # На сервере (UTC) ещё вчера, а в settings.TIME_ZONE уже наступили сутки, в которые попадают ts
+    local_today = datetime(2026, 10, 19).date()
+    monkeypatch.setattr(sample_writer_module, 'local_now', lambda: datetime(2026, 10, 19, 0, 30))
+    monkeypatch.setattr(sample_writer_module.settings, 'RAW_SAMPLES_RETENTION_DAYS', 0)
+    monkeypatch.setattr(sample_writer_module.settings, 'RAW_SAMPLES_PARTITIONS_AHEAD', 1)
+    created = []
+
+    async def get_partitions(connection):
+        return set()
+
+    async def create_partition(connection, day):
+        created.append(day)
+
+    monkeypatch.setattr(sample_writer_module, 'get_sample_partitions', get_partitions)
+    monkeypatch.setattr(sample_writer_module, 'create_sample_partition', create_partition)
+
+    writer = SampleWriter(flush_interval=60, max_size=100)
+    writer.put(device_id=1, value=1)
+    assert writer._pending[0][2] == datetime(2026, 10, 19, 0, 30)
+    await writer._prepare_partitions(None, {writer._pending[0][2].date()})
+    assert created == [local_today, local_today + timedelta(days=1)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_sample_writer_copies_into_daily_partitions(created_device):
+    writer = SampleWriter(flush_interval=60, max_size=100)
+    now = datetime.now().replace(microsecond=0)
+    yesterday = now - timedelta(days=1)
+    writer.put(device_id=created_device.id, value=21.5, parameter='temperature', ts=now)
+    writer.put(device_id=created_device.id, value=21.5, parameter='temperature', ts=now)
+    writer.put(device_id=created_device.id, value=20, parameter='temperature', ts=yesterday)
+
+    assert await writer.flush() == 3
+    assert len(writer) == 0
+
+    with Session(engine) as session:
+        rows = session.execute(
+            text('SELECT tableoid::regclass::text, ts, value FROM devicesample WHERE device_id = :id ORDER BY ts'),
+            {'id': created_device.id},
+        ).all()
+    assert [row.value for row in rows] == [20, 21.5, 21.5]
+    assert rows[0][0] == get_partition_name(yesterday.date())
+    assert rows[-1][0] == get_partition_name(now.date())
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_write_states_keeps_every_raw_value(created_device, created_controller_board, monkeypatch):
+    from app.core.db import AsyncSession
+    from app.services.process_messages import write_states
+    from app.services.sample_writer import sample_writer
+    from app.services.state_buffer import state_buffer
+
+    writer = SampleWriter(flush_interval=60, max_size=100)
+    monkeypatch.setattr(sample_writer, 'put', writer.put)
+    puts = []
+    monkeypatch.setattr(state_buffer, 'put', lambda **kwargs: puts.append(kwargs))
+    monkeypatch.setattr(state_buffer, 'touch', lambda **kwargs: None)
+    async with AsyncSession() as session:
+        for _ in range(3):
+            await write_states(
+                session=session,
+                topic=created_controller_board.topic,
+                controller_id=created_controller_board.id,
+                states=[(('test_device', None), None, 1.0)],
+                device_types={'test_device': 'Relay'},
+            )
+    # Зона нечувствительности сократила записи состояния, но не сырые значения
+    assert len(puts) == 1
+    assert len(writer) == 3
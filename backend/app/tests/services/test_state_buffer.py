@@ -0,0 +1,47 @@
+import pytest
+from sqlmodel import Session, select
+
+from app.core.db import engine
+from app.models import DeviceState
+from app.services.state_buffer import StateBuffer
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_state_buffer_keeps_latest_value(created_device):
+    buffer = StateBuffer(flush_interval=60, max_size=100)
+    for value in (1, 2, 3):
+        buffer.put(device_id=created_device.id, value=value)
+    assert len(buffer) == 1
+
+    assert await buffer.flush() == 1
+    with Session(engine) as session:
+        result = session.exec(select(DeviceState).where(DeviceState.device_id == created_device.id)).one()
+        assert result.value == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_state_buffer_updates_existing_state(created_device_state):
+    buffer = StateBuffer(flush_interval=60, max_size=100)
+    buffer.put(device_id=created_device_state.device_id, value=42, parameter='temperature')
+    await buffer.stop()
+
+    with Session(engine) as session:
+        result = session.exec(select(DeviceState).where(DeviceState.device_id == created_device_state.device_id)).one()
+        assert result.value == 42
+        assert result.parameter == 'temperature'
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_state_buffer_touch_updates_only_last_seen(created_device_state):
+    buffer = StateBuffer(flush_interval=60, max_size=100)
+    buffer.touch(device_id=created_device_state.device_id)
+    assert await buffer.flush() == 0
+
+    with Session(engine) as session:
+        result = session.exec(select(DeviceState).where(DeviceState.device_id == created_device_state.device_id)).one()
+        assert result.value == created_device_state.value
+        assert result.last_updated == created_device_state.last_updated
+        assert result.last_seen is not None
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.db import AsyncSession
+from app.models import ControllerBoard, Device, DeviceState
+from app.repositories.device_state_repository import get_controller_device_states
+from app.services.device_registry import DeviceInfo
+from app.services.state_cache import StateCache
+
+
+def make_controller() -> tuple[ControllerBoard, DeviceState]:
+    controller = ControllerBoard(id=1, topic='home/room', ip='1.1.1.1', rabbitmq_user='user', period=20, description='Room')
+    device = Device(id=10, name='relay1', type='Relay', pin='D1', controller_id=1, controller=controller)
+    state = DeviceState(device_id=10, value=1, device=device)
+    return controller, state
+
+
+def make_cache() -> StateCache:
+    cache = StateCache()
+    cache.serving = cache.local_ingest = True
+    return cache
+
+
+def test_state_cache_cold_controller_is_not_served():
+    cache = make_cache()
+    assert cache.get_controller(1) is None
+    # Обновления незагруженного контроллера не создают неполный срез
+    cache.update(1, DeviceInfo(id=10, controller_id=1, name='relay1', extra_name=None, type='Relay'), value=1)
+    assert cache.get_controller(1) is None
+
+
+def test_state_cache_update_during_load_survives_reload():
+    cache = make_cache()
+    controller, state = make_controller()
+    state.last_updated = state.last_seen = datetime.now() - timedelta(minutes=1)
+    # Пока контроллер читается из БД, приходят новое значение реле и первое значение датчика
+    cache.update(1, DeviceInfo(id=10, controller_id=1, name='relay1', extra_name=None, type='Relay'), value=0)
+    sensor = DeviceInfo(id=11, controller_id=1, name='dht', extra_name='temperature', type='DHT')
+    cache.update(1, sensor, value=21.5, parameter='temperature')
+    cache.load_controller(controller, [state])
+
+    states = {item.device_name: item for item in cache.get_controller(1)}
+    assert states['relay1'].value == 0
+    assert states['dht'].value == 21.5
+    assert states['dht'].topic == 'home/room'
+
+
+def test_state_cache_invalidation_keeps_unflushed_values():
+    cache = make_cache()
+    controller, state = make_controller()
+    state.last_updated = state.last_seen = datetime.now() - timedelta(minutes=1)
+    cache.load_controller(controller, [state])
+    cache.update(1, DeviceInfo(id=10, controller_id=1, name='relay1', extra_name=None, type='Relay'), value=0)
+    cache.invalidate_controller(1)
+    # Буфер ещё не записал value=0: в БД осталось старое значение
+    cache.load_controller(controller, [state])
+    assert cache.get_controller(1)[0].value == 0
+
+    # Более свежее значение из БД побеждает отложенное
+    cache.invalidate_controller(1)
+    newer = DeviceState(device_id=10, value=5, device=state.device, last_updated=datetime.now() + timedelta(minutes=1))
+    cache.load_controller(controller, [newer])
+    assert cache.get_controller(1)[0].value == 5
+
+
+def test_state_cache_apply_for_unloaded_controller_is_deferred():
+    cache = make_cache()
+    controller, state = make_controller()
+    state.last_updated = state.last_seen = datetime.now() - timedelta(minutes=1)
+    now = datetime.now()
+    assert cache.apply(10, value=7, parameter=None, last_updated=now) is None
+    cache.load_controller(controller, [state])
+    reloaded = cache.get_controller(1)[0]
+    assert reloaded.value == 7
+    assert reloaded.last_updated == now
+
+
+def test_state_cache_update_and_touch():
+    cache = make_cache()
+    controller, state = make_controller()
+    cache.load_controller(controller, [state])
+
+    sensor = DeviceInfo(id=11, controller_id=1, name='dht', extra_name='temperature', type='DHT')
+    cache.update(1, sensor, value=21.5, parameter='temperature')
+    states = {item.device_name: item for item in cache.get_controller(1)}
+    assert states['relay1'].value == 1
+    assert states['dht'].value == 21.5
+    assert states['dht'].topic == 'home/room'
+    assert states['dht'].controller_description == 'Room'
+
+    last_updated = states['dht'].last_updated
+    cache.touch(1, 11)
+    states = {item.device_name: item for item in cache.get_controller(1)}
+    assert states['dht'].last_updated == last_updated
+    assert states['dht'].last_seen >= last_updated
+
+    cache.invalidate_controller(1)
+    assert cache.get_controller(1) is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_get_controller_device_states_single_query(created_device_state, created_controller_board):
+    async with AsyncSession() as session:
+        controller, states = await get_controller_device_states(session=session, controller_id=created_controller_board.id)
+        assert controller.id == created_controller_board.id
+        assert [state.device.controller.topic for state in states] == ['test1/test2/test3']
+
+        controller, states = await get_controller_device_states(session=session, controller_id=999999)
+        assert controller is None and states == []
+
+
+def test_state_cache_ignores_changes_when_not_serving():
+    cache = StateCache()
+    cache.local_ingest = cache.synced = True  # процесс app.ingest: API нет, кэш никто не читает
+    assert not cache.authoritative
+    device = DeviceInfo(id=10, controller_id=1, name='relay1', extra_name=None, type='Relay')
+    assert cache.update(1, device, value=1) is None
+    cache.touch(1, 10)
+    assert cache.apply(10, value=1, parameter=None, last_updated=datetime.now()) is None
+    assert cache._deferred == {}
@@ -0,0 +1,46 @@
+import pytest
+
+from app.services.process_messages import extract_states
+from app.services.state_extractors import get_extractor, register_extractor, _extractors
+
+PAYLOAD = {
+    "Bedroom": "on",
+    "FloorSensors": {"Bedroom": 26.5625, "Passage": 26.5625},
+    "RoomClimate": {"temperature": 27.10000038, "humidity": 37.79999924},
+    "GasSensor": {"gas_raw": 58, "gas_ppm": 6.718621254},
+}
+
+
+@pytest.mark.parametrize('device_name, device_type, expected', [
+    ('Bedroom', 'Relay', [(('Bedroom', None), None, 1)]),
+    ('FloorSensors', 'DS18B20', [
+        (('FloorSensors', 'Bedroom'), 'Bedroom', 26.5625),
+        (('FloorSensors', 'Passage'), 'Passage', 26.5625),
+    ]),
+    ('RoomClimate', 'DHT', [
+        (('RoomClimate', 'temperature'), 'temperature', 27.10000038),
+        (('RoomClimate', 'humidity'), 'humidity', 37.79999924),
+    ]),
+    ('GasSensor', 'MQ135', [
+        (('GasSensor', 'gas_raw'), 'gas_raw', 58.0),
+        (('GasSensor', 'gas_ppm'), 'gas_ppm', 6.718621254),
+    ]),
+])
+def test_extract_states(device_name, device_type, expected):
+    assert extract_states(device_name, device_type, PAYLOAD[device_name]) == expected
+
+
+def test_extract_states_unknown_or_malformed():
+    assert extract_states('Door', 'Unknown', 'open') == []
+    assert extract_states('FloorSensors', 'DS18B20', 'on') == []
+
+
+def test_register_extractor():
+    @register_extractor('Buzzer')
+    def extract_buzzer(device_name, state):
+        return [((device_name, None), None, float(state))]
+
+    try:
+        assert get_extractor('Buzzer') is extract_buzzer
+    finally:
+        _extractors.pop('Buzzer')
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+from app.models.device_state import DeviceStatePublic
+from app.services.state_hub import StateHub, Subscription
+
+
+def make_state(topic: str = 'home/room', name: str = 'relay1', value: float = 1) -> DeviceStatePublic:
+    return DeviceStatePublic(
+        topic=topic,
+        controller_description='Room',
+        device_name=name,
+        device_type='Relay',
+        device_description=None,
+        parameter=None,
+        value=value,
+        last_updated=datetime.now(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_subscription_keeps_latest_value_per_device():
+    subscription = Subscription(controller_id=1, maxsize=2)
+    for value in (1, 2, 3):
+        subscription.offer(10, make_state(value=value))
+    subscription.offer(11, make_state(name='relay2'))
+    # Буфер полон: новое устройство вытесняет самое давнее
+    subscription.offer(12, make_state(name='relay3'))
+
+    states = await subscription.get(timeout=0.1)
+    assert [state.device_name for state in states] == ['relay2', 'relay3']
+    assert subscription.coalesced == 2
+    assert subscription.dropped == 1
+    assert await subscription.get(timeout=0.01) == []
+
+
+@pytest.mark.asyncio
+async def test_hub_routes_by_controller_and_topic_prefix():
+    hub = StateHub()
+    by_controller = hub.subscribe(controller_id=1)
+    by_topic = hub.subscribe(topic='home/')
+    other = hub.subscribe(topic='garage/')
+
+    hub.publish(1, 10, make_state(topic='home/room'))
+    hub.publish(2, 20, make_state(topic='home/kitchen', name='dht'))
+
+    assert [state.device_name for state in await by_controller.get(timeout=0.1)] == ['relay1']
+    assert [state.device_name for state in await by_topic.get(timeout=0.1)] == ['relay1', 'dht']
+    assert await other.get(timeout=0.01) == []
+
+    hub.unsubscribe(by_controller)
+    hub.unsubscribe(by_topic)
+    hub.unsubscribe(other)
+    assert len(hub) == 0
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from app.services.time_sync import TimeSyncService
+
+
+class FakeClient:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, topic, payload):
+        self.published.append((topic, payload))
+
+
+def test_payload_honours_time_zone():
+    service = TimeSyncService()
+    moscow = json.loads(service.get_payload('Europe/Moscow'))
+    assert moscow['timezone'] == 'Europe/Moscow'
+    assert moscow['utc_offset'] == '+03:00'
+    assert moscow['raw_offset'] == 10800
+    assert moscow['abbreviation'] == 'MSK'
+
+    vladivostok = json.loads(service.get_payload('Asia/Vladivostok'))
+    assert vladivostok['utc_offset'] == '+10:00'
+    assert vladivostok['unixtime'] - moscow['unixtime'] in (0, 1)
+
+
+def test_payload_cached_per_second():
+    service = TimeSyncService()
+    assert service.get_payload('Europe/Moscow') is service.get_payload('Europe/Moscow')
+
+
+def test_unknown_time_zone_falls_back_to_settings():
+    service = TimeSyncService()
+    assert json.loads(service.get_payload('Mars/Olympus'))['timezone'] == 'Europe/Moscow'
+
+
+@pytest.mark.asyncio
+async def test_requests_are_batched():
+    service = TimeSyncService(batch_window=60)
+    client = FakeClient()
+    for n in range(100):
+        service.request(client, f'flat/room/ctrl{n}/set/time')
+    service.request(client, 'flat/room/ctrl0/set/time')
+
+    assert await service.flush() == 100
+    service._flush_task.cancel()
+    assert len(client.published) == 100
+    assert len({payload for _, payload in client.published}) <= 2
+
+
+@pytest.mark.asyncio
+async def test_stop_sends_pending_replies_and_cancels_flush_task():
+    service = TimeSyncService(batch_window=60)
+    client = FakeClient()
+    service.request(client, 'flat/room/ctrl1/set/time')
+    task = service._flush_task
+
+    await service.stop()
+    assert task.cancelled()
+    assert [topic for topic, _ in client.published] == ['flat/room/ctrl1/set/time']
+    await service.stop()  # повторная остановка ничего не делает
+    assert len(client.published) == 1
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from app.core.db import AsyncSession
+from app.models import Trigger
+from app.services.process_startup_message import process_triggers
+from app.services.trigger_engine import TriggerEngine
+
+
+def make_engine(*triggers: tuple) -> TriggerEngine:
+    engine = TriggerEngine()
+    index = {}
+    for trigger_id, key, condition, threshold in triggers:
+        compiled = TriggerEngine.compile(
+            Trigger(id=trigger_id, device_id=1, trigger_device=key[1], parameter=key[2],
+                    condition=condition, threshold=threshold, action='on'),
+            topic='home/room',
+            device_name='relay1',
+        )
+        index[key] = index.get(key, ()) + (compiled,)
+    engine._swap(index, {1: frozenset(index)})
+    return engine
+
+
+def test_trigger_fires_on_transition_only():
+    engine = make_engine((1, (1, 'dht', 'temperature'), '>', 25))
+    assert engine.evaluate(1, 'dht', 'temperature', 20) == []
+    fired = engine.evaluate(1, 'dht', 'temperature', 26)
+    assert [trigger.id for trigger in fired] == [1]
+    assert fired[0].topic == 'home/room/set/relay1'
+    # Условие остаётся выполненным — повторно не срабатывает
+    assert engine.evaluate(1, 'dht', 'temperature', 27) == []
+    assert engine.evaluate(1, 'dht', 'temperature', 24) == []
+    assert [trigger.id for trigger in engine.evaluate(1, 'dht', 'temperature', 30)] == [1]
+
+
+def test_trigger_checks_only_matching_key():
+    engine = make_engine(
+        (1, (1, 'dht', 'temperature'), '>', 25),
+        (2, (1, 'dht', 'humidity'), '<=', 40),
+    )
+    assert engine.evaluate(1, 'dht', 'humidity', 30)[0].id == 2
+    assert engine.evaluate(2, 'dht', 'temperature', 30) == []
+    assert engine.evaluate(1, 'other', 'temperature', 30) == []
+
+
+def test_unknown_condition_is_skipped():
+    trigger = Trigger(id=1, device_id=1, trigger_device='dht', parameter='t', condition='~', threshold=1, action='on')
+    assert TriggerEngine.compile(trigger, 'home', 'relay1') is None
+
+
+@pytest.mark.asyncio
+async def test_fired_action_is_published():
+    engine = make_engine((1, (1, 'dht', 'temperature'), '>', 25))
+    published = []
+
+    async def publisher(topic, payload):
+        published.append((topic, payload))
+
+    engine.set_publisher(publisher)
+    engine.process(1, 'dht', 'temperature', 30)
+    await asyncio.sleep(0)
+    assert published == [('home/room/set/relay1', 'on')]
+    assert engine.fired == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_process_triggers_and_reload(created_device):
+    async with AsyncSession() as session:
+        triggers_data = [{'device': 'dht', 'parameter': 'temperature', 'condition': '>', 'threshold': 25, 'action': 'on'}]
+        await process_triggers(session=session, device=created_device, triggers_data=triggers_data)
+        # Повторная загрузка того же devices.json не создаёт дубликатов
+        triggers_data[0]['action'] = 'off'
+        await process_triggers(session=session, device=created_device, triggers_data=triggers_data)
+
+        engine = TriggerEngine()
+        await engine.reload_controller(session=session, controller_id=created_device.controller_id)
+
+    assert len(engine) == 1
+    fired = engine.evaluate(created_device.controller_id, 'dht', 'temperature', 30)
+    assert [(trigger.topic, trigger.action) for trigger in fired] == [('test1/test2/test3/set/test_device', 'off')]
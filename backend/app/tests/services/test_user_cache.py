@@ -0,0 +1,65 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from jwt.exceptions import InvalidTokenError
+from sqlmodel import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.db import AsyncSession
+from app.core.security import create_access_token
+from app.services.user_cache import UserCache
+
+
+def test_decode_caches_token():
+    cache = UserCache(maxsize=10, ttl=60)
+    user_id = uuid.uuid4()
+    token = create_access_token(user_id, expires_delta=timedelta(minutes=5))
+    assert cache.decode(token) == user_id
+    assert len(cache._tokens) == 1
+    assert cache.decode(token) == user_id
+
+
+def test_decode_invalid_token():
+    cache = UserCache(maxsize=10, ttl=60)
+    with pytest.raises(InvalidTokenError):
+        cache.decode('not-a-token')
+    with pytest.raises(InvalidTokenError):
+        cache.decode(create_access_token('not-a-uuid', expires_delta=timedelta(minutes=5)))
+    with pytest.raises(InvalidTokenError):
+        cache.decode(create_access_token(uuid.uuid4(), expires_delta=timedelta(minutes=-1)))
+    assert len(cache._tokens) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('apply_migrations')
+async def test_get_and_invalidate(db: Session):
+    user = crud.get_user_by_email(session=db, email=settings.FIRST_SUPERUSER)
+    token = create_access_token(user.id, expires_delta=timedelta(minutes=5))
+    cache = UserCache(maxsize=10, ttl=60)
+    async with AsyncSession() as session:
+        principal = await cache.get(session, token)
+    assert principal.id == user.id
+    assert principal.is_superuser
+
+    # Повторная проверка обслуживается из кэша, без сессии
+    assert await cache.get(None, token) == principal
+
+    user.is_active = False
+    db.add(user)
+    db.commit()
+    cache.invalidate(user.id)
+    async with AsyncSession() as session:
+        assert (await cache.get(session, token)).is_active is False
+        assert await cache.get(session, create_access_token(uuid.uuid4(), expires_delta=timedelta(minutes=5))) is None
+
+
+@pytest.mark.usefixtures('apply_migrations')
+def test_get_sync_shares_cache_with_async(db: Session):
+    user = crud.get_user_by_email(session=db, email=settings.FIRST_SUPERUSER)
+    token = create_access_token(user.id, expires_delta=timedelta(minutes=5))
+    cache = UserCache(maxsize=10, ttl=60)
+    principal = cache.get_sync(db, token)
+    assert principal.id == user.id
+    assert cache.get_sync(None, token) == principal
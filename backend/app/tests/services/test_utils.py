@@ -0,0 +1,15 @@
+import pytest
+
+from app.services.utils import is_command_topic
+
+
+@pytest.mark.parametrize('topic, expected', [
+    ('flat/room/ctrl/set/Bedroom', True),
+    ('flat/room/ctrl/set/time', True),
+    ('flat/room/ctrl/set/sendFile', True),
+    ('flat/room/ctrl', False),
+    ('flat/room/ctrl/gettime', False),
+    ('flat/room/settings/state', False),
+])
+def test_is_command_topic(topic, expected):
+    assert is_command_topic(topic) is expected
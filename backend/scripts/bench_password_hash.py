@@ -0,0 +1,91 @@
+"""
+Бенчмарк проверки паролей под всплеском логинов.
+
+LOGINS одновременных проверок bcrypt и параллельно «лёгкий эндпоинт» —
+корутина, которая каждые TICK секунд измеряет задержку event loop.
+Сравниваются:
+  - inline: bcrypt прямо в корутине (блокирует event loop);
+  - threadpool: общий threadpool anyio, как у синхронных эндпоинтов FastAPI;
+  - password pool: отдельный пул (как app.core.security.password_executor).
+
+    cd backend && python scripts/bench_password_hash.py [LOGINS] [WORKERS]
+"""
+import asyncio
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from anyio import to_thread
+from passlib.context import CryptContext
+
+# Как в app.core.security, без загрузки настроек приложения
+pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+PASSWORD = 'changethis'
+HASHED = pwd_context.hash(PASSWORD)
+TICK = 0.01
+
+
+async def inline() -> bool:
+    return pwd_context.verify(PASSWORD, HASHED)
+
+
+async def threadpool() -> bool:
+    return await to_thread.run_sync(pwd_context.verify, PASSWORD, HASHED)
+
+
+def make_pool(workers: int):
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+    async def pool() -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, pwd_context.verify, PASSWORD, HASHED)
+
+    return pool
+
+
+async def ticker(stop: asyncio.Event, lags: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+
+async def run(verify, logins: int) -> tuple[float, list[float]]:
+    stop, lags = asyncio.Event(), []
+    tick_task = asyncio.create_task(ticker(stop, lags))
+    await asyncio.sleep(TICK * 2)
+    started = time.perf_counter()
+    assert all(await asyncio.gather(*(verify() for _ in range(logins))))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick_task
+    return elapsed, lags
+
+
+def percentile(values: list[float], q: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    variants = {
+        'inline': inline,
+        'threadpool (anyio)': threadpool,
+        f'password pool ({workers})': make_pool(workers),
+    }
+    print(f'{logins} concurrent logins')
+    for name, verify in variants.items():
+        elapsed, lags = asyncio.run(run(verify, logins))
+        print(
+            f'{name:<22} {logins / elapsed:6.1f} logins/s  '
+            f'loop lag p50 {percentile(lags, 50) * 1000:7.1f} ms  '
+            f'p99 {percentile(lags, 99) * 1000:7.1f} ms  max {max(lags, default=0) * 1000:7.1f} ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
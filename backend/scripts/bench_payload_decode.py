@@ -0,0 +1,64 @@
+"""
+Микробенчмарк разбора payload входящих MQTT-сообщений.
+
+Сравнивает прежний путь (decode() + is_json + json.loads) с MessageEnvelope
+на реальном сообщении контроллера (см. save_to_history).
+
+    cd backend && python scripts/bench_payload_decode.py
+"""
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.mqtt import envelope as envelope_module  # noqa: E402
+from app.mqtt.envelope import MessageEnvelope  # noqa: E402
+
+PAYLOAD = (
+    b'{"Bedroom":"on","Passage":"on","FloorSensors":{"Bedroom":26.5625,"Passage":26.5625},'
+    b'"RoomClimate":{"temperature":27.10000038,"humidity":37.79999924},'
+    b'"GasSensor":{"gas_raw":58,"gas_ppm":6.718621254},"time":1743968248}'
+)
+NUMBER = 200_000
+
+
+def is_json(myjson):
+    # Копия app.services.utils.is_json, чтобы не тянуть настройки приложения
+    try:
+        json.loads(myjson)
+        if not isinstance(myjson, str) or '"' not in myjson:
+            return False
+    except ValueError:
+        return False
+    return True
+
+
+def legacy():
+    payload = PAYLOAD.decode()
+    if is_json(payload):
+        return json.loads(payload)
+
+
+def single_pass():
+    return MessageEnvelope('flat/room/controller', PAYLOAD).data
+
+
+def main():
+    results = {'decode + is_json + json.loads': timeit.timeit(legacy, number=NUMBER)}
+    orjson = envelope_module.orjson
+    envelope_module.orjson = None
+    results['MessageEnvelope (stdlib json)'] = timeit.timeit(single_pass, number=NUMBER)
+    envelope_module.orjson = orjson
+    if orjson is not None:
+        results['MessageEnvelope (orjson)'] = timeit.timeit(single_pass, number=NUMBER)
+
+    baseline = results['decode + is_json + json.loads']
+    for name, elapsed in results.items():
+        per_message = elapsed / NUMBER * 1e6
+        print(f'{name:<32} {per_message:7.2f} us/msg  x{baseline / elapsed:.2f}')
+
+
+if __name__ == '__main__':
+    main()